@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарк фильтра контента.
+
+Сравнивает прежнюю реализацию (подстроки + некомпилированные регулярки,
+новый FilterService на каждое сообщение) с общим скомпилированным
+filter_service.scan().
+
+Запуск:
+    python benchmarks/filter_bench.py
+    python benchmarks/filter_bench.py --db trixbot.db      # тексты из таблицы posts
+    python benchmarks/filter_bench.py --corpus posts.txt   # посты через пустую строку
+"""
+import argparse
+import asyncio
+import os
+import re
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.filter_service import FilterService, filter_service
+from services.domain_blocklist import domain_blocklist
+
+SAMPLE_POSTS = [
+    "Продаю детскую коляску 3 в 1, состояние отличное. Район XIII, самовывоз. Цена 80 000 ft. Пишите в лс",
+    "Ищу работу официантом или барменом, опыт 3 года, венгерский базовый. Telegram @budapest_worker",
+    "Сдаётся комната в 7 районе, рядом метро Blaha. 150 000 ft + коммуналка. Фото по запросу",
+    "Кто знает хорошего стоматолога в Будапеште, который говорит по-русски? Буду благодарна за контакты 🙏",
+    "Click here to earn $500 daily!!! Only today: bit.ly/fastmoney",
+    "Маникюр, педикюр, наращивание. Работаю в 6 районе. Запись: +36 20 123 4567, instagram.com/nails_bp",
+    "ВНИМАНИЕ!!! СРОЧНО ПРОДАЮ ВСЁ!!! ЗВОНИТЕ ПРЯМО СЕЙЧАС!!!",
+    "Crypto signals trading group, 100% guaranteed profit, whatsapp: +36201234567",
+    "Потерялась кошка в районе Újpest, серая, с белым пятном на груди. Помогите найти! Подробнее: https://example.com/cat",
+    "Перевозка вещей по Будапешту и Венгрии, грузчики, недорого. Пишите, отвечу быстро",
+    "Курсы венгерского языка онлайн и офлайн, группы и индивидуально. Первый урок бесплатно",
+    "Отдам даром диван, самовывоз с 3 этажа без лифта, 11 район. Ссылка на фото tinyurl.com/divan-bp",
+    "Ищем попутчиков Будапешт - Вена на субботу, выезд в 8 утра, есть 2 места",
+    "Ааааааааа какая погода сегодня, наконец-то весна пришла в Будапешт!",
+]
+
+def load_corpus(args):
+    if args.db:
+        with sqlite3.connect(args.db) as conn:
+            rows = conn.execute("SELECT text FROM posts WHERE text IS NOT NULL AND text != ''").fetchall()
+        posts = [row[0] for row in rows]
+        if posts:
+            return posts, f"{args.db}:posts"
+        print(f"⚠️ В {args.db} нет постов, используется встроенный корпус")
+
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            posts = [p.strip() for p in f.read().split('\n\n') if p.strip()]
+        if posts:
+            return posts, args.corpus
+
+    return SAMPLE_POSTS, "builtin"
+
+class LegacyFilterService:
+    """Прежняя реализация проверок (для сравнения)"""
+
+    def __init__(self):
+        self.banned_domains = Config.BANNED_DOMAINS
+
+    def contains_banned_link(self, text):
+        text_lower = text.lower()
+        for domain in self.banned_domains:
+            if domain in text_lower:
+                return True
+        urls = re.findall(r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}', text_lower)
+        for url in urls:
+            for domain in self.banned_domains:
+                if domain in url:
+                    return True
+        return False
+
+    def check_spam_patterns(self, text):
+        text_lower = text.lower()
+        spam_patterns = [
+            (r'(?:earn|make)\s+\$?\d+\s*(?:daily|weekly|monthly)', "Financial spam"),
+            (r'(?:click|visit)\s+(?:here|this|link)', "Clickbait spam"),
+            (r'(?:100%|guaranteed)\s+(?:free|profit|income)', "Guarantee spam"),
+            (r'(?:whatsapp|telegram|viber)\s*:\s*\+?\d{10,}', "Contact spam"),
+            (r'(?:crypto|bitcoin|forex)\s+(?:signals|trading|investment)', "Crypto spam")
+        ]
+        for pattern, reason in spam_patterns:
+            if re.search(pattern, text_lower):
+                return True, reason
+        if len(text) > 20:
+            caps_ratio = sum(1 for c in text if c.isupper()) / len(text)
+            if caps_ratio > 0.7:
+                return True, "Excessive capital letters"
+        if re.search(r'(.)\1{5,}', text):
+            return True, "Repeated characters spam"
+        return False, ""
+
+def legacy_check(text):
+    service = LegacyFilterService()
+    return service.contains_banned_link(text), service.check_spam_patterns(text)
+
+def compiled_check(text):
+    return filter_service.scan(text)
+
+def bench(func, posts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in posts:
+            func(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(posts)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter engine micro-benchmark")
+    parser.add_argument('--db', help="SQLite база с таблицей posts")
+    parser.add_argument('--corpus', help="Текстовый файл с постами, разделёнными пустой строкой")
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--domains', type=int, default=0,
+                        help="Добавить N синтетических доменов к BANNED_DOMAINS")
+    args = parser.parse_args()
+
+    posts, source = load_corpus(args)
+
+    if args.domains:
+        extra = [f"spam-domain-{i}.example" for i in range(args.domains)]
+        Config.BANNED_DOMAINS = Config.BANNED_DOMAINS + extra
+        asyncio.run(domain_blocklist.reload())
+
+    # Прежний фильтр искал домены подстрокой (bit.ly в orbit.lyrics.com),
+    # новый сравнивает хосты целиком, поэтому расхождения возможны
+    for text in posts:
+        old_link, (old_spam, _) = legacy_check(text)
+        result = compiled_check(text)
+        if old_link != bool(result.banned_link) or old_spam != bool(result.spam_reason):
+            print(f"⚠️ Расхождение с прежним фильтром: {text[:80]}")
+
+    start = time.perf_counter()
+    FilterService()
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    legacy_us = bench(legacy_check, posts, args.rounds)
+    compiled_us = bench(compiled_check, posts, args.rounds)
+
+    print(f"Корпус: {source}, постов: {len(posts)}, доменов: {len(Config.BANNED_DOMAINS)}, раундов: {args.rounds}")
+    print(f"Компиляция фильтра:           {compile_ms:8.2f} ms")
+    print(f"Прежний фильтр (на пост):     {legacy_us:8.2f} µs")
+    print(f"Скомпилированный (на пост):   {compiled_us:8.2f} µs")
+    print(f"Ускорение:                    {legacy_us / compiled_us:8.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Микробенчмарк антифлуда.
+
+Прогоняет синтетический поток сообщений (много пользователей в нескольких
+чатах, часть из них флудит) через flood_control.check() и показывает
+время на сообщение и размер состояния после вытеснения неактивных.
+
+Запуск:
+    python benchmarks/flood_bench.py
+    python benchmarks/flood_bench.py --messages 1000000 --users 50000 --chats 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.chat_settings import ChatRules
+from services.flood_control import FloodControl
+
+def make_stream(args):
+    """(время, чат, пользователь, message_id) - поток сообщений с флудерами"""
+    rng = random.Random(42)
+    flooders = set(rng.sample(range(args.users), max(1, args.users // 100)))
+    stream = []
+    now = 1000.0
+    message_id = 0
+    while len(stream) < args.messages:
+        user_id = rng.randrange(args.users)
+        chat_id = -100 - rng.randrange(args.chats)
+        now += rng.expovariate(args.rate)
+        # Флудеры пишут пачками, остальные - по одному сообщению
+        burst = 10 if user_id in flooders else 1
+        for _ in range(burst):
+            stream.append((now, chat_id, user_id, message_id))
+            message_id += 1
+            if burst > 1:
+                now += 0.05
+    return stream
+
+def main():
+    parser = argparse.ArgumentParser(description="Flood control micro-benchmark")
+    parser.add_argument('--messages', type=int, default=300000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--chats', type=int, default=3)
+    parser.add_argument('--rate', type=float, default=200.0, help="Сообщений в секунду (в среднем)")
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--window', type=int, default=10)
+    parser.add_argument('--slowmode', type=int, default=0)
+    args = parser.parse_args()
+
+    stream = make_stream(args)
+    rules = {chat_id: ChatRules(chat_id, flood_limit=args.limit, flood_window=args.window, slowmode=args.slowmode)
+             for chat_id in {item[1] for item in stream}}
+    disabled = ChatRules(0)
+
+    control = FloodControl()
+    verdicts = 0
+    start = time.perf_counter()
+    for now, chat_id, user_id, message_id in stream:
+        if control.check(chat_id, user_id, message_id, rules[chat_id], now):
+            verdicts += 1
+    elapsed = time.perf_counter() - start
+
+    # Базовая стоимость для чата без правил
+    start = time.perf_counter()
+    for now, chat_id, user_id, message_id in stream:
+        control.check(chat_id, user_id, message_id, disabled, now)
+    disabled_elapsed = time.perf_counter() - start
+
+    duration = stream[-1][0] - stream[0][0]
+    status = control.get_status()
+    print(f"Сообщений: {len(stream)}, пользователей: {args.users}, чатов: {args.chats}, "
+          f"поток: {duration:.0f} с, правило: >{args.limit}/{args.window}s, slowmode: {args.slowmode}s")
+    print(f"Проверка (на сообщение):      {elapsed / len(stream) * 1e6:8.2f} µs")
+    print(f"Чат без правил:               {disabled_elapsed / len(stream) * 1e6:8.2f} µs")
+    print(f"Вердиктов:                    {verdicts:8d} (флуд: {status['flood']}, slowmode: {status['slowmode']})")
+    print(f"Окон в памяти:                {status['tracked']:8d} (вытеснено: {status['evicted']}, "
+          f"FLOOD_IDLE_SECONDS={Config.FLOOD_IDLE_SECONDS})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк игры "Угадай слово" во время всплеска попыток.
+
+Тысячи пользователей одновременно шлют /needslovo (часть из них - правильный
+ответ). Каждая попытка идёт как отдельная asyncio-задача с await до и после
+проверки, как в обработчике. Показывает время проверки, пропускную
+способность, число победителей (должен быть ровно один) и размер журнала
+попыток после вытеснения.
+
+Запуск:
+    python benchmarks/guess_bench.py
+    python benchmarks/guess_bench.py --users 20000 --guesses 200000 --rate 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.guess_engine import GuessEngine
+
+WORDS = ['паприка', 'гуляш', 'токай', 'лангош', 'палинка', 'дунай', 'балатон', 'рубик']
+
+def make_stream(args):
+    """(время, пользователь, ответ) - поток попыток со скоростью args.rate в секунду"""
+    rng = random.Random(42)
+    stream = []
+    now = 1000.0
+    for _ in range(args.guesses):
+        now += rng.expovariate(args.rate)
+        user_id = rng.randrange(args.users)
+        if rng.random() < args.correct:
+            guess = rng.choice(['Гуляш', ' гуляш ', 'ГУЛЯШ'])
+        else:
+            guess = rng.choice(WORDS)
+        stream.append((now, user_id, guess))
+    return stream
+
+def run_sync(args, stream):
+    """Чистая стоимость guess() на попытку"""
+    engine = GuessEngine()
+    engine.start('need', 'гуляш')
+    # Правильные ответы заменены неправильными, чтобы раунд не закончился
+    stream = [(now, user_id, 'токай' if 'гуляш' in guess.lower() else guess) for now, user_id, guess in stream]
+    start = time.perf_counter()
+    for now, user_id, guess in stream:
+        engine.guess('need', user_id, f"user{user_id}", guess, args.interval, now)
+    elapsed = time.perf_counter() - start
+    return elapsed, engine
+
+async def run_burst(args, stream):
+    """Все попытки как конкурентные задачи с await вокруг проверки"""
+    engine = GuessEngine()
+    engine.start('need', 'гуляш')
+    winners = []
+
+    async def handle(now, user_id, guess):
+        await asyncio.sleep(0)  # update_user_activity, проверки бана и т.п.
+        result = engine.guess('need', user_id, f"user{user_id}", guess, args.interval, now)
+        await asyncio.sleep(0)  # уведомление в группу модерации
+        if result.status == 'winner':
+            winners.append(result.winner)
+
+    start = time.perf_counter()
+    for offset in range(0, len(stream), args.batch):
+        await asyncio.gather(*(handle(*item) for item in stream[offset:offset + args.batch]))
+    elapsed = time.perf_counter() - start
+    return elapsed, engine, winners
+
+def main():
+    parser = argparse.ArgumentParser(description="Word game guess engine benchmark")
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--guesses', type=int, default=300000)
+    parser.add_argument('--rate', type=float, default=3000.0, help="Попыток в секунду (в среднем)")
+    parser.add_argument('--interval', type=int, default=1, help="Интервал между попытками, минут")
+    parser.add_argument('--correct', type=float, default=0.01, help="Доля правильных ответов")
+    parser.add_argument('--batch', type=int, default=2000, help="Одновременных задач")
+    args = parser.parse_args()
+
+    stream = make_stream(args)
+    duration = stream[-1][0] - stream[0][0]
+
+    elapsed, engine = run_sync(args, stream)
+    status = engine.get_status()
+    print(f"Попыток: {len(stream)}, пользователей: {args.users}, поток: {duration:.0f} с "
+          f"(~{args.rate:.0f}/с), интервал: {args.interval} мин")
+    print(f"guess() на попытку:           {elapsed / len(stream) * 1e6:8.2f} µs")
+    print(f"Пропускная способность:       {len(stream) / elapsed:8.0f} попыток/с")
+    print(f"Проверено / интервал:         {status['guesses']:8d} / {status['cooldown']}")
+    print(f"Журнал попыток:               {status['tracked_attempts']:8d} пользователей")
+
+    elapsed, engine, winners = asyncio.run(run_burst(args, stream))
+    status = engine.get_status()
+    print(f"Конкурентно (задачи):         {len(stream) / elapsed:8.0f} попыток/с")
+    print(f"Победителей:                  {len(winners):8d} ({', '.join(winners)}), "
+          f"после победы: {status['late']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк пропускной способности обработчиков.
+
+Синтетические апдейты типичных сценариев проходят через настоящее
+Application (build_application: группа -1, handle_all_callbacks,
+handle_messages, game_command, persistence) с ботом без сети: запросы
+Bot API отвечает FakeRequest внутри процесса. БД - временная SQLite.
+
+Сценарии (каждая итерация - новый пользователь):
+    menu      - /start и переходы по меню;
+    post      - пост в "Объявления": текст, фото, предпросмотр, отправка;
+    piar      - анкета каталога услуг: 8 шагов, фото, предпросмотр, отправка;
+    game      - попытка /needslovo при активной игре;
+    budapest  - сообщение в Будапешт-чате (только счётчик).
+
+Апдейты обрабатываются по одному (как при polling без concurrent_updates).
+Печатает апдейтов в секунду, p50/p95/p99 задержки, число вызовов Bot API
+на апдейт и ответов с ошибкой; результаты пишутся в JSON.
+
+Запуск:
+    python benchmarks/handler_bench.py
+    python benchmarks/handler_bench.py --iterations 500 --flows post piar --output handler_bench.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+ADMIN_ID = 1
+BOT_USER = {'id': 777, 'is_bot': True, 'first_name': 'TrixBot', 'username': 'TrixBenchBot',
+            'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False}
+# Ответы обработчиков и error_handler при исключении
+ERROR_REPLIES = ('❌ Ошибка', '❌ Произошла ошибка')
+PHOTO = [{'file_id': 'AgACAgIAAxkBAAI', 'file_unique_id': 'AQADbench', 'width': 1280, 'height': 960}]
+
+class FakeRequest(BaseRequest):
+    """Bot API без сети: отвечает на вызовы как Telegram и считает их"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.errors = 0
+        self._message_id = 1_000_000
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        api_method = url.rsplit('/', 1)[-1]
+        self.calls[api_method] += 1
+        params = request_data.parameters if request_data else {}
+        if str(params.get('text', '')).startswith(ERROR_REPLIES):
+            self.errors += 1
+        payload = {'ok': True, 'result': self.respond(api_method, params)}
+        return 200, json.dumps(payload).encode()
+
+    def message(self, params: dict) -> dict:
+        self._message_id += 1
+        chat_id = params.get('chat_id')
+        chat_id = chat_id if isinstance(chat_id, int) else -1
+        return {
+            'message_id': self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+            'from': BOT_USER,
+            'text': params.get('text') or params.get('caption') or '',
+        }
+
+    def respond(self, api_method: str, params: dict):
+        if api_method == 'getMe':
+            return BOT_USER
+        if api_method == 'getUpdates' or api_method == 'getChatAdministrators':
+            return []
+        if api_method == 'getChat':
+            return {'id': params.get('chat_id'), 'type': 'supergroup', 'title': 'Bench'}
+        if api_method == 'getChatMember':
+            return {'status': 'member', 'user': {'id': params.get('user_id'), 'is_bot': False, 'first_name': 'User'}}
+        if api_method == 'getChatMemberCount':
+            return 100
+        if api_method == 'copyMessage':
+            return {'message_id': self.message(params)['message_id']}
+        if api_method == 'sendMediaGroup':
+            return [self.message(params) for _ in params.get('media', [])]
+        if api_method.startswith(('send', 'edit', 'forward')):
+            return self.message(params)
+        return True
+
+class UpdateFactory:
+    """Апдейты в формате Bot API, привязанные к боту приложения"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.update_id = 0
+        self.message_id = 0
+
+    def _next(self, **payload) -> Update:
+        self.update_id += 1
+        return Update.de_json({'update_id': self.update_id, **payload}, self.bot)
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {'id': user_id, 'is_bot': False, 'first_name': 'User', 'username': f'user{user_id}'}
+
+    def _message(self, user_id: int, chat_id: int = None, **fields) -> dict:
+        self.message_id += 1
+        chat_id = chat_id or user_id
+        return {
+            'message_id': self.message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+            'from': self._user(user_id),
+            **fields
+        }
+
+    def text(self, user_id: int, text: str, chat_id: int = None) -> Update:
+        return self._next(message=self._message(user_id, chat_id, text=text))
+
+    def command(self, user_id: int, text: str, chat_id: int = None) -> Update:
+        entity = {'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}
+        return self._next(message=self._message(user_id, chat_id, text=text, entities=[entity]))
+
+    def photo(self, user_id: int, caption: str = None) -> Update:
+        fields = {'photo': PHOTO}
+        if caption:
+            fields['caption'] = caption
+        return self._next(message=self._message(user_id, **fields))
+
+    def callback(self, user_id: int, data: str) -> Update:
+        message = self._message(user_id, text='menu')
+        message['from'] = BOT_USER
+        return self._next(callback_query={
+            'id': str(self.update_id), 'from': self._user(user_id),
+            'chat_instance': 'bench', 'data': data, 'message': message
+        })
+
+# ============= СЦЕНАРИИ =============
+
+def flow_menu(f: UpdateFactory, application, user_id: int):
+    yield f.command(user_id, '/start')
+    for data in ('menu:write', 'menu:budapest', 'menu:announcements', 'menu:news',
+                 'menu:back', 'menu:read', 'menu:actual', 'menu:back'):
+        yield f.callback(user_id, data)
+
+def flow_post(f: UpdateFactory, application, user_id: int):
+    yield f.command(user_id, '/start')
+    for data in ('menu:write', 'menu:budapest', 'menu:announcements', 'pub:cat:sell'):
+        yield f.callback(user_id, data)
+    yield f.text(user_id, f"Продаю велосипед, 11 район, 40 000 ft. Пишите в лс ({user_id})")
+    yield f.photo(user_id)
+    yield f.callback(user_id, 'pub:preview')
+    key = application.user_data[user_id].get('post_data', {}).get('submit_key')
+    yield f.callback(user_id, f'pub:send:{key}')
+
+def flow_piar(f: UpdateFactory, application, user_id: int):
+    yield f.command(user_id, '/start')
+    yield f.callback(user_id, 'menu:services')
+    for text in (f'Мастер {user_id}', 'Маникюр', '6, 7, 8', '+36 20 123 4567', f'nails{user_id}',
+                 f'nails{user_id}', 'от 8000 ft', 'Маникюр, педикюр, покрытие гель-лаком'):
+        yield f.text(user_id, text)
+    yield f.photo(user_id)
+    yield f.callback(user_id, 'piar:next_photo')
+    key = application.user_data[user_id].get('piar_data', {}).get('submit_key')
+    yield f.callback(user_id, f'piar:send:{key}')
+
+def flow_game(f: UpdateFactory, application, user_id: int):
+    yield f.command(user_id, '/needslovo токай')
+
+def flow_budapest(f: UpdateFactory, application, user_id: int):
+    from config import Config  # после настройки окружения в main()
+    yield f.text(user_id, 'Всем привет! Кто знает, где купить паприку?', chat_id=Config.BUDAPEST_CHAT_ID)
+
+FLOWS = {'menu': flow_menu, 'post': flow_post, 'piar': flow_piar, 'game': flow_game, 'budapest': flow_budapest}
+
+def setup_game(f: UpdateFactory):
+    """Админ добавляет слово и запускает игру NEED"""
+    yield f.command(ADMIN_ID, '/needadd гуляш')
+    yield f.text(ADMIN_ID, 'Венгерский суп')
+    yield f.command(ADMIN_ID, '/needstart')
+
+# ============= ПРОГОН =============
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+async def run(args):
+    """({сценарий: метрики}, {метод Bot API: вызовов})"""
+    bot_main = importlib.import_module('main')
+    # main.py настраивает INFO при импорте - понижаем после него
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    request = FakeRequest()
+    bot = ExtBot(bot_main.Config.BOT_TOKEN, request=request, get_updates_request=FakeRequest())
+    application = bot_main.build_application(bot=bot)
+    factory = UpdateFactory(bot)
+    results = {}
+
+    async with application:
+        await bot_main.startup_services(application)
+        await application.start()
+
+        user_id = 100_000
+        for name in args.flows:
+            if name == 'game':
+                for update in setup_game(factory):
+                    await application.process_update(update)
+
+            latencies = []
+            elapsed = 0.0
+            calls_before = errors_before = 0
+            for iteration in range(args.warmup + args.iterations):
+                user_id += 1
+                measured = iteration >= args.warmup
+                if iteration == args.warmup:
+                    calls_before = sum(request.calls.values())
+                    errors_before = request.errors
+                for update in FLOWS[name](factory, application, user_id):
+                    start = time.perf_counter()
+                    await application.process_update(update)
+                    latency = time.perf_counter() - start
+                    if measured:
+                        latencies.append(latency)
+                        elapsed += latency
+
+            results[name] = {
+                'updates': len(latencies),
+                'updates_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'mean_ms': statistics.mean(latencies) * 1000,
+                'api_calls_per_update': (sum(request.calls.values()) - calls_before) / len(latencies),
+                'error_replies': request.errors - errors_before,
+            }
+
+        await application.stop()
+        await bot_main.shutdown_services(application)
+
+    return results, dict(request.calls.most_common())
+
+def main():
+    parser = argparse.ArgumentParser(description="Handler throughput benchmark with an in-process fake Bot")
+    parser.add_argument('--iterations', type=int, default=200, help="Прогонов сценария (пользователей)")
+    parser.add_argument('--warmup', type=int, default=3, help="Прогонов без замера (ленивые импорты, кеш экранов)")
+    parser.add_argument('--flows', nargs='+', choices=list(FLOWS), default=list(FLOWS))
+    parser.add_argument('--db', help="Файл SQLite (по умолчанию - временный)")
+    parser.add_argument('--log-level', default='WARNING', help="Уровень логов во время прогона")
+    parser.add_argument('--output', default='handler_bench.json', help="Файл с результатами (JSON)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), 'handler_bench.db')
+    os.environ.setdefault('BOT_TOKEN', '123:bench')
+    os.environ['DATABASE_URL'] = f"sqlite:///{db_path}"
+    os.environ['ADMIN_IDS'] = str(ADMIN_ID)
+    for name in ('METRICS_ENABLED', 'SCHEDULER_ENABLED', 'REPLAY_PENDING_UPDATES'):
+        os.environ[name] = 'false'
+
+    results, api_calls = asyncio.run(run(args))
+
+    print(f"Итераций: {args.iterations} (+{args.warmup} прогрев), БД: {db_path}")
+    print(f"{'сценарий':<10} {'апд.':>7} {'апд/с':>9} {'p50, мс':>9} {'p95, мс':>9} "
+          f"{'p99, мс':>9} {'API/апд':>8} {'ошибок':>7}")
+    for name in args.flows:
+        r = results[name]
+        print(f"{name:<10} {r['updates']:>7} {r['updates_per_sec']:>9.0f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['api_calls_per_update']:>8.2f} {r['error_replies']:>7}")
+
+    with open(args.output, 'w') as f:
+        json.dump({'iterations': args.iterations, 'warmup': args.warmup, 'flows': results,
+                   'api_calls': api_calls}, f, indent=2, ensure_ascii=False)
+    print(f"\nРезультаты: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк полнотекстового поиска (/search).
+
+Создаёт временную SQLite базу с N одобренными постами (обычные посты и
+заявки каталога услуг), строит индекс FTS5 и замеряет задержку запросов.
+
+Запуск:
+    python benchmarks/search_bench.py
+    python benchmarks/search_bench.py --posts 100000 --queries 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+PROFESSIONS = ['Маникюр', 'Педикюр', 'Парикмахер', 'Сантехник', 'Электрик', 'Репетитор венгерского',
+               'Фотограф', 'Массаж', 'Перевозки', 'Ремонт квартир', 'Бухгалтер', 'Няня', 'fodrász']
+DISTRICTS = ['I', 'II', 'III', 'V', 'VI', 'VII', 'VIII', 'IX', 'XI', 'XIII', 'XIV', 'Újpest', 'Buda']
+WORDS = ('продаю сдаю комнату квартиру работа ищу срочно недорого качественно опыт лет пишите '
+         'район метро цена звоните фото самовывоз отдам даром велосипед диван коляску '
+         'официант бармен повар уборка курсы языка онлайн группы помощь документы').split()
+
+QUERIES = ['маникюр XIII', 'кто делает маникюр в 13 районе', 'сантехник', 'ремонт квартиры Újpest',
+           'репетитор венгерского', 'сдаю комнату метро', 'диван даром', 'фотограф свадьба',
+           'работа официантом', 'няня Buda', 'fodrasz', 'перевозка мебели']
+
+def make_vocabulary(rng, size=5000):
+    """Синтетический словарь: реальные посты состоят в основном из редких слов"""
+    syllables = ['ка', 'ро', 'ми', 'ла', 'ту', 'не', 'со', 'ви', 'да', 'пе', 'ру', 'хо', 'ба', 'зе', 'ги']
+    return [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+def make_text(rng, vocabulary, words):
+    # Каждое пятое слово - частое (из WORDS), остальные - по закону Ципфа из словаря
+    return ' '.join(
+        rng.choice(WORDS) if rng.random() < 0.2
+        else vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+        for _ in range(words)
+    )
+
+def make_posts(count):
+    rng = random.Random(7)
+    vocabulary = make_vocabulary(rng)
+    rng.shuffle(vocabulary)
+    rows = []
+    for post_id in range(1, count + 1):
+        if rng.random() < 0.3:
+            profession = rng.choice(PROFESSIONS)
+            districts = rng.sample(DISTRICTS, 2)
+            description = f"{profession}, {make_text(rng, vocabulary, 15)}"
+            rows.append({'id': post_id, 'user_id': rng.randrange(10000), 'text': description,
+                         'is_piar': True, 'piar_name': f"Мастер {post_id}", 'piar_profession': profession,
+                         'piar_districts': districts, 'piar_description': description})
+        else:
+            text = make_text(rng, vocabulary, rng.randint(10, 60))
+            rows.append({'id': post_id, 'user_id': rng.randrange(10000), 'text': text, 'is_piar': False,
+                         'piar_name': None, 'piar_profession': None, 'piar_districts': [],
+                         'piar_description': None})
+    return rows
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(), 'search_bench.db')
+    Config.DATABASE_URL = f"sqlite+aiosqlite:///{path}"
+
+    from services.db import db
+    from services.search_index import search_index
+    from models import Post, PostStatus
+
+    await db.init()
+
+    start = time.perf_counter()
+    posts = make_posts(args.posts)
+    async with db.engine.begin() as conn:
+        for offset in range(0, len(posts), 5000):
+            await conn.execute(Post.__table__.insert(), [
+                {**row, 'status': PostStatus.APPROVED, 'hashtags': [], 'media': []}
+                for row in posts[offset:offset + 5000]
+            ])
+    print(f"Посты:               {args.posts} ({time.perf_counter() - start:.1f} с)")
+
+    start = time.perf_counter()
+    indexed = await search_index.rebuild(force=True)
+    print(f"Индексация:          {indexed} документов ({time.perf_counter() - start:.1f} с)")
+
+    timings = []
+    slowest = {}
+    for i in range(args.queries):
+        query = QUERIES[i % len(QUERIES)]
+        offset = (i // len(QUERIES)) % 3 * Config.SEARCH_PAGE_SIZE
+        start = time.perf_counter()
+        await search_index.search(query, offset, Config.SEARCH_PAGE_SIZE)
+        elapsed = (time.perf_counter() - start) * 1000
+        timings.append(elapsed)
+        slowest[query] = max(slowest.get(query, 0), elapsed)
+
+    timings.sort()
+    print(f"Запросов:            {len(timings)}")
+    print(f"p50:                 {statistics.median(timings):8.2f} ms")
+    print(f"p95:                 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms")
+    print(f"max:                 {timings[-1]:8.2f} ms")
+    for query, elapsed in sorted(slowest.items(), key=lambda item: -item[1])[:3]:
+        print(f"  {elapsed:8.2f} ms  {query}")
+
+    await db.close()
+    os.remove(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search benchmark")
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=120)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк запуска бота (время от старта процесса до начала polling).
+
+Каждый прогон - отдельный процесс python с пустым кешем модулей:
+    import      - import main (telegram, sqlalchemy, обработчики, сервисы);
+    build       - build_application(): Application и регистрация обработчиков;
+    post_init   - startup_services(): БД, таблицы, сервисы (без сети Telegram);
+    total       - сумма трёх этапов.
+БД - временная SQLite: первый прогон создаёт таблицы (cold), остальные
+находят их готовыми (warm). Печатает медиану по прогонам и самые дорогие
+модули по -X importtime.
+
+Запуск:
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --runs 20 --top 15 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Выполняется в дочернем процессе; печатает JSON с длительностями этапов
+CHILD = r'''
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+application = main.build_application()
+built = time.perf_counter()
+
+async def startup():
+    await main.startup_services(application)
+    ready = time.perf_counter()
+    await main.shutdown_services(application)
+    return ready
+
+ready = asyncio.run(startup())
+print(json.dumps({'import': imported - start, 'build': built - imported, 'post_init': ready - built}))
+'''
+
+def child_env(db_path: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'BOT_TOKEN': env.get('BOT_TOKEN', '123:bench'),
+        'DATABASE_URL': f"sqlite:///{db_path}",
+        'METRICS_ENABLED': 'false',
+        'SCHEDULER_ENABLED': 'false',
+        'REPLAY_PENDING_UPDATES': 'false',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+def run_once(db_path: str) -> dict:
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=child_env(db_path),
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['total'] = timings['import'] + timings['build'] + timings['post_init']
+    return timings
+
+def import_profile(db_path: str, top: int) -> list:
+    """Самые дорогие модули верхнего уровня по накопленному времени импорта"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT,
+                            env=child_env(db_path), capture_output=True, text=True, check=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: -item[1])[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot startup time benchmark")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10, help="Модулей в профиле импорта")
+    parser.add_argument('--output', help="Записать результаты в JSON")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'startup_bench.db')
+
+    cold = run_once(db_path)
+    warm = [run_once(db_path) for _ in range(args.runs)]
+
+    print(f"Прогонов:            {args.runs} (+1 с созданием таблиц)")
+    print(f"{'этап':<12} {'cold, мс':>10} {'warm p50, мс':>14} {'warm max, мс':>14}")
+    summary = {'runs': args.runs, 'cold': {}, 'warm_p50': {}, 'warm_max': {}}
+    for stage in ('import', 'build', 'post_init', 'total'):
+        values = [run[stage] * 1000 for run in warm]
+        summary['cold'][stage] = cold[stage] * 1000
+        summary['warm_p50'][stage] = statistics.median(values)
+        summary['warm_max'][stage] = max(values)
+        print(f"{stage:<12} {cold[stage] * 1000:>10.1f} {statistics.median(values):>14.1f} {max(values):>14.1f}")
+
+    print("\nИмпорт (накопленное время, мс):")
+    summary['imports'] = {}
+    for name, ms in import_profile(db_path, args.top):
+        summary['imports'][name] = ms
+        print(f"  {ms:>8.1f}  {name}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nРезультаты: {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
 import os
 from dotenv import load_dotenv
-from typing import List, Set
+from typing import FrozenSet, Iterable, List, NamedTuple, Set
 
 # Загружаем переменные из .env файла (локально)
 load_dotenv()
 
+class RoleSnapshot(NamedTuple):
+    """Неизменяемый снимок ролей; moderators включает админов"""
+    admins: FrozenSet[int]
+    moderators: FrozenSet[int]
+
 class Config:
     # ============= ОСНОВНЫЕ НАСТРОЙКИ =============
     
@@ -16,29 +21,21 @@ class Config:
     
     DATABASE_URL = os.getenv("DATABASE_URL")
     
-    # Если DATABASE_URL не установлена (локальная разработка)
+    # Если DATABASE_URL не установлена (локальная разработка) - SQLite
     if not DATABASE_URL:
         DATABASE_URL = "sqlite:///./trixbot.db"
-        print("⚠️  DATABASE_URL не установлена, используется SQLite локально")
-    else:
-        print(f"✅ DATABASE_URL установлена: {DATABASE_URL[:50]}...")
     
     # КРИТИЧНО: Конвертируем старый формат PostgreSQL в новый для asyncpg
     if DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql+asyncpg://', 1)
-        print("✅ Конвертирован postgres:// → postgresql+asyncpg://")
     
     elif DATABASE_URL.startswith('postgresql://'):
         if 'asyncpg' not in DATABASE_URL:
             DATABASE_URL = DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://', 1)
-            print("✅ Добавлен asyncpg драйвер")
     
     elif DATABASE_URL.startswith('sqlite:///'):
         if 'aiosqlite' not in DATABASE_URL:
             DATABASE_URL = DATABASE_URL.replace('sqlite:///', 'sqlite+aiosqlite:///', 1)
-            print("✅ Добавлен aiosqlite драйвер")
-    
-    print(f"📊 Финальный DATABASE_URL: {DATABASE_URL[:50]}...\n")
     
     # ============= КАНАЛЫ И ГРУППЫ =============
     
@@ -64,15 +61,43 @@ class Config:
         'trade_channel': int(os.getenv("TRADE_CHANNEL_ID", "-1003033694255"))
     }
     
+    # Кеш bot.get_chat(): сколько секунд помнить чат и ошибку доступа к нему
+    CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "600"))
+    CHAT_CACHE_ERROR_TTL = int(os.getenv("CHAT_CACHE_ERROR_TTL", "30"))
+
     # ============= ПРАВА ДОСТУПА =============
     
+    # Роли из окружения действуют всегда (командой их не снять), остальные - в таблице user_roles
     ADMIN_IDS: Set[int] = set(map(int, filter(None, os.getenv("ADMIN_IDS", "7811593067").split(","))))
     MODERATOR_IDS: Set[int] = set(map(int, filter(None, os.getenv("MODERATOR_IDS", "").split(","))))
     
+    # Действующие роли (окружение + БД); подменяется целиком services/role_registry.py
+    ROLES = RoleSnapshot(frozenset(ADMIN_IDS), frozenset(ADMIN_IDS | MODERATOR_IDS))
+    # Как часто сверять роли с БД (изменения, сделанные другим экземпляром бота)
+    ROLES_RELOAD_SECONDS = int(os.getenv("ROLES_RELOAD_SECONDS", "5"))
+    
     # ============= НАСТРОЙКИ КУЛДАУНОВ =============
     
     COOLDOWN_SECONDS = int(os.getenv("COOLDOWN_SECONDS", "3600"))
-    
+
+    # ============= МОДЕРАЦИЯ ЗАЯВОК =============
+
+    # Сколько минут заявка закреплена за модератором без его действий,
+    # после этого она возвращается в очередь
+    MODERATION_CLAIM_MINUTES = int(os.getenv("MODERATION_CLAIM_MINUTES", "30"))
+
+    # ============= ОГРАНИЧЕНИЯ (МУТ/БАН) =============
+
+    # Чаты, в которых муты и баны применяются через Telegram API
+    ENFORCEMENT_CHAT_IDS: Set[int] = set(map(int, filter(None, os.getenv("ENFORCEMENT_CHAT_IDS", str(BUDAPEST_CHAT_ID)).split(","))))
+    # Сколько вызовов Telegram API отправлять одной пачкой
+    EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "20"))
+
+    # Антифлуд: на сколько ограничивать, когда забывать неактивных, сколько окон держать
+    FLOOD_MUTE_SECONDS = int(os.getenv("FLOOD_MUTE_SECONDS", "300"))
+    FLOOD_IDLE_SECONDS = int(os.getenv("FLOOD_IDLE_SECONDS", "600"))
+    FLOOD_MAX_TRACKED = int(os.getenv("FLOOD_MAX_TRACKED", "50000"))
+
     # ============= АВТОПОСТИНГ =============
     
     SCHEDULER_MIN_INTERVAL = int(os.getenv("SCHEDULER_MIN", "120"))
@@ -83,6 +108,16 @@ class Config:
     
     STATS_INTERVAL_HOURS = int(os.getenv("STATS_INTERVAL_HOURS", "8"))
     
+    # ============= МЕТРИКИ =============
+    
+    # Эндпоинт /metrics в текстовом формате Prometheus
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+    
+    # Апдейты дольше этого порога логируются с разбивкой по DB/API/CPU
+    SLOW_HANDLER_MS = int(os.getenv("SLOW_HANDLER_MS", "1000"))
+    
     # ============= СООБЩЕНИЯ ПО УМОЛЧАНИЮ =============
     
     DEFAULT_SIGNATURE = os.getenv("DEFAULT_SIGNATURE", "🤖 @TrixLiveBot - Ваш гид по Будапешту")
@@ -103,22 +138,72 @@ class Config:
         "shorturl.at", "ow.ly", "is.gd", "buff.ly"
     ]
     
+    # Дополнительный список доменов (по одному в строке), перечитывается на лету
+    BLOCKLIST_FILE = os.getenv("BLOCKLIST_FILE", "")
+    BLOCKLIST_RELOAD_SECONDS = int(os.getenv("BLOCKLIST_RELOAD_SECONDS", "300"))
+    
+    # Стоп-слова (через запятую), проверяются вместе с доменами одним проходом
+    BANNED_KEYWORDS = [k.strip() for k in os.getenv("BANNED_KEYWORDS", "").split(",") if k.strip()]
+
+    # Поиск почти-дубликатов среди заявок на модерации и недавно отклонённых
+    DUPLICATE_SIMILARITY = float(os.getenv("DUPLICATE_SIMILARITY", "0.8"))
+    DUPLICATE_WINDOW_HOURS = int(os.getenv("DUPLICATE_WINDOW_HOURS", "72"))
+    DUPLICATE_MAX_ENTRIES = int(os.getenv("DUPLICATE_MAX_ENTRIES", "5000"))
+    DUPLICATE_ACTION = os.getenv("DUPLICATE_ACTION", "flag").lower()  # flag | reject
+
+    # ============= ПОИСК =============
+    
+    # Сколько последних постов каждого тега держать в памяти
+    TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", "100"))
+    TAG_PAGE_SIZE = int(os.getenv("TAG_PAGE_SIZE", "5"))
+    SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "5"))
+    
+    # Каталог услуг (/catalog): сколько дней анкета остаётся в выдаче и размер страницы
+    CATALOG_TTL_DAYS = int(os.getenv("CATALOG_TTL_DAYS", "90"))
+    CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "5"))
+
+    # ============= СОСТОЯНИЕ ПОЛЬЗОВАТЕЛЕЙ =============
+    
+    # Черновики постов, анкеты и ожидания ввода переживают перезапуск
+    PERSISTENCE_ENABLED = os.getenv("PERSISTENCE_ENABLED", "true").lower() == "true"
+    # Как часто (сек) записывать изменившиеся состояния в БД
+    PERSISTENCE_INTERVAL = float(os.getenv("PERSISTENCE_INTERVAL", "10"))
+    
+    # Повторное нажатие той же кнопки в течение N секунд после обработки игнорируется
+    CALLBACK_DEBOUNCE_SECONDS = float(os.getenv("CALLBACK_DEBOUNCE_SECONDS", "2"))
+
+    # ============= ПЕРЕЗАПУСК =============
+    
+    # Апдейты, пришедшие пока бот не работал (редеплой), обрабатываются после запуска
+    REPLAY_PENDING_UPDATES = os.getenv("REPLAY_PENDING_UPDATES", "true").lower() == "true"
+    # Сколько пользователей переигрывать одновременно (апдейты одного - по порядку)
+    REPLAY_CONCURRENCY = int(os.getenv("REPLAY_CONCURRENCY", "8"))
+    # Старше - не переигрываются: сообщения (мин) и кнопки под сообщениями (ч)
+    REPLAY_MAX_AGE_MINUTES = int(os.getenv("REPLAY_MAX_AGE_MINUTES", "60"))
+    REPLAY_CALLBACK_MAX_AGE_HOURS = int(os.getenv("REPLAY_CALLBACK_MAX_AGE_HOURS", "48"))
+
     # ============= МЕТОДЫ КЛАССА =============
     
     @classmethod
     def is_admin(cls, user_id: int) -> bool:
         """Проверяет, является ли пользователь администратором"""
-        return user_id in cls.ADMIN_IDS
+        return user_id in cls.ROLES.admins
     
     @classmethod
     def is_moderator(cls, user_id: int) -> bool:
         """Проверяет, является ли пользователь модератором или админом"""
-        return user_id in cls.MODERATOR_IDS or cls.is_admin(user_id)
+        return user_id in cls.ROLES.moderators
     
     @classmethod
     def get_all_moderators(cls) -> Set[int]:
         """Возвращает всех модераторов и админов"""
-        return cls.ADMIN_IDS.union(cls.MODERATOR_IDS)
+        return set(cls.ROLES.moderators)
+    
+    @classmethod
+    def set_roles(cls, admins: Iterable[int], moderators: Iterable[int]):
+        """Подменить снимок ролей одним присваиванием (проверки не видят промежуточного состояния)"""
+        admins = frozenset(admins) | cls.ADMIN_IDS
+        cls.ROLES = RoleSnapshot(admins, admins | frozenset(moderators) | cls.MODERATOR_IDS)
     
     @classmethod
     def validate_config(cls) -> List[str]:
@@ -154,27 +239,18 @@ class Config:
 • Будапешт чат (игнор команд): {cls.BUDAPEST_CHAT_ID}
 
 👑 Права доступа:
-• Администраторов: {len(cls.ADMIN_IDS)}
-• Модераторов: {len(cls.MODERATOR_IDS)}
+• Администраторов: {len(cls.ROLES.admins)}
+• Модераторов: {len(cls.ROLES.moderators - cls.ROLES.admins)}
 
 ⚙️ Настройки:
 • Кулдаун: {cls.COOLDOWN_SECONDS // 3600}ч
 • Автопостинг: {'✅ Включен' if cls.SCHEDULER_ENABLED else '❌ Выключен'}
 • Интервал автопоста: {cls.SCHEDULER_MIN_INTERVAL}-{cls.SCHEDULER_MAX_INTERVAL} мин
 • Статистика каждые: {cls.STATS_INTERVAL_HOURS}ч
+• Метрики: {f'http://{cls.METRICS_HOST}:{cls.METRICS_PORT}/metrics' if cls.METRICS_ENABLED else '❌ Выключены'}
 
 📊 Лимиты:
 • Макс. фото (пиар): {cls.MAX_PHOTOS_PIAR}
 • Макс. районов (пиар): {cls.MAX_DISTRICTS_PIAR}
 • Макс. длина сообщения: {cls.MAX_MESSAGE_LENGTH}
 """
-
-# Проверяем конфигурацию при импорте
-if __name__ != "__main__":
-    config_errors = Config.validate_config()
-    if config_errors:
-        print("🚨 Ошибки конфигурации:")
-        for error in config_errors:
-            print(f"  {error}")
-    else:
-        print("✅ Конфигурация валидна")
@@ -1,6 +1,9 @@
 from datetime import datetime
 from typing import Dict, Any
 import random
+import re
+from services.guess_engine import guess_engine, normalize_answer
+from services.roll_engine import roll_engine
 
 # Система игры "Угадай слово" - ТРИ ВЕРСИИ
 word_games: Dict[str, Dict[str, Any]] = {
@@ -40,8 +43,27 @@ roll_games: Dict[str, Dict[str, Any]] = {
     'more': {'participants': {}, 'active': True}
 }
 
-# История попыток пользователей (для каждой версии игры отдельно)
-user_attempts: Dict[int, Dict[str, datetime]] = {}
+# Ожидание ввода от админа игры: user_id -> {'action', 'game_version', ...}
+# (здесь, а не в games_handler - main проверяет его без импорта обработчиков игр)
+game_waiting: Dict[int, Dict[str, Any]] = {}
+
+# Команды игр: /<версия><действие> (/needadd, /tryrollstart, ...) - один
+# MessageHandler с этим выражением вместо CommandHandler на каждую команду
+GAME_VERSIONS = ('need', 'try', 'more')
+GAME_ACTIONS = (
+    'add', 'edit', 'start', 'stop', 'info', 'infoedit', 'timeset', 'game', 'guide',
+    'slovo', 'roll', 'rollstart', 'reroll', 'rollstat', 'myroll'
+)
+# Старые команды без версии -> (версия, действие)
+GAME_ALIASES = {'add': ('try', 'add'), 'edit': ('try', 'edit'), 'wordclear': ('try', 'clear')}
+
+GAME_COMMAND_RE = re.compile(
+    r'^/(?:(' + '|'.join(GAME_VERSIONS) + r')(' + '|'.join(sorted(GAME_ACTIONS, key=len, reverse=True)) + r')'
+    r'|(' + '|'.join(GAME_ALIASES) + r'))(?:@(\w+))?(?:\s|$)',
+    re.IGNORECASE
+)
+
+# Интервалы попыток и выбор победителя - services/guess_engine.py
 
 def get_game_version(command: str) -> str:
     """Определяет версию игры по команде"""
@@ -57,27 +79,9 @@ def get_game_version(command: str) -> str:
     # По умолчанию try
     return 'try'
 
-def can_attempt(user_id: int, game_version: str) -> bool:
-    """Проверяет интервал между попытками для конкретной версии игры"""
-    if user_id not in user_attempts:
-        return True
-    if game_version not in user_attempts[user_id]:
-        return True
-    
-    from datetime import timedelta
-    last_attempt = user_attempts[user_id][game_version]
-    interval_minutes = word_games[game_version]['interval']
-    return datetime.now() - last_attempt >= timedelta(minutes=interval_minutes)
-
-def record_attempt(user_id: int, game_version: str):
-    """Записывает попытку пользователя для конкретной версии игры"""
-    if user_id not in user_attempts:
-        user_attempts[user_id] = {}
-    user_attempts[user_id][game_version] = datetime.now()
-
 def normalize_word(word: str) -> str:
     """Нормализует слово для сравнения"""
-    return word.lower().strip().replace('ё', 'е')
+    return normalize_answer(word)
 
 def start_word_game(game_version: str) -> bool:
     """Запускает игру в слова для конкретной версии"""
@@ -89,11 +93,13 @@ def start_word_game(game_version: str) -> bool:
     word_games[game_version]['active'] = True
     word_games[game_version]['winners'] = []
     word_games[game_version]['description'] = f"🎮 Конкурс {game_version.upper()} активен! Угадайте слово используя /{game_version}slovo"
+    guess_engine.start(game_version, current_word)
     return True
 
 def stop_word_game(game_version: str):
     """Останавливает игру в слова для конкретной версии"""
     word_games[game_version]['active'] = False
+    guess_engine.stop(game_version)
     current_word = word_games[game_version]['current_word']
     winners = word_games[game_version]['winners']
     
@@ -110,15 +116,9 @@ def add_winner(game_version: str, username: str):
     current_word = word_games[game_version]['current_word']
     word_games[game_version]['description'] = f"🏆 @{username} угадал слово '{current_word}' в {game_version.upper()} и стал победителем! Ожидайте новый конкурс."
 
-def get_unique_roll_number(game_version: str) -> int:
-    """Генерирует уникальный номер для розыгрыша в конкретной версии игры"""
-    existing_numbers = set(data['number'] for data in roll_games[game_version]['participants'].values())
-    
-    for _ in range(100):  # Ограничиваем попытки
-        new_number = random.randint(1, 9999)
-        if new_number not in existing_numbers:
-            return new_number
-    return random.randint(1, 9999)  # Fallback
+def get_unique_roll_number(game_version: str, user_id: int) -> int:
+    """Уникальный номер для розыгрыша в конкретной версии игры (RollPoolExhausted, если номера кончились)"""
+    return roll_engine.allocate(game_version, user_id)
 
 def get_all_game_stats() -> Dict[str, Any]:
     """Получить статистику по всем версиям игр"""
@@ -148,5 +148,7 @@ def reset_all_games():
         word_games[version]['current_word'] = None
         word_games[version]['winners'] = []
         roll_games[version]['participants'] = {}
+        guess_engine.stop(version)
+        roll_engine.reset(version)
     
-    user_attempts.clear()
+    guess_engine.reset_attempts()
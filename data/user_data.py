@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Set
 
 # Хранилище данных пользователей
 user_data: Dict[int, Dict] = {}
@@ -11,6 +11,11 @@ lottery_participants: Dict[int, Dict] = {}
 # Состояния ожидания (для ссылок и других команд)
 waiting_users: Dict[int, Dict] = {}
 
+# Индексы текущих банов и мутов (поддерживаются ban/mute функциями,
+# истечение сроков снимает services.moderation_expiry)
+banned_ids: Set[int] = set()
+muted_ids: Set[int] = set()
+
 def update_user_activity(user_id: int, username: Optional[str] = None):
     """Обновить активность пользователя"""
     if user_id not in user_data:
@@ -23,6 +28,7 @@ def update_user_activity(user_id: int, username: Optional[str] = None):
             'banned': False,
             'ban_reason': None,
             'banned_at': None,
+            'banned_until': None,
             'muted_until': None
         }
     else:
@@ -44,12 +50,14 @@ def get_user_by_username(username: str) -> Optional[Dict]:
             return user
     return None
 
-def ban_user(user_id: int, reason: str = "Не указана"):
-    """Забанить пользователя"""
+def ban_user(user_id: int, reason: str = "Не указана", until: Optional[datetime] = None):
+    """Забанить пользователя (until=None - навсегда)"""
     if user_id in user_data:
         user_data[user_id]['banned'] = True
         user_data[user_id]['ban_reason'] = reason
         user_data[user_id]['banned_at'] = datetime.now()
+        user_data[user_id]['banned_until'] = until
+        banned_ids.add(user_id)
 
 def unban_user(user_id: int):
     """Разбанить пользователя"""
@@ -57,52 +65,40 @@ def unban_user(user_id: int):
         user_data[user_id]['banned'] = False
         user_data[user_id]['ban_reason'] = None
         user_data[user_id]['banned_at'] = None
+        user_data[user_id]['banned_until'] = None
+    banned_ids.discard(user_id)
 
 def mute_user(user_id: int, until: datetime):
     """Замутить пользователя до определённого времени"""
     if user_id in user_data:
         user_data[user_id]['muted_until'] = until
+        muted_ids.add(user_id)
 
 def unmute_user(user_id: int):
     """Размутить пользователя"""
     if user_id in user_data:
         user_data[user_id]['muted_until'] = None
+    muted_ids.discard(user_id)
 
 def is_user_banned(user_id: int) -> bool:
     """Проверить, забанен ли пользователь"""
-    if user_id not in user_data:
-        return False
-    return user_data[user_id].get('banned', False)
+    return user_id in banned_ids
 
 def is_user_muted(user_id: int) -> bool:
-    """Проверить, замучен ли пользователь"""
-    if user_id not in user_data:
-        return False
+    """Проверить, замучен ли пользователь
     
-    muted_until = user_data[user_id].get('muted_until')
-    if not muted_until:
-        return False
-    
-    # Если время мута истекло, автоматически размучиваем
-    if datetime.now() > muted_until:
-        unmute_user(user_id)
-        return False
-    
-    return True
+    Истёкшие муты снимает services.moderation_expiry в момент истечения,
+    поэтому здесь достаточно проверить индекс.
+    """
+    return user_id in muted_ids
 
 def get_banned_users() -> List[Dict]:
     """Получить список всех забаненных пользователей"""
-    return [
-        user for user in user_data.values()
-        if user.get('banned', False)
-    ]
+    return [user_data[user_id] for user_id in banned_ids if user_id in user_data]
 
 def get_muted_users() -> List[Dict]:
     """Получить список всех замученных пользователей"""
-    return [
-        user for user in user_data.values()
-        if user.get('muted_until') and user['muted_until'] > datetime.now()
-    ]
+    return [user_data[user_id] for user_id in muted_ids if user_id in user_data]
 
 def get_top_users(limit: int = 10) -> List[Dict]:
     """Получить топ пользователей по количеству сообщений"""
@@ -127,8 +123,8 @@ def get_user_stats() -> Dict:
     active_24h = len(get_active_users(24))
     active_7d = len(get_active_users(168))
     total_messages = sum(user['message_count'] for user in user_data.values())
-    banned_count = len(get_banned_users())
-    muted_count = len(get_muted_users())
+    banned_count = len(banned_ids)
+    muted_count = len(muted_ids)
     
     return {
         'total_users': total_users,
@@ -150,6 +146,7 @@ def clean_old_data(days: int = 90):
     
     for user_id in to_remove:
         del user_data[user_id]
+        muted_ids.discard(user_id)
     
     return len(to_remove)
 
@@ -158,6 +155,8 @@ __all__ = [
     'user_data',
     'lottery_participants',
     'waiting_users',
+    'banned_ids',
+    'muted_ids',
     'update_user_activity',
     'get_user_by_id',
     'get_user_by_username',
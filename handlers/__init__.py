@@ -1,88 +1,60 @@
-# handlers/__init__.py - ИСПРАВЛЕННЫЕ ИМПОРТЫ
+# handlers/__init__.py - ЛЕНИВЫЕ ИМПОРТЫ
+# Модуль обработчика импортируется при первом обращении к его имени
+# (handlers.trix_command и т.п.), а не при импорте пакета
 
-from .start_handler import start_command, help_command, show_main_menu, show_write_menu
-from .menu_handler import handle_menu_callback
-from .publication_handler import (
-    handle_publication_callback, 
-    handle_text_input, 
-    handle_media_input
-)
-from .piar_handler import (
-    handle_piar_callback, 
-    handle_piar_text, 
-    handle_piar_photo
-)
-from .moderation_handler import (
-    handle_moderation_callback,
-    handle_moderation_text,
-    ban_command,
-    unban_command,
-    mute_command,
-    unmute_command,
-    banlist_command,
-    stats_command,
-    top_command,
-    lastseen_command
-)
-from .profile_handler import handle_profile_callback
-from .basic_handler import (
-    id_command, 
-    whois_command, 
-    join_command, 
-    participants_command, 
-    report_command
-)
-from .link_handler import trixlinks_command
-from .advanced_moderation import (
-    del_command, 
-    purge_command, 
-    slowmode_command, 
-    noslowmode_command,
-    lockdown_command, 
-    antiinvite_command, 
-    tagall_command, 
-    admins_command
-)
-from .admin_handler import (
-    admin_command, 
-    say_command, 
-    handle_admin_callback
-)
-from .autopost_handler import (
-    autopost_command, 
-    autopost_test_command
-)
-from .games_handler import (
-    wordadd_command, 
-    wordedit_command, 
-    wordclear_command,
-    wordon_command, 
-    wordoff_command, 
-    wordinfo_command,
-    wordinfoedit_command, 
-    anstimeset_command,
-    gamesinfo_command, 
-    admgamesinfo_command, 
-    game_say_command,
-    roll_participant_command, 
-    roll_draw_command,
-    rollreset_command, 
-    rollstatus_command, 
-    mynumber_command,
-    handle_game_text_input,
-    handle_game_media_input,
-    handle_game_callback
-)
-from .medicine_handler import hp_command, handle_hp_callback
-from .stats_commands import (
-    channelstats_command,
-    fullstats_command,
-    resetmsgcount_command,
-    chatinfo_command
-)
-from .help_commands import trix_command, handle_trix_callback
-from .social_handler import social_command, giveaway_command
-from .bonus_handler import bonus_command
+import importlib
+
+_MODULES = {
+    'start_handler': ['start_command', 'help_command', 'show_main_menu', 'show_write_menu'],
+    'menu_handler': ['handle_menu_callback'],
+    'publication_handler': ['handle_publication_callback', 'handle_text_input', 'handle_media_input'],
+    'piar_handler': ['handle_piar_callback', 'handle_piar_text', 'handle_piar_photo'],
+    'moderation_handler': [
+        'handle_moderation_callback', 'handle_moderation_text',
+        'ban_command', 'unban_command', 'mute_command', 'unmute_command',
+        'banlist_command', 'stats_command', 'top_command', 'lastseen_command'
+    ],
+    'profile_handler': ['handle_profile_callback'],
+    'basic_handler': ['id_command', 'whois_command', 'join_command', 'participants_command', 'report_command'],
+    'link_handler': ['trixlinks_command'],
+    'advanced_moderation': [
+        'del_command', 'purge_command', 'slowmode_command', 'noslowmode_command',
+        'lockdown_command', 'antiinvite_command', 'antiflood_command',
+        'tagall_command', 'admins_command'
+    ],
+    'admin_handler': ['admin_command', 'say_command', 'handle_admin_callback', 'role_command'],
+    'autopost_handler': ['autopost_command', 'autopost_test_command'],
+    'games_handler': [
+        'game_command', 'wordadd_command', 'wordedit_command', 'wordclear_command',
+        'wordon_command', 'wordoff_command', 'wordinfo_command',
+        'wordinfoedit_command', 'anstimeset_command',
+        'gamesinfo_command', 'admgamesinfo_command', 'game_say_command',
+        'roll_participant_command', 'roll_draw_command',
+        'rollreset_command', 'rollstatus_command', 'mynumber_command',
+        'handle_game_text_input', 'handle_game_media_input', 'handle_game_callback'
+    ],
+    'medicine_handler': ['hp_command', 'handle_hp_callback'],
+    'stats_commands': [
+        'channelstats_command', 'fullstats_command', 'resetmsgcount_command',
+        'chatinfo_command', 'slowroutes_command', 'topscreens_command'
+    ],
+    'help_commands': ['trix_command', 'handle_trix_callback'],
+    'social_handler': ['social_command', 'giveaway_command'],
+    'bonus_handler': ['bonus_command'],
+    'tag_handler': ['tag_command', 'handle_tag_callback'],
+    'search_handler': ['search_command', 'handle_search_callback'],
+    'catalog_handler': ['catalog_command', 'handle_catalog_callback'],
+}
+
+_EXPORTS = {name: module for module, names in _MODULES.items() for name in names}
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
 
 __all__ = [
     # Start
@@ -136,6 +108,7 @@ __all__ = [
     'noslowmode_command',
     'lockdown_command',
     'antiinvite_command',
+    'antiflood_command',
     'tagall_command',
     'admins_command',
     
@@ -143,12 +116,14 @@ __all__ = [
     'admin_command',
     'say_command',
     'handle_admin_callback',
+    'role_command',
     
     # Autopost
     'autopost_command',
     'autopost_test_command',
     
     # Games
+    'game_command',
     'wordadd_command',
     'wordedit_command',
     'wordclear_command',
@@ -178,6 +153,8 @@ __all__ = [
     'fullstats_command',
     'resetmsgcount_command',
     'chatinfo_command',
+    'slowroutes_command',
+    'topscreens_command',
     
     # Help
     'trix_command',
@@ -188,5 +165,13 @@ __all__ = [
     'giveaway_command',
     
     # Bonus
-    'bonus_command'
+    'bonus_command',
+    
+    # Tags
+    'tag_command',
+    'handle_tag_callback',
+    'search_command',
+    'handle_search_callback',
+    'catalog_command',
+    'handle_catalog_callback'
 ]
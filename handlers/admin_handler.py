@@ -4,7 +4,9 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config import Config
 from services.admin_notifications import admin_notifications
-from data.user_data import user_data
+from services.domain_blocklist import domain_blocklist
+from services.role_registry import role_registry, ROLES
+from data.user_data import user_data, banned_ids, muted_ids, get_user_by_id, get_user_by_username
 
 logger = logging.getLogger(__name__)
 
@@ -394,6 +396,132 @@ async def sendstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Ошибка при отправке статистики: {e}")
 
 
+async def blocklist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Блок-лист доменов - /blocklist [add|del|check|reload] домен"""
+    if not Config.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    action = context.args[0].lower() if context.args else None
+    value = context.args[1] if len(context.args) > 1 else None
+    
+    try:
+        if action == 'add' and value:
+            reason = ' '.join(context.args[2:]) or None
+            host = await domain_blocklist.add_domain(value, reason, update.effective_user.id)
+            if host:
+                await update.message.reply_text(f"✅ Домен {host} и его поддомены заблокированы")
+            else:
+                await update.message.reply_text("❌ Некорректный домен")
+        
+        elif action == 'del' and value:
+            if await domain_blocklist.remove_domain(value):
+                await update.message.reply_text(f"✅ Домен {value} удален из блок-листа")
+            else:
+                await update.message.reply_text("❌ Домен не найден в таблице блок-листа")
+        
+        elif action == 'check' and value:
+            matched = domain_blocklist.is_blocked(value)
+            if matched:
+                await update.message.reply_text(f"🚫 Заблокирован (правило: {matched})")
+            else:
+                await update.message.reply_text("✅ Не заблокирован")
+        
+        elif action == 'reload':
+            count = await domain_blocklist.reload()
+            await update.message.reply_text(f"🔄 Блок-лист перезагружен: {count} доменов")
+        
+        else:
+            status = domain_blocklist.get_status()
+            sources = status['sources']
+            last_reload = status['last_reload'].strftime('%d.%m.%Y %H:%M') if status['last_reload'] else '—'
+            await update.message.reply_text(
+                f"🚫 Блок-лист доменов: {status['domains']}\n"
+                f"• Config: {sources['config']}\n"
+                f"• Файл: {sources['file']} ({status['file'] or 'не задан'})\n"
+                f"• База: {sources['db']}\n"
+                f"• Перезагружен: {last_reload}\n\n"
+                "📝 /blocklist add домен [причина]\n"
+                "📝 /blocklist del домен\n"
+                "📝 /blocklist check ссылка\n"
+                "📝 /blocklist reload"
+            )
+    except Exception as e:
+        logger.error(f"Error in blocklist command: {e}")
+        await update.message.reply_text(f"❌ Ошибка: {e}")
+
+
+ROLE_TITLES = {'admin': '🔱 Админ', 'moderator': '⚖️ Модератор'}
+
+def resolve_role_target(update: Update, value: str):
+    """ID, @username или ответ на сообщение -> user_id"""
+    if value and value.lstrip('-').isdigit():
+        return int(value)
+    if value:
+        user = get_user_by_username(value)
+        return user['id'] if user else None
+    reply = update.message.reply_to_message
+    return reply.from_user.id if reply and reply.from_user else None
+
+async def role_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Роли без перезапуска - /role [add|del|reload] ID|@username [admin|moderator]"""
+    if not Config.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    action = context.args[0].lower() if context.args else None
+    value = context.args[1] if len(context.args) > 1 else None
+    
+    try:
+        if action == 'add':
+            role = context.args[2].lower() if len(context.args) > 2 else 'moderator'
+            if role not in ROLES:
+                await update.message.reply_text("❌ Роль: admin или moderator")
+                return
+            user_id = resolve_role_target(update, value)
+            if not user_id:
+                await update.message.reply_text("❌ Пользователь не найден - укажите ID")
+                return
+            await role_registry.set_role(user_id, role, update.effective_user.id)
+            await update.message.reply_text(f"✅ {ROLE_TITLES[role]}: {user_id}")
+        
+        elif action == 'del':
+            user_id = resolve_role_target(update, value)
+            if not user_id:
+                await update.message.reply_text("❌ Пользователь не найден - укажите ID")
+                return
+            removed = await role_registry.remove_role(user_id)
+            env_role = role_registry.env_role(user_id)
+            if removed and not env_role:
+                await update.message.reply_text(f"✅ Роль снята: {user_id}")
+            elif env_role:
+                await update.message.reply_text(
+                    f"⚠️ {user_id}: роль {env_role} задана в ADMIN_IDS/MODERATOR_IDS - снимается только там"
+                )
+            else:
+                await update.message.reply_text("❌ У пользователя нет роли")
+        
+        elif action == 'reload':
+            await role_registry.reload()
+            await update.message.reply_text("🔄 Роли перезагружены")
+        
+        else:
+            lines = []
+            for user_id, role, source in role_registry.list_roles():
+                user = get_user_by_id(user_id)
+                name = f"@{user['username']}" if user else str(user_id)
+                lines.append(f"{ROLE_TITLES[role]}: {name} ({user_id}){' · env' if source == 'env' else ''}")
+            await update.message.reply_text(
+                "👑 Роли:\n" + ("\n".join(lines) or "—") + "\n\n"
+                "📝 /role add ID|@username [admin|moderator]\n"
+                "📝 /role del ID|@username\n"
+                "📝 /role reload"
+            )
+    except Exception as e:
+        logger.error(f"Error in role command: {e}")
+        await update.message.reply_text(f"❌ Ошибка: {e}")
+
+
 # ===============================
 # Вспомогательные функции для показа разделов
 # ===============================
@@ -429,9 +557,8 @@ async def show_stats(query, context):
     active_7d = sum(1 for data in user_data.values() if 
                    datetime.now() - data['last_activity'] <= timedelta(days=7))
     total_messages = sum(data['message_count'] for data in user_data.values())
-    banned_count = sum(1 for data in user_data.values() if data.get('banned'))
-    muted_count = sum(1 for data in user_data.values() if 
-                     data.get('muted_until') and data['muted_until'] > datetime.now())
+    banned_count = len(banned_ids)
+    muted_count = len(muted_ids)
     
     games_stats = ""
     for version in ['need', 'try', 'more']:
@@ -559,12 +686,12 @@ async def show_settings(query, context):
         f"📢 Канал: {Config.TARGET_CHANNEL_ID}\n"
         f"👮 Группа модерации: {Config.MODERATION_GROUP_ID}\n"
         f"🔧 Админская группа: {Config.ADMIN_GROUP_ID}\n"
-        f"👑 Админов: {len(Config.ADMIN_IDS)}\n"
-        f"👮 Модераторов: {len(Config.MODERATOR_IDS)}\n"
+        f"👑 Админов: {len(Config.ROLES.admins)}\n"
+        f"👮 Модераторов: {len(Config.ROLES.moderators - Config.ROLES.admins)}\n"
         f"⏱️ Кулдаун: {Config.COOLDOWN_SECONDS // 3600} часов\n"
         f"🔄 Автопост: {'✅ Включен' if Config.SCHEDULER_ENABLED else '❌ Выключен'}\n"
         f"📊 Статистика: каждые {Config.STATS_INTERVAL_HOURS} часов\n\n"
-        "Для изменения настроек используйте переменные окружения или .env файл"
+        "Для изменения настроек используйте переменные окружения или .env файл, роли - /role"
     )
     
     keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="admin:back")]]
@@ -606,13 +733,27 @@ async def show_autopost_info(query, context):
 
 async def show_logs(query, context):
     """Показать последние логи"""
+    from services.metrics import updates_total, telegram_api_429_total, handler_latency, user_data_size
+    
+    if Config.METRICS_ENABLED:
+        metrics_line = f"`http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics`"
+    else:
+        metrics_line = "выключены (METRICS_ENABLED=false)"
+    
     text = (
-        "📝 **ЛОГИ**\n\n"
-        "Последние действия системы:\n\n"
+        "📝 **ЛОГИ И МЕТРИКИ**\n\n"
+        f"📈 Метрики Prometheus: {metrics_line}\n\n"
+        f"• Апдейтов получено: {int(updates_total.total())}\n"
+        f"• Обработано хендлерами: {handler_latency.total_count()}\n"
+        f"• Ответов 429 от Telegram: {int(telegram_api_429_total.total())}\n"
+        f"• Пользователей в памяти: {int(user_data_size.get())}\n\n"
         "Для просмотра полных логов проверьте файлы на сервере или Railway logs.\n\n"
         "**Основные команды для мониторинга:**\n"
         "• `/stats` - статистика\n"
         "• `/sendstats` - отправить в админскую группу\n"
+        "• `/slowroutes` - медленные обработчики за час\n"
+        "• `/topscreens` - популярные экраны меню\n"
+        "• `/blocklist` - блок-лист доменов\n"
         "• `/banlist` - список забаненных\n"
         "• `/top` - топ пользователей"
     )
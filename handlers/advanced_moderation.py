@@ -3,6 +3,8 @@ from telegram.ext import ContextTypes
 from config import Config
 from data.user_data import user_data, get_user_by_username, get_user_by_id
 from utils.validators import parse_time
+from services.chat_settings import chat_settings
+from services.flood_control import flood_control
 from datetime import datetime, timedelta
 import logging
 import asyncio
@@ -105,6 +107,8 @@ async def slowmode_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
         )
         
+        await chat_settings.update(update.effective_chat.id, update.effective_user.id, slowmode=seconds)
+        
         if seconds > 0:
             await update.message.reply_text(
                 f"🐌 **Медленный режим включен**: {seconds} секунд между сообщениями",
@@ -142,6 +146,7 @@ async def noslowmode_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 can_invite_users=True
             )
         )
+        await chat_settings.update(update.effective_chat.id, update.effective_user.id, slowmode=0)
         await update.message.reply_text("✅ **Медленный режим отключен**", parse_mode='Markdown')
         logger.info(f"Slowmode disabled by {update.effective_user.id}")
         
@@ -189,6 +194,7 @@ async def lockdown_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     can_send_other_messages=True
                 )
             )
+            await chat_settings.update(chat_id, update.effective_user.id, lockdown_until=None)
             await update.message.reply_text("🔓 **Блокировка чата снята**", parse_mode='Markdown')
             logger.info(f"Lockdown disabled by {update.effective_user.id}")
         except Exception as e:
@@ -213,6 +219,11 @@ async def lockdown_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
         )
         
+        await chat_settings.update(
+            chat_id, update.effective_user.id,
+            lockdown_until=datetime.utcnow() + timedelta(seconds=time_seconds)
+        )
+        
         minutes = time_seconds // 60
         await update.message.reply_text(
             f"🔒 **Чат заблокирован на {minutes} минут**",
@@ -234,6 +245,7 @@ async def lockdown_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         can_send_other_messages=True
                     )
                 )
+                await chat_settings.update(chat_id, lockdown_until=None)
                 await context.bot.send_message(
                     chat_id=chat_id,
                     text="🔓 **Блокировка автоматически снята**",
@@ -270,23 +282,98 @@ async def antiinvite_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     if not context.args:
-        await update.message.reply_text("📝 Использование: `/antiinvite on/off`", parse_mode='Markdown')
+        rules = await chat_settings.get(update.effective_chat.id)
+        allowed = ", ".join(f"@{name}" for name in rules.allowed_links) or "нет"
+        await update.message.reply_text(
+            f"🛡️ Защита от приглашений: {'включена' if rules.antiinvite else 'выключена'}\n"
+            f"✅ Разрешены: {allowed}\n\n"
+            "📝 Использование: `/antiinvite on/off`\n"
+            "`/antiinvite allow username` - разрешить ссылки на чат/канал\n"
+            "`/antiinvite deny username` - убрать из разрешённых",
+            parse_mode='Markdown'
+        )
         return
     
     action = context.args[0].lower()
-    
-    from handlers.message_handler import chat_settings
+    chat_id = update.effective_chat.id
+    user_id = update.effective_user.id
     
     if action == 'on':
-        chat_settings['antiinvite'] = True
+        await chat_settings.update(chat_id, user_id, antiinvite=True)
         await update.message.reply_text("🛡️ **Защита от пригласительных ссылок включена**", parse_mode='Markdown')
-        logger.info(f"Antiinvite enabled by {update.effective_user.id}")
+        logger.info(f"Antiinvite enabled in {chat_id} by {user_id}")
     elif action == 'off':
-        chat_settings['antiinvite'] = False
+        await chat_settings.update(chat_id, user_id, antiinvite=False)
         await update.message.reply_text("✅ **Защита от пригласительных ссылок отключена**", parse_mode='Markdown')
-        logger.info(f"Antiinvite disabled by {update.effective_user.id}")
+        logger.info(f"Antiinvite disabled in {chat_id} by {user_id}")
+    elif action in ('allow', 'deny') and len(context.args) > 1:
+        name = context.args[1].lower().lstrip('@').replace('https://', '').replace('t.me/', '')
+        rules = await chat_settings.get(chat_id)
+        allowed = set(rules.allowed_links)
+        if action == 'allow':
+            allowed.add(name)
+        else:
+            allowed.discard(name)
+        await chat_settings.update(chat_id, user_id, allowed_links=sorted(allowed))
+        await update.message.reply_text(
+            f"✅ Ссылки на @{name} {'разрешены' if action == 'allow' else 'запрещены'}"
+        )
     else:
-        await update.message.reply_text("❌ Используйте `on` или `off`", parse_mode='Markdown')
+        await update.message.reply_text("❌ Используйте `on`, `off`, `allow` или `deny`", parse_mode='Markdown')
+
+async def antiflood_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Автоудаление флуда: N сообщений за окно -> удаление и временное ограничение"""
+    if not Config.is_admin(update.effective_user.id):
+        if update.effective_chat.type == 'private':
+            await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    if update.effective_chat.type == 'private':
+        await update.message.reply_text("❌ Эта команда работает только в группах")
+        return
+    
+    chat_id = update.effective_chat.id
+    
+    if not context.args:
+        rules = await chat_settings.get(chat_id)
+        status = flood_control.get_status()
+        current = (f"{rules.flood_limit} сообщений за {rules.flood_window} сек."
+                   if rules.flood_limit else "выключен")
+        await update.message.reply_text(
+            f"🌊 Антифлуд: {current}\n"
+            f"🐌 Медленный режим: {rules.slowmode} сек.\n"
+            f"👥 Отслеживается: {status['tracked']}, срабатываний: {status['flood']}\n\n"
+            "📝 Использование: `/antiflood сообщений [секунд]`\n"
+            "Пример: `/antiflood 5 10` (больше 5 сообщений за 10 секунд)\n"
+            "`/antiflood off` - отключить",
+            parse_mode='Markdown'
+        )
+        return
+    
+    if context.args[0].lower() == 'off':
+        await chat_settings.update(chat_id, update.effective_user.id, flood_limit=0)
+        flood_control.reset(chat_id)
+        await update.message.reply_text("✅ **Антифлуд отключен**", parse_mode='Markdown')
+        logger.info(f"Antiflood disabled in {chat_id} by {update.effective_user.id}")
+        return
+    
+    if not context.args[0].isdigit() or (len(context.args) > 1 and not context.args[1].isdigit()):
+        await update.message.reply_text("❌ Укажите число сообщений и, по желанию, окно в секундах")
+        return
+    
+    limit = int(context.args[0])
+    window = int(context.args[1]) if len(context.args) > 1 else 10
+    if limit < 2 or not 1 <= window <= 3600:
+        await update.message.reply_text("❌ Минимум 2 сообщения, окно от 1 до 3600 секунд")
+        return
+    
+    await chat_settings.update(chat_id, update.effective_user.id, flood_limit=limit, flood_window=window)
+    await update.message.reply_text(
+        f"🌊 **Антифлуд включен**: больше {limit} сообщений за {window} сек. - "
+        f"удаление и ограничение на {Config.FLOOD_MUTE_SECONDS // 60} мин.",
+        parse_mode='Markdown'
+    )
+    logger.info(f"Antiflood set to {limit}/{window}s in {chat_id} by {update.effective_user.id}")
 
 async def tagall_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Упомянуть всех участников"""
@@ -334,7 +421,8 @@ async def admins_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = "👑 **АДМИНИСТРАЦИЯ:**\n\n"
     
     text += "🔱 **Администраторы:**\n"
-    for admin_id in Config.ADMIN_IDS:
+    roles = Config.ROLES
+    for admin_id in sorted(roles.admins):
         user_info = get_user_by_id(admin_id)
         if user_info:
             text += f"• @{user_info['username']} (ID: {admin_id})\n"
@@ -342,8 +430,8 @@ async def admins_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text += f"• ID: {admin_id}\n"
     
     text += "\n⚖️ **Модераторы:**\n"
-    for mod_id in Config.MODERATOR_IDS:
-        if mod_id not in Config.ADMIN_IDS:  # Не дублируем админов
+    for mod_id in sorted(roles.moderators):
+        if mod_id not in roles.admins:  # Не дублируем админов
             user_info = get_user_by_id(mod_id)
             if user_info:
                 text += f"• @{user_info['username']} (ID: {mod_id})\n"
@@ -7,7 +7,7 @@ from data.user_data import (
     is_user_banned, lottery_participants
 )
 from services.admin_notifications import admin_notifications
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -61,8 +61,8 @@ async def whois_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             ban_date = user_data.get('banned_at', datetime.now()).strftime('%d.%m.%Y')
         
         mute_status = "Нет"
-        if user_data.get('muted_until') and user_data['muted_until'] > datetime.now():
-            mute_status = f"До {user_data['muted_until'].strftime('%d.%m.%Y %H:%M')}"
+        if user_data.get('muted_until') and user_data['muted_until'] > datetime.now(timezone.utc):
+            mute_status = f"До {user_data['muted_until'].astimezone().strftime('%d.%m.%Y %H:%M')}"
             if status == "✅ Активен":
                 status = "🔇 В муте"
         
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from services.render_cache import render_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать реферальные ссылки и бонусы"""
-    
+@render_cache.screen('bonus')
+def build_bonus():
+    """Реферальные ссылки и бонусы"""
     keyboard = [
         [InlineKeyboardButton("🎲 STAKE (Crypto Casino)", url="https://stake1071.com/ru?c=RooskenChister")],
         [InlineKeyboardButton("💥 BINANCE (до 100 USDT)", url="https://accounts.binance.com/register?ref=TRIXBONUS")],
@@ -51,17 +52,22 @@ async def bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         "👆 Нажмите на кнопку для перехода"
     )
+    return text, keyboard
+
+async def bonus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать реферальные ссылки и бонусы"""
+    screen = render_cache.get('bonus')
     
     if update.callback_query:
         await update.callback_query.edit_message_text(
-            text=text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            text=screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     else:
         await update.message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
 
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from config import Config
+from services.db import db
+from services.catalog_index import catalog_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def catalog_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Каталог услуг: район -> услуга -> анкеты"""
+    text, keyboard = build_districts_page()
+    await update.message.reply_text(text, reply_markup=keyboard)
+
+async def handle_catalog_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """catalog:home | catalog:d:<район> | catalog:p:<район>:<услуга>[:<курсор>]"""
+    query = update.callback_query
+    await query.answer()
+
+    parts = query.data.split(":")
+    action = parts[1] if len(parts) > 1 else "home"
+
+    try:
+        if action == "d":
+            district_id = int(parts[2])
+            text = f"🏘️ {catalog_index.district_title(district_id)}\n\nВыберите услугу:"
+            keyboard = catalog_index.professions_keyboard(district_id)
+        elif action == "p":
+            district_id, profession_id = int(parts[2]), int(parts[3])
+            cursor = int(parts[4]) if len(parts) > 4 else None
+            text, keyboard = await build_results_page(district_id, profession_id, cursor)
+        else:
+            text, keyboard = build_districts_page()
+    except (IndexError, ValueError):
+        logger.warning(f"Bad catalog callback: {query.data}")
+        return
+
+    await query.edit_message_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+def build_districts_page():
+    """Первый экран: районы, где есть анкеты"""
+    keyboard = catalog_index.districts_keyboard()
+    if not keyboard.inline_keyboard:
+        return "🙅 В каталоге пока нет анкет", None
+    return "🙅 Каталог услуг\n\nВыберите район:", keyboard
+
+async def build_results_page(district_id: int, profession_id: int, before_id: int = None):
+    """Анкеты пары район x услуга, новые первыми"""
+    title = f"{catalog_index.profession_title(profession_id)} · {catalog_index.district_title(district_id)}"
+    back = [InlineKeyboardButton("🔙 Услуги", callback_data=f"catalog:d:{district_id}")]
+
+    if not db.session_maker:
+        return "❌ База данных недоступна", InlineKeyboardMarkup([back])
+
+    try:
+        posts, cursor = await catalog_index.get_page(
+            district_id, profession_id, before_id, Config.CATALOG_PAGE_SIZE
+        )
+    except Exception as e:
+        logger.error(f"Error loading catalog page {district_id}x{profession_id}: {e}")
+        return "❌ Ошибка загрузки каталога", InlineKeyboardMarkup([back])
+
+    if not posts:
+        return f"🔍 {title}: анкет нет", InlineKeyboardMarkup([back])
+
+    text = f"🙅 {title}\n\n"
+    for post in posts:
+        snippet = (post['text'] or '').replace('\n', ' ')
+        if len(snippet) > 120:
+            snippet = snippet[:120] + "..."
+        name = f"{post['title']}: " if post['title'] else ""
+        text += f"👤 {name}{snippet}\n"
+        if post['link']:
+            text += f"🔗 {post['link']}\n"
+        text += "\n"
+
+    row = list(back)
+    if cursor:
+        row.append(InlineKeyboardButton(
+            "➡️ Дальше", callback_data=f"catalog:p:{district_id}:{profession_id}:{cursor}"
+        ))
+    return text, InlineKeyboardMarkup([row])
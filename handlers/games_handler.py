@@ -7,50 +7,24 @@ import random
 from datetime import datetime, timedelta
 
 from data.games_data import (
-    word_games, roll_games, user_attempts,
-    can_attempt, record_attempt,
-    normalize_word, get_unique_roll_number
+    word_games, roll_games, game_waiting, GAME_ALIASES,
+    add_winner, get_unique_roll_number
 )
+from services.guess_engine import guess_engine
+from services.roll_engine import RollPoolExhausted, roll_engine
 from data.user_data import update_user_activity, is_user_banned, is_user_muted
 
 logger = logging.getLogger(__name__)
 
-# Глобальное хранилище для waiting_for игр
-game_waiting = {}
-
-# Маппинг версий игр
-GAME_VERSIONS = {
-    'try': 'try',
-    'need': 'need', 
-    'more': 'more'
-}
-
-def get_game_version_from_command(command_text: str) -> str:
-    """Определяет версию игры из текста команды"""
-    command_lower = command_text.lower()
-    
-    if 'need' in command_lower:
-        return 'need'
-    elif 'more' in command_lower:
-        return 'more'
-    elif 'try' in command_lower:
-        return 'try'
-    
-    # По умолчанию try
-    return 'try'
-
 # ============= КОМАНДЫ УПРАВЛЕНИЯ СЛОВАМИ (АДМИН) =============
 
-async def wordadd_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordadd_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Добавить новое слово"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not context.args:
         text = f"🔧 АДМИНСКИЕ ИГРОВЫЕ КОМАНДЫ [{game_version.upper()}]:\n\n"
         text += "🎯 Управление словами:\n"
@@ -178,16 +152,13 @@ async def handle_game_media_input(update: Update, context: ContextTypes.DEFAULT_
     
     return False
 
-async def wordedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Редактировать слово"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if len(context.args) < 2:
         await update.message.reply_text(f"📝 Использование: /{game_version}edit слово новое_описание")
         return
@@ -207,16 +178,13 @@ async def wordedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📝 Новое описание: {new_description}"
     )
 
-async def wordon_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordon_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Включить режим конкурса"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not word_games[game_version]['words']:
         await update.message.reply_text(
             f"❌ Нет слов для игры {game_version.upper()}. Добавьте слова командой /{game_version}add"
@@ -230,6 +198,7 @@ async def wordon_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     word_games[game_version]['current_word'] = current_word
     word_games[game_version]['active'] = True
     word_games[game_version]['winners'] = []
+    guess_engine.start(game_version, current_word)
     
     description = word_games[game_version]['words'][current_word]['description']
     media = word_games[game_version]['words'][current_word].get('media', [])
@@ -258,17 +227,15 @@ async def wordon_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"⏰ Интервал между попытками: {word_games[game_version]['interval']} минут"
     )
 
-async def wordoff_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordoff_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Выключить режим конкурса"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     word_games[game_version]['active'] = False
+    guess_engine.stop(game_version)
     current_word = word_games[game_version]['current_word']
     winners = word_games[game_version]['winners']
     
@@ -285,11 +252,8 @@ async def wordoff_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"📋 Конкурс неактивен. Ожидайте новый конкурс."
     )
 
-async def wordinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Показать информацию о текущем слове"""
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not word_games[game_version]['active']:
         description = word_games[game_version].get('description', f"Конкурс {game_version.upper()} пока не активен")
         await update.message.reply_text(f"ℹ️ Информация [{game_version.upper()}]:\n\n📝 {description}")
@@ -325,11 +289,8 @@ async def wordinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await update.message.reply_text(f"❌ Нет активного слова в игре {game_version.upper()}")
 
-async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Попытка угадать слово"""
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not context.args:
         await update.message.reply_text(f"📝 Использование: /{game_version}slovo слово")
         return
@@ -348,20 +309,32 @@ async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Вы находитесь в муте")
         return
     
-    if not word_games[game_version]['active']:
+    # Проверка интервала, сравнение и выбор победителя - без await между ними
+    result = guess_engine.guess(
+        game_version, user_id, username, guess, word_games[game_version]['interval']
+    )
+    
+    if result.status == 'inactive':
         await update.message.reply_text(f"❌ Конкурс {game_version.upper()} неактивен")
         return
     
-    if not can_attempt(user_id, game_version):
+    if result.status == 'late':
+        await update.message.reply_text(
+            f"🏁 Слово в {game_version.upper()} уже угадал @{result.winner}. Ожидайте новый конкурс."
+        )
+        return
+    
+    if result.status == 'cooldown':
         interval = word_games[game_version]['interval']
         await update.message.reply_text(
             f"⏰ Вы можете делать попытку раз в {interval} минут в игре {game_version.upper()}"
         )
         return
     
-    record_attempt(user_id, game_version)
+    current_word = result.word
     
-    current_word = word_games[game_version]['current_word']
+    if result.status == 'winner':
+        add_winner(game_version, username)
     
     try:
         await context.bot.send_message(
@@ -376,10 +349,7 @@ async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.error(f"Error sending game notification: {e}")
     
-    if normalize_word(guess) == normalize_word(current_word):
-        word_games[game_version]['winners'].append(username)
-        word_games[game_version]['active'] = False
-        
+    if result.status == 'winner':
         await update.message.reply_text(
             f"🎉 ПОЗДРАВЛЯЕМ [{game_version.upper()}]!\n\n"
             f"@{username}, вы угадали слово '{current_word}' и стали победителем!\n\n"
@@ -405,11 +375,8 @@ async def game_say_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ============= РОЗЫГРЫШ =============
 
-async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Получить номер для участия в розыгрыше"""
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     user_id = update.effective_user.id
     username = update.effective_user.username or f"ID_{user_id}"
     
@@ -428,7 +395,13 @@ async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT
         await update.message.reply_text(f"@{username}, у вас уже есть номер в {game_version.upper()}: {existing_number}")
         return
     
-    number = get_unique_roll_number(game_version)
+    try:
+        number = get_unique_roll_number(game_version, user_id)
+    except RollPoolExhausted:
+        await update.message.reply_text(
+            f"😔 Все номера розыгрыша {game_version.upper()} уже разобраны"
+        )
+        return
     
     roll_games[game_version]['participants'][user_id] = {
         'username': username,
@@ -441,11 +414,8 @@ async def roll_participant_command(update: Update, context: ContextTypes.DEFAULT
         f"🎲 Участников: {len(roll_games[game_version]['participants'])}"
     )
 
-async def mynumber_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def mynumber_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Показать свой номер в розыгрыше"""
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     user_id = update.effective_user.id
     username = update.effective_user.username or f"ID_{user_id}"
     
@@ -461,16 +431,13 @@ async def mynumber_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # Фрагмент с исправленной функцией roll_draw_command
 
-async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Провести розыгрыш (админ) - ИСПРАВЛЕНО: отправляет уведомления победителям"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not context.args or not context.args[0].isdigit():
         await update.message.reply_text(
             f"📝 Использование: /{game_version}rollstart 3 (количество победителей 1-5)"
@@ -491,18 +458,12 @@ async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Генерируем выигрышное число
     winning_number = random.randint(1, 9999)
     
-    # Создаем список участников с их номерами
-    participants_list = [
-        (user_id, data['username'], data['number'])
-        for user_id, data in participants.items()
+    # Ближайшие к выигрышному числу номера - бинарным поиском по индексу номеров
+    winners = [
+        (user_id, participants[user_id]['username'], number)
+        for number, user_id in roll_engine.nearest(game_version, winning_number, winners_count)
     ]
     
-    # Сортируем по близости к выигрышному числу
-    participants_list.sort(key=lambda x: abs(x[2] - winning_number))
-    
-    # Выбираем победителей
-    winners = participants_list[:winners_count]
-    
     # Формируем текст с результатами
     winners_text = []
     medals = {1: "🥇", 2: "🥈", 3: "🥉"}
@@ -574,18 +535,16 @@ async def roll_draw_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     logger.info(f"Roll draw completed for {game_version}, {winners_count} winners notified")
 
-async def rollreset_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def rollreset_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Сбросить розыгрыш (админ)"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     participants_count = len(roll_games[game_version]['participants'])
     roll_games[game_version]['participants'] = {}
+    roll_engine.reset(game_version)
     
     await update.message.reply_text(
         f"✅ Розыгрыш {game_version.upper()} сброшен!\n\n"
@@ -593,16 +552,13 @@ async def rollreset_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"🆕 Новый розыгрыш готов к запуску"
     )
 
-async def rollstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def rollstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Статус розыгрыша (админ)"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     participants = roll_games[game_version]['participants']
     
     if not participants:
@@ -620,11 +576,8 @@ async def rollstatus_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 # ============= ИНФОРМАЦИОННЫЕ КОМАНДЫ =============
 
-async def gamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def gamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Информация об игровых командах для пользователей"""
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     text = f"🎮 ИГРОВЫЕ КОМАНДЫ [{game_version.upper()}]:\n\n"
     text += "🎯 Угадай слово:\n"
     text += f"• /{game_version}slovo слово - попытка угадать\n"
@@ -639,16 +592,13 @@ async def gamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(text)
 
-async def admgamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def admgamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Информация об игровых командах для админов"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     text = f"🔧 АДМИНСКИЕ ИГРОВЫЕ КОМАНДЫ [{game_version.upper()}]:\n\n"
     text += "🎯 Управление словами:\n"
     text += f"• /{game_version}add слово\n"
@@ -663,16 +613,13 @@ async def admgamesinfo_command(update: Update, context: ContextTypes.DEFAULT_TYP
 
     await update.message.reply_text(text)
 
-async def anstimeset_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def anstimeset_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Задать интервал между попытками"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not context.args or not context.args[0].isdigit():
         await update.message.reply_text(f"📝 Использование: /{game_version}timeset 60 (в минутах)")
         return
@@ -686,16 +633,13 @@ async def anstimeset_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         f"⏰ Новый интервал: {minutes} минут"
     )
 
-async def wordinfoedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordinfoedit_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Изменить описание конкурса (админ)"""
     if not Config.is_admin(update.effective_user.id):
         if update.effective_chat.type == 'private':
             await update.message.reply_text("❌ У вас нет прав для использования этой команды")
         return
     
-    command_text = update.message.text
-    game_version = get_game_version_from_command(command_text)
-    
     if not context.args:
         await update.message.reply_text(f"📝 Использование: /{game_version}infoedit новое описание")
         return
@@ -745,7 +689,7 @@ async def handle_game_callback(update: Update, context: ContextTypes.DEFAULT_TYP
             f"Используйте /{game_version}start для запуска конкурса"
         )
 
-async def wordclear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def wordclear_command(update: Update, context: ContextTypes.DEFAULT_TYPE, game_version: str):
     """Удалить слово (старая команда)"""
     await update.message.reply_text(
         "ℹ️ Команда переименована\n"
@@ -753,7 +697,46 @@ async def wordclear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Например: /needguide, /tryguide, /moreguide для справки"
     )
 
+# ============= ДИСПЕТЧЕР КОМАНД =============
+
+# Действие из GAME_ACTIONS / GAME_ALIASES -> обработчик (update, context, game_version)
+GAME_HANDLERS = {
+    'add': wordadd_command,
+    'edit': wordedit_command,
+    'start': wordon_command,
+    'stop': wordoff_command,
+    'info': wordinfo_command,
+    'infoedit': wordinfoedit_command,
+    'timeset': anstimeset_command,
+    'game': gamesinfo_command,
+    'guide': admgamesinfo_command,
+    'slovo': game_say_command,
+    'roll': roll_participant_command,
+    'rollstart': roll_draw_command,
+    'reroll': rollreset_command,
+    'rollstat': rollstatus_command,
+    'myroll': mynumber_command,
+    'clear': wordclear_command,
+}
+
+async def game_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Все игровые команды: версия и действие уже разобраны GAME_COMMAND_RE
+    (фильтр MessageHandler кладёт совпадение в context.matches)"""
+    version, action, alias, bot_username = context.matches[0].groups()
+    
+    # /needstart@OtherBot в группе - не нам
+    if bot_username and bot_username.lower() != (context.bot.username or '').lower():
+        return
+    
+    if alias:
+        version, action = GAME_ALIASES[alias.lower()]
+    
+    # Аргументы как у CommandHandler
+    context.args = update.message.text.split()[1:]
+    await GAME_HANDLERS[action.lower()](update, context, version.lower())
+
 __all__ = [
+    'game_command',
     'wordadd_command',
     'wordedit_command',
     'wordclear_command',
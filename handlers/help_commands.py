@@ -2,17 +2,16 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config import Config
+from services.render_cache import render_cache, role_of
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def trix_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать все доступные команды бота"""
-    user_id = update.effective_user.id
-    
-    # Определяем уровень доступа пользователя
-    is_admin = Config.is_admin(user_id)
-    is_moderator = Config.is_moderator(user_id)
+@render_cache.screen('trix_menu', per_role=True)
+def build_trix_menu(role: str):
+    """Меню разделов команд (набор разделов зависит от роли)"""
+    is_admin = role == 'admin'
+    is_moderator = role in ('admin', 'moderator')
     
     keyboard = [
         [
@@ -62,9 +61,24 @@ async def trix_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += f"⚙️ **Админ** - административные команды\n"
         text += f"📊 **Статистика** - команды статистики\n"
     
+    return text, keyboard
+
+async def trix_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать все доступные команды бота"""
+    screen = render_cache.get('trix_menu', role_of(update.effective_user.id))
+    
     await update.message.reply_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        screen.text,
+        reply_markup=screen.markup,
+        parse_mode='Markdown'
+    )
+
+async def edit_screen(update: Update, name: str, role: str = 'user'):
+    """Показать готовый экран вместо текущего сообщения"""
+    screen = render_cache.get(name, role)
+    await update.callback_query.edit_message_text(
+        screen.text,
+        reply_markup=screen.markup,
         parse_mode='Markdown'
     )
 
@@ -99,8 +113,9 @@ async def handle_trix_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     else:
         await query.answer("⚠️ Недоступно", show_alert=True)
 
-async def show_basic_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать базовые команды"""
+@render_cache.screen('trix_basic')
+def build_trix_basic():
+    """Базовые команды"""
     text = (
         "👤 **БАЗОВЫЕ КОМАНДЫ**\n\n"
         
@@ -112,7 +127,10 @@ async def show_basic_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
         
         "**Информация:**\n"
         "`/whois @username` - Информация о пользователе\n"
-        "`/trixlinks` - Полезные ссылки\n\n"
+        "`/trixlinks` - Полезные ссылки\n"
+        "`/tag #тег` - Посты по тегу\n"
+        "`/search` запрос - Поиск по постам и каталогу\n"
+        "`/catalog` - Каталог услуг по районам\n\n"
         
         "**Участие:**\n"
         "`/join` - Участвовать в розыгрыше\n"
@@ -128,15 +146,15 @@ async def show_basic_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_games_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать игровые команды"""
+async def show_basic_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать базовые команды"""
+    await edit_screen(update, 'trix_basic')
+
+@render_cache.screen('trix_games')
+def build_trix_games():
+    """Игровые команды"""
     text = (
         "🎮 **ИГРОВЫЕ КОМАНДЫ**\n\n"
         
@@ -167,15 +185,15 @@ async def show_games_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_medicine_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать команды медицины"""
+async def show_games_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать игровые команды"""
+    await edit_screen(update, 'trix_games')
+
+@render_cache.screen('trix_medicine')
+def build_trix_medicine():
+    """Команды медицины"""
     text = (
         "💊 **СПРАВОЧНИК ЛЕКАРСТВ**\n\n"
         
@@ -199,15 +217,15 @@ async def show_medicine_commands(update: Update, context: ContextTypes.DEFAULT_T
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_links_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать команды ссылок"""
+async def show_medicine_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать команды медицины"""
+    await edit_screen(update, 'trix_medicine')
+
+@render_cache.screen('trix_links')
+def build_trix_links():
+    """Команды ссылок"""
     text = (
         "🔗 **ПОЛЕЗНЫЕ ССЫЛКИ**\n\n"
         
@@ -230,15 +248,15 @@ async def show_links_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_moderation_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать команды модерации"""
+async def show_links_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать команды ссылок"""
+    await edit_screen(update, 'trix_links')
+
+@render_cache.screen('trix_moderation')
+def build_trix_moderation():
+    """Команды модерации"""
     text = (
         "👮 **КОМАНДЫ МОДЕРАЦИИ**\n\n"
         
@@ -257,6 +275,7 @@ async def show_moderation_commands(update: Update, context: ContextTypes.DEFAULT
         "`/slowmode` секунды - Медленный режим\n"
         "`/noslowmode` - Отключить slowmode\n"
         "`/lockdown` время - Блокировка чата\n"
+        "`/antiflood` N [сек] - Антифлуд\n"
         "`/admins` - Список администрации\n\n"
         
         "**Статистика:**\n"
@@ -271,22 +290,23 @@ async def show_moderation_commands(update: Update, context: ContextTypes.DEFAULT
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_admin_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать админские команды"""
+async def show_moderation_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать команды модерации"""
+    await edit_screen(update, 'trix_moderation')
+
+@render_cache.screen('trix_admin')
+def build_trix_admin():
+    """Админские команды"""
     text = (
         "⚙️ **АДМИНИСТРАТИВНЫЕ КОМАНДЫ**\n\n"
         
         "**Управление:**\n"
         "`/admin` - Админ-панель\n"
         "`/say` текст - Сообщение от бота\n"
-        "`/broadcast` текст - Рассылка всем\n\n"
+        "`/broadcast` текст - Рассылка всем\n"
+        "`/role` - Админы и модераторы (без перезапуска)\n\n"
         
         "**Ссылки:**\n"
         "`/trixlinksadd` - Добавить ссылку\n"
@@ -311,15 +331,15 @@ async def show_admin_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
 
-async def show_stats_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать команды статистики"""
+async def show_admin_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать админские команды"""
+    await edit_screen(update, 'trix_admin')
+
+@render_cache.screen('trix_stats')
+def build_trix_stats():
+    """Команды статистики"""
     text = (
         "📊 **КОМАНДЫ СТАТИСТИКИ**\n\n"
         
@@ -332,7 +352,9 @@ async def show_stats_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
         "`/channelstats` - Статистика каналов\n"
         "`/fullstats` - Полная статистика\n"
         "`/resetmsgcount` - Сбросить счетчики\n"
-        "`/chatinfo` - Информация о чате\n\n"
+        "`/chatinfo` - Информация о чате\n"
+        "`/slowroutes` N - Самые медленные обработчики за час\n"
+        "`/topscreens` - Популярные экраны меню\n\n"
         
         "**Что показывается:**\n"
         "• Количество подписчиков каналов\n"
@@ -346,70 +368,15 @@ async def show_stats_commands(update: Update, context: ContextTypes.DEFAULT_TYPE
     )
     
     keyboard = [[InlineKeyboardButton("🔙 Назад", callback_data="trix:back")]]
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    return text, keyboard
+
+async def show_stats_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать команды статистики"""
+    await edit_screen(update, 'trix_stats')
 
 async def show_main_trix_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать главное меню команд"""
-    user_id = update.effective_user.id
-    is_admin = Config.is_admin(user_id)
-    is_moderator = Config.is_moderator(user_id)
-    
-    keyboard = [
-        [
-            InlineKeyboardButton("👤 Базовые", callback_data="trix:basic"),
-            InlineKeyboardButton("🎮 Игры", callback_data="trix:games")
-        ],
-        [
-            InlineKeyboardButton("💊 Медицина", callback_data="trix:medicine"),
-            InlineKeyboardButton("🔗 Ссылки", callback_data="trix:links")
-        ]
-    ]
-    
-    if is_moderator:
-        keyboard.append([
-            InlineKeyboardButton("👮 Модерация", callback_data="trix:moderation")
-        ])
-    
-    if is_admin:
-        keyboard.append([
-            InlineKeyboardButton("⚙️ Админ", callback_data="trix:admin"),
-            InlineKeyboardButton("📊 Статистика", callback_data="trix:stats")
-        ])
-    
-    keyboard.append([InlineKeyboardButton("🔙 Главное меню", callback_data="menu:back")])
-    
-    user_role = ""
-    if is_admin:
-        user_role = " (Администратор)"
-    elif is_moderator:
-        user_role = " (Модератор)"
-    
-    text = (
-        f"📚 **КОМАНДЫ БОТА TRIX**{user_role}\n\n"
-        f"Выберите раздел для просмотра доступных команд:\n\n"
-        f"👤 **Базовые** - основные команды для всех\n"
-        f"🎮 **Игры** - игровые команды и розыгрыши\n"
-        f"💊 **Медицина** - справка по лекарствам\n"
-        f"🔗 **Ссылки** - полезные ссылки\n"
-    )
-    
-    if is_moderator:
-        text += f"👮 **Модерация** - команды модерации\n"
-    
-    if is_admin:
-        text += f"⚙️ **Админ** - административные команды\n"
-        text += f"📊 **Статистика** - команды статистики\n"
-    
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+    await edit_screen(update, 'trix_menu', role_of(update.effective_user.id))
 
 __all__ = [
     'trix_command',
@@ -1,5 +1,7 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from functools import partial
+from services.render_cache import render_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -108,9 +110,9 @@ MEDICINE_DATA = {
     }
 }
 
-async def hp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать список медикаментов с категориями"""
-    
+@render_cache.screen('hp_menu')
+def build_hp_menu():
+    """Меню категорий медикаментов"""
     keyboard = [
         [
             InlineKeyboardButton("💊 Обезболивающие", callback_data="hp:painkillers"),
@@ -140,10 +142,15 @@ async def hp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• Соблюдайте дозировки\n"
         "• Проверяйте противопоказания"
     )
+    return text, keyboard
+
+async def hp_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать список медикаментов с категориями"""
+    screen = render_cache.get('hp_menu')
     
     await update.message.reply_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        screen.text,
+        reply_markup=screen.markup,
         parse_mode='Markdown'
     )
 
@@ -164,14 +171,8 @@ async def handle_hp_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     else:
         await query.answer("Категория не найдена", show_alert=True)
 
-async def show_medicine_category(update: Update, context: ContextTypes.DEFAULT_TYPE, category: str):
-    """Показать конкретную категорию медикаментов"""
-    query = update.callback_query
-    
-    if category not in MEDICINE_DATA:
-        await query.answer("Категория не найдена", show_alert=True)
-        return
-    
+def build_medicine_category(category: str):
+    """Экран одной категории медикаментов"""
     cat_data = MEDICINE_DATA[category]
     
     text = f"**{cat_data['name']}**\n\n"
@@ -184,18 +185,33 @@ async def show_medicine_category(update: Update, context: ContextTypes.DEFAULT_T
     keyboard = [
         [InlineKeyboardButton("◀️ Назад к категориям", callback_data="hp:back")]
     ]
+    return text, keyboard
+
+# Каждая категория - отдельный готовый экран
+for category in MEDICINE_DATA:
+    render_cache.register(f"hp_{category}", partial(build_medicine_category, category))
+
+async def show_medicine_category(update: Update, context: ContextTypes.DEFAULT_TYPE, category: str):
+    """Показать конкретную категорию медикаментов"""
+    query = update.callback_query
+    
+    if category not in MEDICINE_DATA:
+        await query.answer("Категория не найдена", show_alert=True)
+        return
+    
+    screen = render_cache.get(f"hp_{category}")
     
     try:
         await query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error showing medicine category: {e}")
         await query.message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
 
@@ -256,46 +272,18 @@ async def show_medicine_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Показать меню выбора категорий"""
     query = update.callback_query
     
-    keyboard = [
-        [
-            InlineKeyboardButton("💊 Обезболивающие", callback_data="hp:painkillers"),
-            InlineKeyboardButton("🔴 ЖКТ", callback_data="hp:digestive")
-        ],
-        [
-            InlineKeyboardButton("🤧 Аллергия", callback_data="hp:allergy"),
-            InlineKeyboardButton("😷 Кашель", callback_data="hp:cough")
-        ],
-        [
-            InlineKeyboardButton("🗣️ Горло", callback_data="hp:throat"),
-            InlineKeyboardButton("👃 Насморк", callback_data="hp:nasal")
-        ],
-        [
-            InlineKeyboardButton("🩹 Кожа/Раны", callback_data="hp:skin"),
-            InlineKeyboardButton("➕ Прочие", callback_data="hp:other")
-        ],
-        [InlineKeyboardButton("📋 Все категории", callback_data="hp:all")]
-    ]
-    
-    text = (
-        "💊 **Препараты без рецепта в Венгрии**\n\n"
-        "Выберите категорию для просмотра:\n\n"
-        "⚠️ *Важно:*\n"
-        "• Консультируйтесь с врачом\n"
-        "• Читайте инструкции\n"
-        "• Соблюдайте дозировки\n"
-        "• Проверяйте противопоказания"
-    )
+    screen = render_cache.get('hp_menu')
     
     try:
         await query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error showing medicine menu: {e}")
         await query.message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
@@ -1,6 +1,7 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config import Config
+from services.render_cache import render_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,8 +45,9 @@ async def handle_menu_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.warning(f"Unknown menu action: {action}")
         await query.answer("Функция в разработке", show_alert=True)
 
-async def show_budapest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show Budapest category menu"""
+@render_cache.screen('budapest_menu')
+def build_budapest_menu():
+    """Меню поста в Будапешт"""
     keyboard = [
         [InlineKeyboardButton("📣 Объявления", callback_data="menu:announcements")],
         [InlineKeyboardButton("🔔 Новости", callback_data="menu:news")],
@@ -62,23 +64,29 @@ async def show_budapest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         "🔕 *Подслушано* - анонимные истории, сплетни, ситуации\n"
         "👑 *Жалобы* - анонимные недовольства и проблемы\n"
     )
+    return text, keyboard
+
+async def show_budapest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show Budapest category menu"""
+    screen = render_cache.get('budapest_menu')
     
     try:
         await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error in show_budapest_menu: {e}")
         await update.callback_query.message.reply_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
 
-async def show_announcements_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show announcements subcategories"""
+@render_cache.screen('announcements_menu')
+def build_announcements_menu():
+    """Подкатегории объявлений"""
     keyboard = [
         [
             InlineKeyboardButton("🕵🏻‍♀️ Куплю", callback_data="pub:cat:buy"),
@@ -103,18 +111,21 @@ async def show_announcements_menu(update: Update, context: ContextTypes.DEFAULT_
         "📣 *Объявления*\n\n"
         "Выберите подкатегорию:"
     )
+    return text, keyboard
+
+async def show_announcements_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show announcements subcategories"""
+    screen = render_cache.get('announcements_menu')
     
     await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        screen.text,
+        reply_markup=screen.markup,
         parse_mode='Markdown'
     )
-async def start_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start Services form (renamed from Piar)"""
-    context.user_data['piar_data'] = {}
-    context.user_data['waiting_for'] = 'piar_name'
-    context.user_data['piar_step'] = 'name'
-    
+
+@render_cache.screen('piar_intro')
+def build_piar_intro():
+    """Вступление к заявке в каталог услуг"""
     keyboard = [[InlineKeyboardButton("↩️ Назад", callback_data="menu:write")]]
 
     text = (
@@ -130,36 +141,29 @@ async def start_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "*Приступим к 1 из 8 шагу подачи заявки в Каталог Услуг:*\n\n"
         "💭 *Напишите своё имя, псевдоним, никнейм - как к Вам обращаться:*"
     )
+    return text, keyboard
+
+async def start_piar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start Services form (renamed from Piar)"""
+    context.user_data['piar_data'] = {}
+    context.user_data['waiting_for'] = 'piar_name'
+    context.user_data['piar_step'] = 'name'
     
-    try:
-        await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode='Markdown'
-        )
-    except Exception as e:
-        logger.error(f"Error in start_piar: {e}")
-        await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
+    screen = render_cache.get('piar_intro')
     
     try:
         await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error in start_piar: {e}")
         await update.callback_query.answer("Ошибка. Попробуйте позже", show_alert=True)
 
-async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Start Actual post creation - НОВЫЙ РАЗДЕЛ"""
-    context.user_data['post_data'] = {
-        'category': '⚡️Актуальное',
-        'subcategory': None,
-        'anonymous': False,
-        'is_actual': True  # Специальный флаг для актуального
-    }
-    
+@render_cache.screen('actual_intro')
+def build_actual_intro():
+    """Вступление к разделу Актуальное"""
     keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="menu:write")]]
     
     text = (
@@ -184,17 +188,23 @@ async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🔥 Публикуются исключительно *актуальные* и корректные сообщения❗️\n\n"
         "⚡️ *Введите свой текст ниже:*"
     )
+    return text, keyboard
 
-    await update.callback_query.edit_message_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode='Markdown'
-    )
+async def start_actual_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Start Actual post creation - НОВЫЙ РАЗДЕЛ"""
+    context.user_data['post_data'] = {
+        'category': '⚡️Актуальное',
+        'subcategory': None,
+        'anonymous': False,
+        'is_actual': True  # Специальный флаг для актуального
+    }
+    
+    screen = render_cache.get('actual_intro')
     
     try:
         await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
         context.user_data['waiting_for'] = 'post_text'
@@ -8,17 +8,61 @@ from data.user_data import (
 from data.links_data import add_link, edit_link
 from data.games_data import word_games
 from utils.validators import is_valid_url
+from services.chat_settings import chat_settings
+from services.flood_control import flood_control
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Настройки чата
-chat_settings = {
-    'slowmode': 0,
-    'antiinvite': False,
-    'lockdown': False,
-    'flood_limit': 0
-}
+async def enforce_chat_rules(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Правила чата из chat_settings: блокировка, приглашения, медленный режим, флуд
+
+    True - сообщение удалено, дальше не обрабатываем
+    """
+    message = update.effective_message
+    if not message or update.effective_chat.type == 'private':
+        return False
+    
+    rules = await chat_settings.get(update.effective_chat.id)
+    if not rules.active or Config.is_moderator(update.effective_user.id):
+        return False
+    
+    if rules.is_locked():
+        try:
+            await message.delete()
+        except:
+            pass
+        return True
+    
+    # Проверка на ссылки-приглашения (если включена защита)
+    if rules.has_invite(message.text or message.caption):
+        try:
+            await message.delete()
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="❌ Ссылки на другие чаты запрещены",
+                disable_notification=True
+            )
+        except:
+            pass
+        return True
+    
+    verdict = flood_control.check(update.effective_chat.id, update.effective_user.id, message.message_id, rules)
+    if verdict:
+        await flood_control.apply(context.bot, update.effective_chat.id, update.effective_user.id, verdict)
+        if verdict.reason == 'flood':
+            name = f"@{update.effective_user.username}" if update.effective_user.username else update.effective_user.first_name
+            try:
+                await context.bot.send_message(
+                    chat_id=update.effective_chat.id,
+                    text=f"🌊 {name} ограничен на {Config.FLOOD_MUTE_SECONDS // 60} мин. за флуд",
+                    disable_notification=True
+                )
+            except:
+                pass
+        return True
+    
+    return False
 
 async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработка всех текстовых сообщений"""
@@ -49,15 +93,9 @@ async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYP
         await handle_waiting_user_input(update, context, text)
         return
     
-    # Проверка на ссылки-приглашения (если включена защита)
-    if chat_settings.get('antiinvite') and ('t.me/' in text or 'telegram.me/' in text):
-        if not Config.is_admin(user_id):
-            try:
-                await update.message.delete()
-                await update.message.reply_text("❌ Ссылки на другие чаты запрещены", disable_notification=True)
-            except:
-                pass
-            return
+    # Правила чата: блокировка, ссылки-приглашения
+    if await enforce_chat_rules(update, context):
+        return
 
 async def handle_waiting_user_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Обработка ввода от пользователей в режиме ожидания"""
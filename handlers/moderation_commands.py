@@ -5,7 +5,7 @@ from config import Config
 from data.user_data import ban_user, unban_user, mute_user, unmute_user, get_banned_users, get_user_by_username, get_user_by_id, get_top_users, get_user_stats
 from services.admin_notifications import admin_notifications
 from utils.validators import parse_time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -385,7 +385,7 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Пользователь не найден")
         return
     
-    until = datetime.now() + timedelta(seconds=seconds)
+    until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
     mute_user(user_data['id'], until)
     
     await update.message.reply_text(f"✅ @{username} замучен на {time_str}")
@@ -6,10 +6,17 @@ Combines callback handlers and commands in one file
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from config import Config
-from data.user_data import ban_user, unban_user, mute_user, unmute_user, get_banned_users, get_user_by_username, get_user_by_id, get_top_users, get_user_stats
+from data.user_data import get_banned_users, get_user_by_username, get_user_by_id, get_top_users, get_user_stats
 from services.admin_notifications import admin_notifications
+from services.moderation_expiry import moderation_expiry
+from services.moderation_queue import moderation_queue, POST_REF_RE
+from services.publisher import post_publisher, PartialPublishError
+from services.duplicate_detector import duplicate_detector
+from services.post_tags import post_tags
+from services.search_index import search_index
+from services.catalog_index import catalog_index
 from utils.validators import parse_time
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,15 +34,15 @@ async def handle_moderation_callback(update: Update, context: ContextTypes.DEFAU
         await query.answer("❌ Доступ запрещен", show_alert=True)
         return
     
-    await query.answer()
-    
     data = query.data.split(":")
     action = data[1] if len(data) > 1 else None
     post_id = int(data[2]) if len(data) > 2 and data[2].isdigit() else None
     
     logger.info(f"Action: {action}, Post ID: {post_id}")
     
+    # Ответ на callback - после попытки взять заявку (отказ показывается алертом)
     if not post_id:
+        await query.answer()
         await query.edit_message_text("❌ Ошибка: ID поста не указан")
         return
     
@@ -45,54 +52,117 @@ async def handle_moderation_callback(update: Update, context: ContextTypes.DEFAU
         await start_approve_process(update, context, post_id, chat=True)
     elif action == "reject":
         await start_reject_process(update, context, post_id)
+    elif action == "publish":
+        await auto_publish(update, context, post_id, chat=False)
+    elif action == "publish_chat":
+        await auto_publish(update, context, post_id, chat=True)
+    else:
+        await query.answer()
 
-async def handle_moderation_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle text input from moderators"""
+async def handle_moderation_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Handle text input from moderators (True - сообщение относилось к заявке)"""
     user_id = update.effective_user.id
     
-    if not Config.is_moderator(user_id):
-        return
+    if not Config.is_moderator(user_id) or not update.message or not update.message.text:
+        return False
+    
+    reply = update.message.reply_to_message
+    reply_id = reply.message_id if reply else None
+    message_text = update.message.text.strip()
+    claim, text = moderation_queue.resolve(user_id, message_text, reply_id)
+    if not claim:
+        # "#ID" не своей заявки в ЛС - подсказать, а не применять к последней
+        match = POST_REF_RE.match(message_text)
+        if match and update.effective_chat.type == 'private' and moderation_queue.has_claims(user_id):
+            await update.message.reply_text(f"⚠️ Заявка #{match.group(1)} не закреплена за вами")
+            return True
+        return False
+    if claim.action not in ('approve', 'approve_chat', 'reject'):
+        return False
+    
+    # Без ответа на инструкцию или "#ID" текст относится к последней заявке -
+    # но только в ЛС и если модератор не заполняет свою форму
+    explicit = (reply_id is not None and reply_id == claim.prompt_message_id) or text != message_text
+    if not explicit and (update.effective_chat.type != 'private' or context.user_data.get('waiting_for')):
+        return False
+    
+    logger.info(f"Moderator {user_id} text for post {claim.post_id} ({claim.action})")
+    
+    if claim.action == 'reject':
+        await process_reject_with_reason(update, context, claim, text)
+    else:
+        await process_approve_with_link(update, context, claim, text)
+    return True
+
+async def claim_post(update: Update, post_id: int, action: str, answer: bool = True):
+    """Закрепить заявку за модератором; None - заявку взять нельзя (ответ уже показан)"""
+    query = update.callback_query
+    
+    from services.db import db
+    if not db.session_maker:
+        await query.answer("❌ БД недоступна", show_alert=True)
+        return None
+    
+    from models import Post, PostStatus
+    from sqlalchemy import select
+    
+    async with db.get_session() as session:
+        result = await session.execute(select(Post).where(Post.id == post_id))
+        post = result.scalar_one_or_none()
+    
+    if not post:
+        await query.answer("❌ Пост не найден", show_alert=True)
+        return None
     
-    waiting_for = context.user_data.get('mod_waiting_for')
-    logger.info(f"Moderator {user_id} waiting_for: {waiting_for}")
+    if post.status != PostStatus.PENDING:
+        await query.answer("ℹ️ Заявка уже обработана", show_alert=True)
+        return None
     
-    if waiting_for == 'approve_link':
-        await process_approve_with_link(update, context)
-    elif waiting_for == 'reject_reason':
-        await process_reject_with_reason(update, context)
+    moderator = update.effective_user
+    claim, holder = await moderation_queue.claim(
+        post_id, moderator.id, moderator.username, action, post.user_id, query.message
+    )
+    
+    if not claim:
+        holder_name = f"@{holder.moderator_name}" if holder and holder.moderator_name else "другой модератор"
+        await query.answer(f"⏳ Заявку уже обрабатывает {holder_name}", show_alert=True)
+        return None
+    
+    logger.info(f"✅ Post {post_id} claimed, user_id: {post.user_id}")
+    if answer:
+        await query.answer()
+    return claim
+
+async def send_instruction(update: Update, context: ContextTypes.DEFAULT_TYPE, claim, instruction: str):
+    """Инструкция модератору в ЛС (или в группу, если ЛС закрыты)"""
+    if len(moderation_queue.claims_of(claim.moderator_id)) > 1:
+        instruction += "\n\n↩️ В работе несколько заявок - ответьте на это сообщение"
+    
+    try:
+        msg = await context.bot.send_message(chat_id=update.effective_user.id, text=instruction)
+        logger.info(f"✅ Instruction sent, msg_id: {msg.message_id}")
+    except Exception as e:
+        logger.error(f"❌ PM failed: {e}")
+        try:
+            msg = await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text=f"@{update.effective_user.username}, напишите /start боту!\n\n{instruction}",
+                reply_to_message_id=update.callback_query.message.message_id
+            )
+        except:
+            return
+    
+    await moderation_queue.set_prompt(claim, msg.message_id)
 
 async def start_approve_process(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int, chat: bool = False):
     """Start approval process"""
     try:
         logger.info(f"{'='*50}\nSTART APPROVE: Post {post_id}, Chat: {chat}\n{'='*50}")
         
-        from services.db import db
-        if not db.session_maker:
-            await update.callback_query.answer("❌ БД недоступна", show_alert=True)
+        claim = await claim_post(update, post_id, 'approve_chat' if chat else 'approve')
+        if not claim:
             return
         
-        from models import Post
-        from sqlalchemy import select
-        
-        async with db.get_session() as session:
-            result = await session.execute(select(Post).where(Post.id == post_id))
-            post = result.scalar_one_or_none()
-            
-            if not post:
-                await update.callback_query.answer("❌ Пост не найден", show_alert=True)
-                return
-            
-            target_user_id = post.user_id
-            logger.info(f"✅ Post found, user_id: {target_user_id}")
-        
-        # Сохраняем в контекст
-        context.user_data['mod_post_id'] = post_id
-        context.user_data['mod_post_user_id'] = target_user_id
-        context.user_data['mod_waiting_for'] = 'approve_link'
-        context.user_data['mod_is_chat'] = chat
-        
-        logger.info(f"💾 Context saved: {context.user_data}")
-        
         destination = "чате (закрепить)" if chat else "канале"
         
         # Убираем кнопки
@@ -112,26 +182,14 @@ async def start_approve_process(update: Update, context: ContextTypes.DEFAULT_TY
         instruction = (
             f"✅ ОДОБРЕНИЕ\n\n"
             f"📊 Post ID: {post_id}\n"
-            f"👤 User ID: {target_user_id}\n"
+            f"👤 User ID: {claim.post_user_id}\n"
             f"📍 Публикация в: {destination}\n\n"
             f"📎 Отправьте ссылку на пост:\n"
             f"https://t.me/snghu/1234\n\n"
-            f"💡 Сначала опубликуйте вручную, затем ссылку"
+            f"💡 Сначала опубликуйте вручную, затем ссылку\n"
+            f"⌛ Заявка закреплена за вами на {Config.MODERATION_CLAIM_MINUTES} мин."
         )
-        
-        try:
-            msg = await context.bot.send_message(chat_id=update.effective_user.id, text=instruction)
-            logger.info(f"✅ Instruction sent, msg_id: {msg.message_id}")
-        except Exception as e:
-            logger.error(f"❌ PM failed: {e}")
-            try:
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=f"@{update.effective_user.username}, напишите /start боту!\n\n{instruction}",
-                    reply_to_message_id=update.callback_query.message.message_id
-                )
-            except:
-                pass
+        await send_instruction(update, context, claim, instruction)
         
         logger.info(f"{'='*50}\nAPPROVE STARTED\n{'='*50}")
         
@@ -143,32 +201,10 @@ async def start_reject_process(update: Update, context: ContextTypes.DEFAULT_TYP
     try:
         logger.info(f"{'='*50}\nSTART REJECT: Post {post_id}\n{'='*50}")
         
-        from services.db import db
-        if not db.session_maker:
-            await update.callback_query.answer("❌ БД недоступна", show_alert=True)
+        claim = await claim_post(update, post_id, 'reject')
+        if not claim:
             return
         
-        from models import Post
-        from sqlalchemy import select
-        
-        async with db.get_session() as session:
-            result = await session.execute(select(Post).where(Post.id == post_id))
-            post = result.scalar_one_or_none()
-            
-            if not post:
-                await update.callback_query.answer("❌ Пост не найден", show_alert=True)
-                return
-            
-            target_user_id = post.user_id
-            logger.info(f"✅ Post found, user_id: {target_user_id}")
-        
-        # Сохраняем в контекст
-        context.user_data['mod_post_id'] = post_id
-        context.user_data['mod_post_user_id'] = target_user_id
-        context.user_data['mod_waiting_for'] = 'reject_reason'
-        
-        logger.info(f"💾 Context saved: {context.user_data}")
-        
         # Убираем кнопки
         try:
             await update.callback_query.edit_message_reply_markup(reply_markup=None)
@@ -186,116 +222,220 @@ async def start_reject_process(update: Update, context: ContextTypes.DEFAULT_TYP
         instruction = (
             f"❌ ОТКЛОНЕНИЕ\n\n"
             f"📊 Post ID: {post_id}\n"
-            f"👤 User ID: {target_user_id}\n\n"
-            f"📝 Напишите причину (мин. 5 символов):"
+            f"👤 User ID: {claim.post_user_id}\n\n"
+            f"📝 Напишите причину (мин. 5 символов):\n"
+            f"⌛ Заявка закреплена за вами на {Config.MODERATION_CLAIM_MINUTES} мин."
         )
-        
-        try:
-            msg = await context.bot.send_message(chat_id=update.effective_user.id, text=instruction)
-            logger.info(f"✅ Instruction sent, msg_id: {msg.message_id}")
-        except Exception as e:
-            logger.error(f"❌ PM failed: {e}")
-            try:
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=f"@{update.effective_user.username}, напишите /start!\n\n{instruction}",
-                    reply_to_message_id=update.callback_query.message.message_id
-                )
-            except:
-                pass
+        await send_instruction(update, context, claim, instruction)
         
         logger.info(f"{'='*50}\nREJECT STARTED\n{'='*50}")
         
     except Exception as e:
         logger.error(f"❌ REJECT ERROR: {e}", exc_info=True)
 
-async def process_approve_with_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def process_approve_with_link(update: Update, context: ContextTypes.DEFAULT_TYPE, claim, link: str):
     """Process approval with link"""
     try:
-        link = update.message.text.strip()
-        post_id = context.user_data.get('mod_post_id')
-        user_id = context.user_data.get('mod_post_user_id')
-        is_chat = context.user_data.get('mod_is_chat', False)
+        post_id = claim.post_id
+        user_id = claim.post_user_id
+        is_chat = claim.action == 'approve_chat'
         
         logger.info(f"{'='*50}\nPROCESS APPROVE\nPost: {post_id}, User: {user_id}, Link: {link}\n{'='*50}")
         
-        if not post_id or not user_id:
-            await update.message.reply_text("❌ Данные не найдены")
+        # Продлеваем аренду; если она истекла и заявку взял другой - стоп
+        if not await moderation_queue.renew(claim):
+            await update.message.reply_text(f"⌛ Заявка #{post_id} больше не закреплена за вами")
             return
         
         if not link.startswith('https://t.me/'):
             await update.message.reply_text("❌ Неверный формат ссылки")
             return
         
-        # Обновляем статус
-        from services.db import db
-        from models import Post, PostStatus
-        from sqlalchemy import select
-        
-        async with db.get_session() as session:
-            result = await session.execute(select(Post).where(Post.id == post_id))
-            post = result.scalar_one_or_none()
-            
-            if not post:
-                await update.message.reply_text("❌ Пост не найден")
-                return
-            
-            post.status = PostStatus.APPROVED
-            await session.commit()
-            logger.info(f"✅ Post {post_id} approved")
+        post = await approve_post(post_id, link)
+        await moderation_queue.complete(claim)
         
-        destination_text = "чате" if is_chat else "канале"
+        if not post:
+            await update.message.reply_text("❌ Пост не найден")
+            return
         
-        # Уведомляем пользователя
-        try:
-            keyboard = [
-                [InlineKeyboardButton("📺 Перейти к посту", url=link)],
-                [InlineKeyboardButton("📢 Канал", url="https://t.me/snghu")]
-            ]
-            
-            user_msg = (
-                f"✅ Заявка одобрена!\n\n"
-                f"📝 Пост опубликован в {destination_text}\n\n"
-                f"🔗 {link}"
-            )
-            
-            await context.bot.send_message(
-                chat_id=user_id,
-                text=user_msg,
-                reply_markup=InlineKeyboardMarkup(keyboard)
-            )
-            
-            logger.info(f"✅ User {user_id} notified")
+        if await notify_approved(context, post, link, is_chat):
             await update.message.reply_text(f"✅ ОДОБРЕНО\n\nПользователь уведомлен\nPost: {post_id}")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to notify user: {e}")
+        else:
             await update.message.reply_text(f"⚠️ ОДОБРЕНО, но пользователь не уведомлен\nPost: {post_id}")
         
-        # Очищаем контекст
-        context.user_data.pop('mod_post_id', None)
-        context.user_data.pop('mod_post_user_id', None)
-        context.user_data.pop('mod_waiting_for', None)
-        context.user_data.pop('mod_is_chat', None)
-        
         logger.info(f"{'='*50}\nAPPROVE COMPLETED\n{'='*50}")
         
     except Exception as e:
         logger.error(f"❌ APPROVE PROCESS ERROR: {e}", exc_info=True)
         await update.message.reply_text(f"❌ Ошибка: {str(e)[:200]}")
 
-async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def approve_post(post_id: int, link: str = None):
+    """Статус APPROVED и индексы /tag, /search, /catalog (со ссылкой на публикацию); None - поста нет"""
+    from services.db import db
+    from models import Post, PostStatus
+    from sqlalchemy import select
+    
+    async with db.get_session() as session:
+        result = await session.execute(select(Post).where(Post.id == post_id))
+        post = result.scalar_one_or_none()
+        
+        if not post:
+            return None
+        
+        post.status = PostStatus.APPROVED
+        await session.commit()
+        logger.info(f"✅ Post {post_id} approved")
+        duplicate_detector.update_status(post_id, PostStatus.APPROVED)
+    
+    # Индексы для /tag, /search и /catalog
+    try:
+        await post_tags.index_post(post, link)
+    except Exception as e:
+        logger.error(f"Could not index tags for post {post_id}: {e}")
+    try:
+        await search_index.index_post(post)
+    except Exception as e:
+        logger.error(f"Could not index post {post_id} for search: {e}")
+    try:
+        await catalog_index.index_post(post)
+    except Exception as e:
+        logger.error(f"Could not add post {post_id} to catalog: {e}")
+    
+    return post
+
+async def notify_approved(context: ContextTypes.DEFAULT_TYPE, post, link: str, is_chat: bool) -> bool:
+    """Сообщить автору об одобрении со ссылкой на публикацию"""
+    destination_text = "чате" if is_chat else "канале"
+    
+    try:
+        keyboard = [
+            [InlineKeyboardButton("📺 Перейти к посту", url=link)],
+            [InlineKeyboardButton("📢 Канал", url="https://t.me/snghu")]
+        ]
+        
+        user_msg = (
+            f"✅ Заявка одобрена!\n\n"
+            f"📝 Пост опубликован в {destination_text}\n\n"
+            f"🔗 {link}"
+        )
+        
+        await context.bot.send_message(
+            chat_id=post.user_id,
+            text=user_msg,
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        
+        logger.info(f"✅ User {post.user_id} notified")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to notify user: {e}")
+        return False
+
+async def answer_query(query, text: str = None, show_alert: bool = False):
+    """Ответ на callback, который не роняет обработчик (запрос мог устареть)"""
+    try:
+        await query.answer(text, show_alert=show_alert)
+    except Exception as e:
+        logger.warning(f"Could not answer callback: {e}")
+
+async def auto_publish(update: Update, context: ContextTypes.DEFAULT_TYPE, post_id: int, chat: bool = False):
+    """Одобрить и опубликовать в один клик: пост собирается из БД, ссылка сохраняется сама"""
+    query = update.callback_query
+    moderator = update.effective_user.username or 'Unknown'
+    logger.info(f"{'='*50}\nAUTO PUBLISH: Post {post_id}, Chat: {chat}\n{'='*50}")
+    
+    # Закрепляем на время публикации - второй модератор не опубликует повторно
+    try:
+        claim = await claim_post(update, post_id, 'publish_chat' if chat else 'publish', answer=False)
+    except Exception as e:
+        logger.error(f"❌ AUTO PUBLISH ERROR: {e}", exc_info=True)
+        await answer_query(query, "❌ Ошибка", show_alert=True)
+        return
+    if not claim:
+        return
+    
+    from services.db import db
+    from models import Post, User
+    
+    partial_error = None
+    try:
+        async with db.get_session() as session:
+            post = await session.get(Post, post_id)
+            author = await session.get(User, post.user_id) if post else None
+        if not post:
+            raise LookupError("пост не найден")
+        published = await post_publisher.publish(post, author.username if author else None, to_chat=chat)
+    except PartialPublishError as e:
+        # Часть уже в канале - дальше как после публикации, повтор продублировал бы её
+        published, partial_error = e.published, e.error
+    except Exception as e:
+        # Ничего не отправлено - заявка снова доступна по кнопкам
+        logger.error(f"❌ Publish failed for post {post_id}: {e}", exc_info=True)
+        try:
+            await moderation_queue.complete(claim)
+        except Exception as complete_error:
+            logger.error(f"Could not release claim on post {post_id}: {complete_error}")
+        await answer_query(query, f"❌ Не удалось опубликовать: {str(e)[:150]}", show_alert=True)
+        return
+    
+    # Пост отправлен: статус, ссылка и снятие закрепления - при любом исходе
+    post = None
+    try:
+        post = await approve_post(post_id, published.link)
+    except Exception as e:
+        logger.error(f"❌ Post {post_id} published but not approved: {e}", exc_info=True)
+    finally:
+        try:
+            await moderation_queue.complete(claim)
+        except Exception as e:
+            logger.error(f"Could not release claim on post {post_id}: {e}")
+    
+    if post is not None:
+        notified = await notify_approved(context, post, published.link, chat)
+        await answer_query(query, "✅ Опубликовано" if partial_error is None else "⚠️ Опубликовано не полностью",
+                           show_alert=partial_error is not None)
+        status = f"✅ ОПУБЛИКОВАНО @{moderator}\n🔗 {published.link}"
+        if partial_error is not None:
+            status += f"\n⚠️ Отправлено не полностью, допубликуйте вручную: {str(partial_error)[:150]}"
+        if not notified:
+            status += "\n⚠️ Автор не уведомлен"
+        markup = None
+    else:
+        # Статус не сохранён: кнопок публикации больше нет, завершить - вручную по этой ссылке
+        await answer_query(query, "⚠️ Пост опубликован, но статус не сохранён - завершите вручную по ссылке",
+                           show_alert=True)
+        status = (
+            f"⚠️ ОПУБЛИКОВАНО @{moderator}, статус не сохранён\n"
+            f"🔗 {published.link}\n"
+            f"Нажмите «Вручную» и отправьте эту ссылку"
+        )
+        markup = InlineKeyboardMarkup([[InlineKeyboardButton(
+            "✍️ Вручную (по ссылке)", callback_data=f"mod:{'approve_chat' if chat else 'approve'}:{post_id}"
+        )]])
+    
+    try:
+        await query.edit_message_text(
+            text=f"{query.message.text}\n\n{status}",
+            reply_markup=markup,
+            disable_web_page_preview=True
+        )
+    except Exception as e:
+        logger.warning(f"Could not update moderation message for post {post_id}: {e}")
+    
+    logger.info(f"{'='*50}\nAUTO PUBLISH COMPLETED\n{'='*50}")
+
+async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAULT_TYPE, claim, reason: str):
     """Process rejection with reason"""
     try:
-        reason = update.message.text.strip()
-        post_id = context.user_data.get('mod_post_id')
-        user_id = context.user_data.get('mod_post_user_id')
+        post_id = claim.post_id
+        user_id = claim.post_user_id
         
         logger.info(f"{'='*50}\nPROCESS REJECT\nPost: {post_id}, User: {user_id}, Reason: {reason[:50]}\n{'='*50}")
         
-        if not post_id or not user_id:
-            logger.error(f"❌ Missing data - post: {post_id}, user: {user_id}")
-            await update.message.reply_text("❌ Данные не найдены")
+        # Продлеваем аренду; если она истекла и заявку взял другой - стоп
+        if not await moderation_queue.renew(claim):
+            await update.message.reply_text(f"⌛ Заявка #{post_id} больше не закреплена за вами")
             return
         
         if len(reason) < 5:
@@ -313,11 +453,15 @@ async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAU
             
             if not post:
                 await update.message.reply_text("❌ Пост не найден")
+                await moderation_queue.complete(claim)
                 return
             
             post.status = PostStatus.REJECTED
             await session.commit()
             logger.info(f"✅ Post {post_id} rejected")
+            duplicate_detector.update_status(post_id, PostStatus.REJECTED)
+        
+        await moderation_queue.complete(claim)
         
         # Уведомляем пользователя
         try:
@@ -339,11 +483,6 @@ async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAU
             logger.error(f"❌ Failed to notify user {user_id}: {e}", exc_info=True)
             await update.message.reply_text(f"⚠️ ОТКЛОНЕНО, но пользователь не уведомлен\nPost: {post_id}\nUser: {user_id}")
         
-        # Очищаем контекст
-        context.user_data.pop('mod_post_id', None)
-        context.user_data.pop('mod_post_user_id', None)
-        context.user_data.pop('mod_waiting_for', None)
-        
         logger.info(f"{'='*50}\nREJECT COMPLETED\n{'='*50}")
         
     except Exception as e:
@@ -353,25 +492,38 @@ async def process_reject_with_reason(update: Update, context: ContextTypes.DEFAU
 # ============= MODERATION COMMANDS =============
 
 async def ban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Ban user - /ban @username причина"""
+    """Ban user - /ban @username [1d] причина"""
     if not Config.is_moderator(update.effective_user.id):
         await update.message.reply_text("❌ Нет прав")
         return
     
     if not context.args:
-        await update.message.reply_text("📝 /ban @username причина")
+        await update.message.reply_text("📝 /ban @username [1d] причина")
         return
     
     username = context.args[0].lstrip('@')
-    reason = ' '.join(context.args[1:]) or "Не указана"
+    reason_args = context.args[1:]
+    
+    # Необязательный срок бана: 30m, 12h, 7d
+    until = None
+    time_str = None
+    if reason_args and reason_args[0][-1:].lower() in ('s', 'm', 'h', 'd'):
+        seconds = parse_time(reason_args[0])
+        if seconds:
+            time_str = reason_args[0]
+            until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+            reason_args = reason_args[1:]
+    
+    reason = ' '.join(reason_args) or "Не указана"
     
     user_data = get_user_by_username(username)
     if not user_data:
         await update.message.reply_text("❌ Пользователь не найден")
         return
     
-    ban_user(user_data['id'], reason)
-    await update.message.reply_text(f"✅ @{username} забанен\n📝 {reason}")
+    moderation_expiry.apply_ban(user_data['id'], reason, until)
+    duration = f" на {time_str}" if time_str else ""
+    await update.message.reply_text(f"✅ @{username} забанен{duration}\n📝 {reason}")
     
     await admin_notifications.notify_ban(
         username=username,
@@ -397,7 +549,7 @@ async def unban_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Пользователь не найден")
         return
     
-    unban_user(user_data['id'])
+    moderation_expiry.lift_ban(user_data['id'])
     await update.message.reply_text(f"✅ @{username} разбанен")
 
 async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -423,8 +575,8 @@ async def mute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Пользователь не найден")
         return
     
-    until = datetime.now() + timedelta(seconds=seconds)
-    mute_user(user_data['id'], until)
+    until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+    moderation_expiry.apply_mute(user_data['id'], until)
     await update.message.reply_text(f"✅ @{username} замучен на {time_str}")
 
 async def unmute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -444,7 +596,7 @@ async def unmute_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Пользователь не найден")
         return
     
-    unmute_user(user_data['id'])
+    moderation_expiry.lift_mute(user_data['id'])
     await update.message.reply_text(f"✅ @{username} размучен")
 
 async def banlist_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -3,6 +3,9 @@ from telegram.ext import ContextTypes
 from config import Config
 from services.db import db
 from models import User, Post, PostStatus  # <-- ДОБАВИТЬ PostStatus
+from services.duplicate_detector import duplicate_detector, document_text, post_document
+from services.chat_cache import chat_cache
+from services.callback_guard import submit_keys
 from sqlalchemy import select
 import logging
 
@@ -82,7 +85,7 @@ async def handle_piar_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     if action == "preview":
         await show_piar_preview(update, context)
     elif action == "send":
-        await send_piar_to_moderation(update, context)
+        await send_piar_to_moderation(update, context, data[2] if len(data) > 2 else None)
     elif action == "edit":
         await restart_piar_form(update, context)
     elif action == "cancel":
@@ -334,9 +337,13 @@ async def show_piar_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text += "#Услуги #КаталогУслуг\n\n"
     text += Config.DEFAULT_SIGNATURE
     
+    # Ключ идемпотентности: повторная отправка анкеты не создаст вторую заявку
+    if 'submit_key' not in data:
+        data['submit_key'] = submit_keys.new_key()
+    
     keyboard = [
         [
-            InlineKeyboardButton("✅ Отправить модератору", callback_data="piar:send"),
+            InlineKeyboardButton("✅ Отправить модератору", callback_data=f"piar:send:{data['submit_key']}"),
             InlineKeyboardButton("🔏 Редактировать", callback_data="piar:edit")
         ],
         [InlineKeyboardButton("🚗 Отмена", callback_data="piar:cancel")]
@@ -384,7 +391,7 @@ async def show_piar_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE, submit_key: str = None):
     """Send piar to moderation with safe DB handling"""
     user_id = update.effective_user.id
     data = context.user_data.get('piar_data', {})
@@ -399,6 +406,18 @@ async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_
             return
         
         async with db.get_session() as session:
+            # Повторная отправка той же анкеты - заявка уже создана
+            existing_id = await submit_keys.find(session, user_id, submit_key)
+            if existing_id:
+                context.user_data.pop('piar_data', None)
+                context.user_data.pop('waiting_for', None)
+                context.user_data.pop('piar_step', None)
+                await update.callback_query.edit_message_text(
+                    f"✅ Заявка #{existing_id} уже отправлена на модерацию!\n"
+                    "После проверки вам будет отправлен результат в личные сообщения."
+                )
+                return
+            
             # Get user
             result = await session.execute(
                 select(User).where(User.id == user_id)
@@ -412,6 +431,21 @@ async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_
                 )
                 return
             
+            # Почти-дубликат заявки на модерации или недавно отклонённой
+            if not Config.is_moderator(user_id):
+                duplicate = duplicate_detector.find_duplicate(document_text(
+                    data.get('name'), data.get('profession'), data.get('phone'), data.get('description')
+                ))
+                if duplicate:
+                    logger.info(f"Piar from {user_id} looks like #{duplicate.post_id} ({duplicate.similarity:.0%})")
+                    if Config.DUPLICATE_ACTION == 'reject':
+                        await update.callback_query.edit_message_text(
+                            "♻️ Похожая заявка уже есть на модерации или была недавно отклонена.\n"
+                            "Дождитесь решения модератора или измените описание"
+                        )
+                        return
+                    data['duplicate_of'] = (duplicate.post_id, duplicate.similarity)
+            
             # ИСПРАВЛЕНО: Безопасное создание поста с проверкой всех полей
             post_data = {
                 'user_id': int(user_id),  # Явно int
@@ -440,10 +474,13 @@ async def send_piar_to_moderation(update: Update, context: ContextTypes.DEFAULT_
             post_id = post.id  # Сохраняем ID
             logger.info(f"Created piar post with ID: {post_id}")
             
+            submit_keys.record(session, user_id, submit_key, post_id)
             await session.commit()
+            submit_keys.remember(user_id, submit_key, post_id)
             
             # Обновляем post из сессии
             await session.refresh(post)
+            duplicate_detector.add(post.id, user_id, post_document(post))
             
             # Send to moderation group
             await send_piar_to_mod_group_safe(update, context, post, user, data)
@@ -539,20 +576,22 @@ async def send_piar_to_mod_group_safe(update: Update, context: ContextTypes.DEFA
         description += "..."
     text += f"\n📝 Описание:\n{escape_markdown(description)}"
     
+    if data.get('duplicate_of'):
+        duplicate_id, score = data['duplicate_of']
+        text += f"\n\n♻️ Похоже на заявку #{duplicate_id} ({score:.0%})"
+    
     # ИСПРАВЛЕННЫЕ КНОПКИ - убираем кнопку "Написать автору" которая вызывает ошибку
     keyboard = [
         [
-            InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:approve:{post.id}"),
+            InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:publish:{post.id}"),
             InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
-        ]
+        ],
+        [InlineKeyboardButton("✍️ Вручную (по ссылке)", callback_data=f"mod:approve:{post.id}")]
     ]
     
     try:
-        # Проверяем доступность группы модерации
-        try:
-            await bot.get_chat(Config.MODERATION_GROUP_ID)
-        except Exception as e:
-            logger.error(f"Cannot access moderation group {Config.MODERATION_GROUP_ID}: {e}")
+        # Проверяем доступность группы модерации (кеш get_chat)
+        if not await chat_cache.is_reachable(Config.MODERATION_GROUP_ID):
             await bot.send_message(
                 chat_id=user.id,
                 text="⚠️ Группа модерации недоступна. Обратитесь к администратору."
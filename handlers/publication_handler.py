@@ -5,7 +5,10 @@ from config import Config
 from services.db import db
 from services.cooldown import CooldownService
 from services.hashtags import HashtagService
-from services.filter_service import FilterService
+from services.filter_service import filter_service
+from services.duplicate_detector import duplicate_detector
+from services.chat_cache import chat_cache
+from services.callback_guard import submit_keys
 from models import User, Post, PostStatus
 from sqlalchemy import select
 from datetime import datetime
@@ -28,7 +31,7 @@ async def handle_publication_callback(update: Update, context: ContextTypes.DEFA
     elif action == "preview":
         await show_preview(update, context)
     elif action == "send":
-        await send_to_moderation(update, context)
+        await send_to_moderation(update, context, data[2] if len(data) > 2 else None)
     elif action == "edit":
         await edit_post(update, context)
     elif action == "cancel":
@@ -84,10 +87,10 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Если ждём текст поста
         if context.user_data.get('waiting_for') == 'post_text':
-            # Проверяем на запрещённые ссылки
-            filter_service = FilterService()
-            if filter_service.contains_banned_link(text) and not Config.is_moderator(update.effective_user.id):
-                await handle_link_violation(update, context)
+            # Проверяем на запрещённые ссылки и слова
+            check = filter_service.scan(text, filter_service.extract_entity_urls(update.message))
+            if (check.banned_link or check.banned_keyword) and not Config.is_moderator(update.effective_user.id):
+                await handle_link_violation(update, context, check)
                 return
             
             # Сохраняем текст
@@ -95,6 +98,7 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 context.user_data['post_data'] = {}
             
             context.user_data['post_data']['text'] = text
+            context.user_data['post_data']['spam_reason'] = check.spam_reason
             context.user_data['post_data']['media'] = []
             
             # Сохраняем медиа
@@ -144,10 +148,10 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Text input received. waiting_for: {waiting_for}")
     
     if waiting_for == 'post_text':
-        # Check for links
-        filter_service = FilterService()
-        if filter_service.contains_banned_link(text) and not Config.is_moderator(update.effective_user.id):
-            await handle_link_violation(update, context)
+        # Check for links, keywords and spam in one pass
+        check = filter_service.scan(text, filter_service.extract_entity_urls(update.message))
+        if (check.banned_link or check.banned_keyword) and not Config.is_moderator(update.effective_user.id):
+            await handle_link_violation(update, context, check)
             return
         
         if 'post_data' not in context.user_data:
@@ -159,6 +163,7 @@ async def handle_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         context.user_data['post_data']['text'] = text
+        context.user_data['post_data']['spam_reason'] = check.spam_reason
         context.user_data['post_data']['media'] = []
         
         keyboard = [
@@ -272,6 +277,11 @@ async def show_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
             post_data.get('category'),
             post_data.get('subcategory')
         )
+    post_data['hashtags'] = hashtags
+    
+    # Ключ идемпотентности: повторная отправка черновика не создаст второй пост
+    if 'submit_key' not in post_data:
+        post_data['submit_key'] = submit_keys.new_key()
     
     # Build preview text
     preview_text = f"{post_data.get('text', '')}\n\n"
@@ -280,7 +290,7 @@ async def show_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     keyboard = [
         [
-            InlineKeyboardButton("📨 Отправить на модерацию", callback_data="pub:send"),
+            InlineKeyboardButton("📨 Отправить на модерацию", callback_data=f"pub:send:{post_data['submit_key']}"),
             InlineKeyboardButton("📝 Изменить", callback_data="pub:edit")
         ],
         [InlineKeyboardButton("🚗 Отмена", callback_data="pub:cancel")]
@@ -335,12 +345,12 @@ async def show_preview(update: Update, context: ContextTypes.DEFAULT_TYPE):
             reply_markup=InlineKeyboardMarkup(keyboard)
         )
 
-async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE, submit_key: str = None):
     """Send post to moderation with fixed cooldown check"""
     user_id = update.effective_user.id
     post_data = context.user_data.get('post_data')
     
-    if not post_data:
+    if not post_data and not submit_key:
         await update.callback_query.edit_message_text("💥 Данные поста не найдены")
         return
     
@@ -354,6 +364,21 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
             return
         
         async with db.get_session() as session:
+            # Повторная отправка того же черновика - пост уже создан
+            existing_id = await submit_keys.find(session, user_id, submit_key)
+            if existing_id:
+                context.user_data.pop('post_data', None)
+                context.user_data.pop('waiting_for', None)
+                await update.callback_query.edit_message_text(
+                    f"✅ Пост #{existing_id} уже отправлен на модерацию!\n"
+                    "⏹️ Ожидайте ссылку на свою публикацию в ЛС"
+                )
+                return
+            
+            if not post_data:
+                await update.callback_query.edit_message_text("💥 Данные поста не найдены")
+                return
+            
             # Get user
             result = await session.execute(
                 select(User).where(User.id == user_id)
@@ -386,6 +411,19 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 )
                 return
             
+            # Почти-дубликат заявки на модерации или недавно отклонённой
+            if not Config.is_moderator(user_id):
+                duplicate = duplicate_detector.find_duplicate(post_data.get('text', ''))
+                if duplicate:
+                    logger.info(f"Post from {user_id} looks like #{duplicate.post_id} ({duplicate.similarity:.0%})")
+                    if Config.DUPLICATE_ACTION == 'reject':
+                        await update.callback_query.edit_message_text(
+                            "♻️ Похожая заявка уже есть на модерации или была недавно отклонена.\n"
+                            "Дождитесь решения модератора или измените текст"
+                        )
+                        return
+                    post_data['duplicate_of'] = (duplicate.post_id, duplicate.similarity)
+            
             # ИСПРАВЛЕНО: Безопасное создание поста с проверкой полей
             create_post_data = {
                 'user_id': int(user_id),
@@ -407,10 +445,13 @@ async def send_to_moderation(update: Update, context: ContextTypes.DEFAULT_TYPE)
             post_id = post.id
             logger.info(f"Created post with ID: {post_id}")
             
+            submit_keys.record(session, user_id, submit_key, post_id)
             await session.commit()
+            submit_keys.remember(user_id, submit_key, post_id)
             
             # Обновляем post из сессии
             await session.refresh(post)
+            duplicate_detector.add(post.id, user_id, post.text)
             
             # Send to moderation
             await send_to_moderation_group(update, context, post, user)
@@ -487,6 +528,15 @@ async def send_to_moderation_group(update: Update, context: ContextTypes.DEFAULT
     if post.anonymous:
         mod_text += "\n🫆Анонимно"
     
+    # Подсказка модератору от фильтра спама
+    spam_reason = context.user_data.get('post_data', {}).get('spam_reason')
+    if spam_reason:
+        mod_text += f"\n⚠️ Фильтр: {spam_reason}"
+    
+    duplicate_of = context.user_data.get('post_data', {}).get('duplicate_of')
+    if duplicate_of:
+        mod_text += f"\n♻️ Похоже на заявку #{duplicate_of[0]} ({duplicate_of[1]:.0%})"
+    
     # ИСПРАВЛЕНИЕ: добавляем проверку на None для медиа
     media_count = 0
     if post.media:
@@ -513,27 +563,27 @@ async def send_to_moderation_group(update: Update, context: ContextTypes.DEFAULT
             logger.warning(f"Invalid hashtags data for post {post.id}: {post.hashtags}")
     
     # ИСПРАВЛЕНИЕ: убираем кнопку "Редактировать" которая не реализована
+    # Публикация ботом в один клик; "Вручную" - прежний вариант со ссылкой от модератора
     if is_actual:
         keyboard = [
             [
-                InlineKeyboardButton("✅ В ЧАТ + ЗАКРЕПИТЬ", callback_data=f"mod:approve_chat:{post.id}"),
+                InlineKeyboardButton("✅ В ЧАТ + ЗАКРЕПИТЬ", callback_data=f"mod:publish_chat:{post.id}"),
                 InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
-            ]
+            ],
+            [InlineKeyboardButton("✍️ Вручную (по ссылке)", callback_data=f"mod:approve_chat:{post.id}")]
         ]
     else:
         keyboard = [
             [
-                InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:approve:{post.id}"),
+                InlineKeyboardButton("✅ Опубликовать", callback_data=f"mod:publish:{post.id}"),
                 InlineKeyboardButton("❌ Отклонить", callback_data=f"mod:reject:{post.id}")
-            ]
+            ],
+            [InlineKeyboardButton("✍️ Вручную (по ссылке)", callback_data=f"mod:approve:{post.id}")]
         ]
     
     try:
-        # Проверяем доступность группы модерации
-        try:
-            await bot.get_chat(target_group)
-        except Exception as chat_error:
-            logger.error(f"Cannot access moderation group {target_group}: {chat_error}")
+        # Проверяем доступность группы модерации (кеш get_chat)
+        if not await chat_cache.is_reachable(target_group):
             await bot.send_message(
                 chat_id=user.id,
                 text="⚠️ Группа модерации недоступна. Обратитесь к администратору."
@@ -654,12 +704,18 @@ async def cancel_post_with_reason(update: Update, context: ContextTypes.DEFAULT_
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
-async def handle_link_violation(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle link violation"""
-    await update.message.reply_text(
-        "🚫 Обнаружена запрещенная ссылка!\n"
-        "Ссылки запрещены в публикациях."
-    )
+async def handle_link_violation(update: Update, context: ContextTypes.DEFAULT_TYPE, check=None):
+    """Handle link or banned keyword violation"""
+    if check and check.banned_keyword and not check.banned_link:
+        await update.message.reply_text(
+            "🚫 Обнаружено запрещенное слово!\n"
+            "Измените текст публикации."
+        )
+    else:
+        await update.message.reply_text(
+            "🚫 Обнаружена запрещенная ссылка!\n"
+            "Ссылки запрещены в публикациях."
+        )
     context.user_data.pop('waiting_for', None)
 
 async def edit_post(update: Update, context: ContextTypes.DEFAULT_TYPE):
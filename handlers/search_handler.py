@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from config import Config
+from services.search_index import search_index
+from services.post_tags import post_tags
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск по опубликованным постам и каталогу услуг: /search маникюр XIII"""
+    if not context.args:
+        await update.message.reply_text(
+            "📝 Использование: `/search запрос`\n"
+            "Пример: `/search маникюр XIII`",
+            parse_mode='Markdown'
+        )
+        return
+
+    query = ' '.join(context.args)[:200]
+    # Запрос хранится у пользователя - в callback_data только смещение
+    context.user_data['search_query'] = query
+
+    text, keyboard = await build_search_page(query)
+    await update.message.reply_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+async def handle_search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Переход по страницам: search:<смещение>"""
+    query = update.callback_query
+    await query.answer()
+
+    search_query = context.user_data.get('search_query')
+    if not search_query:
+        await query.edit_message_text("⏱ Поиск устарел, повторите /search")
+        return
+
+    offset = int(query.data.split(":")[1])
+    text, keyboard = await build_search_page(search_query, offset)
+    await query.edit_message_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+async def build_search_page(search_query: str, offset: int = 0):
+    """Текст и клавиатура одной страницы результатов"""
+    limit = Config.SEARCH_PAGE_SIZE
+    try:
+        post_ids, has_more = await search_index.search(search_query, offset, limit)
+        posts = await post_tags.get_posts(post_ids)
+    except Exception as e:
+        logger.error(f"Search error for '{search_query}': {e}")
+        return "❌ Ошибка поиска", None
+
+    if not posts:
+        return f"🔍 По запросу «{search_query}» ничего не найдено", None
+
+    text = f"🔍 Результаты по запросу «{search_query}»:\n\n"
+    for number, post in enumerate(posts, offset + 1):
+        snippet = (post['text'] or '').replace('\n', ' ')
+        if len(snippet) > 150:
+            snippet = snippet[:150] + "..."
+        title = f"{post['title']}: " if post['title'] else ""
+        text += f"{number}. {title}{snippet}\n"
+        if post['link']:
+            text += f"🔗 {post['link']}\n"
+        text += "\n"
+
+    buttons = []
+    if offset > 0:
+        buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"search:{max(0, offset - limit)}"))
+    if has_more:
+        buttons.append(InlineKeyboardButton("➡️ Дальше", callback_data=f"search:{offset + limit}"))
+
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
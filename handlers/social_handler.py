@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from services.render_cache import render_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def social_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Показать социальные сети TRIX"""
-    
+@render_cache.screen('social')
+def build_social():
+    """Социальные сети TRIX"""
     keyboard = [
         [InlineKeyboardButton("🧢 Instagram", url="https://www.instagram.com/budapesttrix?igsh=ZXlrNmo4NDdyN2Vz&utm_source=qr")],
         [InlineKeyboardButton("🔷 Facebook Group", url="https://www.facebook.com/share/g/1EKwURtZ13/?mibextid=wwXIfr")],
@@ -36,10 +37,15 @@ async def social_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         "👆 Нажмите на кнопку чтобы перейти"
     )
+    return text, keyboard
+
+async def social_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать социальные сети TRIX"""
+    screen = render_cache.get('social')
     
     await update.message.reply_text(
-        text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        screen.text,
+        reply_markup=screen.markup,
         parse_mode='Markdown'
     )
 
@@ -1,6 +1,6 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from config import Config
+from services.render_cache import render_cache
 import logging
 import secrets
 import string
@@ -13,16 +13,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = update.effective_user.username
     first_name = update.effective_user.first_name
     last_name = update.effective_user.last_name
-    chat_id = update.effective_chat.id
     
-    # ✅ КРИТИЧНО: Игнорируем команду в Будапешт чате
-    if chat_id == Config.BUDAPEST_CHAT_ID:
-        try:
-            await update.message.delete()
-            logger.info(f"Deleted /start from Budapest chat, user {user_id}")
-        except Exception as e:
-            logger.error(f"Could not delete /start: {e}")
-        return
+    # Будапешт-чат сюда не доходит: /start там удаляет services/update_filter.py
     
     # Пытаемся сохранить пользователя в БД, но не падаем если ошибка
     try:
@@ -60,15 +52,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Always show main menu (только в ЛС или разрешенных чатах)
     await show_main_menu(update, context)
 
-async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show new main menu design"""
-    
-    # ✅ КРИТИЧНО: Не показываем меню в Будапешт чате
-    chat_id = update.effective_chat.id
-    if chat_id == Config.BUDAPEST_CHAT_ID:
-        logger.info(f"Blocked main menu in Budapest chat")
-        return
-    
+@render_cache.screen('main_menu')
+def build_main_menu():
+    """Главное меню"""
     keyboard = [
         [InlineKeyboardButton("🙅‍♂️ Будапешт - канал", url="https://t.me/snghu")],
         [InlineKeyboardButton("🙅‍♀️ Будапешт - чат", url="https://t.me/tgchatxxx")],
@@ -93,18 +79,23 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     "🏹Быстро•⚔️Удобно•🛡️Безопасно•\n\n"
     "🔒 *Добавляйте Трикса в закрепленные*"
 )
+    return text, keyboard
+
+async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show new main menu design"""
+    screen = render_cache.get('main_menu')
     
     try:
         if update.callback_query:
             await update.callback_query.edit_message_text(
-                text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                screen.text,
+                reply_markup=screen.markup,
                 parse_mode='Markdown'
             )
         else:
             await update.effective_message.reply_text(
-                text,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                screen.text,
+                reply_markup=screen.markup,
                 parse_mode='Markdown'
             )
     except Exception as e:
@@ -113,7 +104,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.effective_message.reply_text(
                 "TrixBot - топ комьюнити Будапешта и 🇭🇺\n\n"
                 "Нажмите 'Писать' чтобы создать публикацию",
-                reply_markup=InlineKeyboardMarkup(keyboard)
+                reply_markup=screen.markup
             )
         except Exception as e2:
             logger.error(f"Fallback menu also failed: {e2}")
@@ -121,9 +112,9 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "Бот запущен! Используйте /start для перезапуска."
             )
 
-async def show_write_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Show write menu with publication types"""
-    
+@render_cache.screen('write_menu')
+def build_write_menu():
+    """Меню выбора раздела публикации"""
     keyboard = [
         [InlineKeyboardButton("Пост в 🙅‍♂️Будапешт/🕵🏼‍♀️КОП", callback_data="menu:budapest")],
         [InlineKeyboardButton("Заявка в 🙅Каталог Услуг", callback_data="menu:services")],
@@ -152,18 +143,23 @@ async def show_write_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     "      • в поиске 👷🏽 на завтра — оплата в конце дня\n"
     "*🚶‍♀️ Читать* — возврат в главное меню"
 )
+    return text, keyboard
+
+async def show_write_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show write menu with publication types"""
+    screen = render_cache.get('write_menu')
     
     try:
         await update.callback_query.edit_message_text(
-            text,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            screen.text,
+            reply_markup=screen.markup,
             parse_mode='Markdown'
         )
     except Exception as e:
         logger.error(f"Error showing write menu: {e}")
         await update.callback_query.edit_message_text(
             "Выберите раздел публикации:",
-            reply_markup=InlineKeyboardMarkup(keyboard)
+            reply_markup=screen.markup
         )
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -4,6 +4,9 @@ from telegram.ext import ContextTypes
 from config import Config
 from services.channel_stats import channel_stats
 from services.admin_notifications import admin_notifications
+from services.tracing import tracing
+from services.render_cache import render_cache
+from services.chat_cache import chat_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -84,6 +87,12 @@ async def chatinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         chat = update.effective_chat
         
+        # Полная информация (описание и т.п.) есть только в get_chat
+        try:
+            chat = await chat_cache.get(chat.id)
+        except Exception as e:
+            logger.warning(f"Could not get chat info for {chat.id}: {e}")
+        
         # Получаем количество участников если возможно
         try:
             member_count = await context.bot.get_chat_member_count(chat.id)
@@ -110,9 +119,65 @@ async def chatinfo_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Error in chatinfo command: {e}")
         await update.message.reply_text(f"❌ Ошибка: {e}")
 
+async def slowroutes_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Топ самых медленных обработчиков за последний час (админы)"""
+    if not Config.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    limit = 10
+    if context.args and context.args[0].isdigit():
+        limit = max(1, min(int(context.args[0]), 30))
+    
+    routes = tracing.get_slowest_routes(limit)
+    
+    if not routes:
+        await update.message.reply_text("🐢 За последний час нет данных о времени обработки")
+        return
+    
+    message = f"🐢 **Самые медленные обработчики за час (топ {len(routes)}):**\n\n"
+    for i, stats in enumerate(routes, 1):
+        message += (
+            f"{i}. `{stats['route']}`\n"
+            f"   max {stats['max'] * 1000:.0f}ms • avg {stats['avg'] * 1000:.0f}ms • "
+            f"{stats['count']} раз\n"
+            f"   DB {stats['db'] / stats['count'] * 1000:.0f}ms • "
+            f"API {stats['api'] / stats['count'] * 1000:.0f}ms (в среднем)\n"
+        )
+    
+    message += f"\n⏱ Порог лога медленных апдейтов: {Config.SLOW_HANDLER_MS}ms"
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+
+async def topscreens_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Самые открываемые экраны меню из кеша (админы)"""
+    if not Config.is_admin(update.effective_user.id):
+        await update.message.reply_text("❌ У вас нет прав для использования этой команды")
+        return
+    
+    screens = render_cache.top_screens(15)
+    status = render_cache.get_status()
+    
+    if not screens:
+        await update.message.reply_text("📋 Экраны меню ещё не открывали")
+        return
+    
+    message = f"📋 **Популярные экраны (топ {len(screens)}):**\n\n"
+    for i, (name, hits) in enumerate(screens, 1):
+        message += f"{i}. `{name}` - {hits}\n"
+    
+    message += (
+        f"\n🗂 В кеше: {status['cached']} из {status['registered']} экранов, "
+        f"сборок: {status['builds']}, показов: {status['hits']}"
+    )
+    
+    await update.message.reply_text(message, parse_mode='Markdown')
+
 __all__ = [
     'channelstats_command',
     'fullstats_command',
     'resetmsgcount_command',
-    'chatinfo_command'
+    'chatinfo_command',
+    'slowroutes_command',
+    'topscreens_command'
 ]
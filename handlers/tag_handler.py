@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+from config import Config
+from services.post_tags import post_tags, normalize_tag
+import logging
+
+logger = logging.getLogger(__name__)
+
+async def tag_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Последние опубликованные посты по тегу: /tag #Работа"""
+    if not context.args:
+        await update.message.reply_text(
+            "📝 Использование: `/tag #тег`\n"
+            "Пример: `/tag #Работа`",
+            parse_mode='Markdown'
+        )
+        return
+
+    tag = normalize_tag(context.args[0])
+    if not tag:
+        await update.message.reply_text("❌ Неверный тег")
+        return
+
+    text, keyboard = await build_tag_page(tag)
+    await update.message.reply_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+async def handle_tag_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Следующая страница: tag:<тег>:<курсор>"""
+    query = update.callback_query
+    await query.answer()
+
+    _, tag, cursor = query.data.split(":", 2)
+    text, keyboard = await build_tag_page(tag, int(cursor))
+    await query.edit_message_text(text, reply_markup=keyboard, disable_web_page_preview=True)
+
+async def build_tag_page(tag: str, before_id: int = None):
+    """Текст и клавиатура одной страницы"""
+    try:
+        post_ids, cursor = await post_tags.get_page_ids(tag, before_id, Config.TAG_PAGE_SIZE)
+        posts = await post_tags.get_posts(post_ids)
+    except Exception as e:
+        logger.error(f"Error loading tag page {tag}: {e}")
+        return "❌ Ошибка загрузки постов", None
+
+    if not posts:
+        return f"🔍 По тегу #{tag} опубликованных постов нет", None
+
+    text = f"#️⃣ Посты по тегу #{tag}:\n\n"
+    for post in posts:
+        snippet = (post['text'] or '').replace('\n', ' ')
+        if len(snippet) > 120:
+            snippet = snippet[:120] + "..."
+        title = f"{post['title']}: " if post['title'] else ""
+        date = post['created_at'].strftime('%d.%m.%Y') if post['created_at'] else ''
+        text += f"📅 {date} {title}{snippet}\n"
+        if post['link']:
+            text += f"🔗 {post['link']}\n"
+        text += "\n"
+
+    keyboard = None
+    callback_data = f"tag:{tag}:{cursor}"
+    # callback_data ограничена 64 байтами - для очень длинных тегов без кнопки
+    if cursor and len(callback_data.encode()) <= 64:
+        keyboard = InlineKeyboardMarkup([[
+            InlineKeyboardButton("➡️ Дальше", callback_data=callback_data)
+        ]])
+
+    return text, keyboard
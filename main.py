@@ -1,81 +1,57 @@
 # -*- coding: utf-8 -*-
-import logging
 import asyncio
-import os
+import logging
+import importlib
 import sys
-from dotenv import load_dotenv
-
-# ✅ КРИТИЧНО: Загружаем переменные окружения ДО всего остального
-load_dotenv()
-
-# ============= ПРОВЕРКА КОНФИГУРАЦИИ =============
-print("=" * 70)
-print("🔍 ПРОВЕРКА КОНФИГУРАЦИИ")
-print("=" * 70)
-
-bot_token = os.getenv("BOT_TOKEN")
-database_url = os.getenv("DATABASE_URL", "sqlite:///./trixbot.db")
-admin_ids = os.getenv("ADMIN_IDS", "")
-
-print(f"✅ BOT_TOKEN: {'✅ есть' if bot_token else '❌ НЕТ!'}")
-print(f"✅ DATABASE_URL: {database_url[:60]}...")
-print(f"✅ ADMIN_IDS: {admin_ids[:50] if admin_ids else '❌ НЕТ!'}")
-
-if not bot_token:
-    print("\n❌ ОШИБКА: BOT_TOKEN не установлена!")
-    sys.exit(1)
-
-print("=" * 70 + "\n")
+from typing import Optional
 
 # ============= ИМПОРТЫ =============
 from telegram import Update
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, 
-    CallbackQueryHandler, filters, ContextTypes
+    CallbackQueryHandler, ChatMemberHandler, filters, ContextTypes
 )
 from config import Config
 
-# Handlers
+# Handlers: меню, заявки и модерация нужны с первого апдейта - импортируем сразу,
+# остальные модули загружаются при первом вызове (см. lazy_handlers ниже)
 from handlers.start_handler import start_command
 from handlers.menu_handler import handle_menu_callback
 from handlers.publication_handler import handle_publication_callback, handle_text_input, handle_media_input
 from handlers.piar_handler import handle_piar_callback, handle_piar_text, handle_piar_photo
 from handlers.moderation_handler import handle_moderation_callback, handle_moderation_text
 from handlers.profile_handler import handle_profile_callback
-from handlers.basic_handler import id_command, participants_command, report_command
-from handlers.link_handler import trixlinks_command
+from handlers.message_handler import enforce_chat_rules
 from handlers.moderation_handler import (
     ban_command, unban_command, mute_command, unmute_command,
     banlist_command, stats_command, top_command, lastseen_command
 )
-from handlers.advanced_moderation import (
-    del_command, purge_command, slowmode_command, 
-    noslowmode_command, lockdown_command, antiinvite_command,
-    tagall_command, admins_command
-)
-from handlers.admin_handler import admin_command, say_command, handle_admin_callback, broadcast_command, sendstats_command
-from handlers.autopost_handler import autopost_command, autopost_test_command
-from handlers.games_handler import (
-    wordadd_command, wordedit_command, wordclear_command,
-    wordon_command, wordoff_command, wordinfo_command,
-    wordinfoedit_command, anstimeset_command,
-    gamesinfo_command, admgamesinfo_command, game_say_command,
-    roll_participant_command, roll_draw_command,
-    rollreset_command, rollstatus_command, mynumber_command,
-    handle_game_text_input, handle_game_media_input, handle_game_callback
-)
-from handlers.medicine_handler import hp_command, handle_hp_callback
-from handlers.stats_commands import channelstats_command, fullstats_command, resetmsgcount_command, chatinfo_command
-from handlers.help_commands import trix_command, handle_trix_callback
-from handlers.social_handler import social_command, giveaway_command
-from handlers.bonus_handler import bonus_command
 
 # Services
 from services.autopost_service import autopost_service
 from services.admin_notifications import admin_notifications
 from services.stats_scheduler import stats_scheduler
 from services.channel_stats import channel_stats
+from services.moderation_expiry import moderation_expiry
+from services.moderation_queue import moderation_queue
+from services.publisher import post_publisher
+from services.domain_blocklist import domain_blocklist
+from services.role_registry import role_registry
+from services.duplicate_detector import duplicate_detector
+from services.post_tags import post_tags
+from services.search_index import search_index
+from services.catalog_index import catalog_index
+from services.render_cache import render_cache
+from services.persistence import persistence
+from services.chat_cache import chat_cache
+from services.callback_guard import callback_debouncer
+from data.user_data import waiting_users
+from data.games_data import game_waiting, GAME_COMMAND_RE
 from services.db import db
+from services.metrics import metrics_server, MetricsRequest
+from services.update_filter import update_filter, UpdateFilterHandler
+from services.update_replay import update_replay
+from services.tracing import tracing
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -83,6 +59,88 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ============= ЛЕНИВЫЕ ОБРАБОТЧИКИ =============
+def lazy_handlers(module: str, *names: str):
+    """Обработчики из редко используемого модуля: модуль импортируется
+    при первом вызове любого из них, а не при запуске бота"""
+    def make(name: str):
+        async def wrapper(*args, **kwargs):
+            handler = getattr(importlib.import_module(module), name)
+            return await handler(*args, **kwargs)
+        wrapper.__name__ = name
+        return wrapper
+    
+    return [make(name) for name in names]
+
+id_command, participants_command, report_command = lazy_handlers(
+    'handlers.basic_handler', 'id_command', 'participants_command', 'report_command'
+)
+trixlinks_command, = lazy_handlers('handlers.link_handler', 'trixlinks_command')
+(
+    del_command, purge_command, slowmode_command,
+    noslowmode_command, lockdown_command, antiinvite_command,
+    antiflood_command, tagall_command, admins_command
+) = lazy_handlers(
+    'handlers.advanced_moderation',
+    'del_command', 'purge_command', 'slowmode_command',
+    'noslowmode_command', 'lockdown_command', 'antiinvite_command',
+    'antiflood_command', 'tagall_command', 'admins_command'
+)
+(
+    admin_command, say_command, handle_admin_callback,
+    broadcast_command, sendstats_command, blocklist_command, role_command
+) = lazy_handlers(
+    'handlers.admin_handler',
+    'admin_command', 'say_command', 'handle_admin_callback',
+    'broadcast_command', 'sendstats_command', 'blocklist_command', 'role_command'
+)
+autopost_command, autopost_test_command = lazy_handlers(
+    'handlers.autopost_handler', 'autopost_command', 'autopost_test_command'
+)
+game_command, handle_game_text_input, handle_game_media_input, handle_game_callback = lazy_handlers(
+    'handlers.games_handler',
+    'game_command', 'handle_game_text_input', 'handle_game_media_input', 'handle_game_callback'
+)
+hp_command, handle_hp_callback = lazy_handlers('handlers.medicine_handler', 'hp_command', 'handle_hp_callback')
+(
+    channelstats_command, fullstats_command, resetmsgcount_command,
+    chatinfo_command, slowroutes_command, topscreens_command
+) = lazy_handlers(
+    'handlers.stats_commands',
+    'channelstats_command', 'fullstats_command', 'resetmsgcount_command',
+    'chatinfo_command', 'slowroutes_command', 'topscreens_command'
+)
+trix_command, handle_trix_callback = lazy_handlers('handlers.help_commands', 'trix_command', 'handle_trix_callback')
+social_command, giveaway_command = lazy_handlers('handlers.social_handler', 'social_command', 'giveaway_command')
+bonus_command, = lazy_handlers('handlers.bonus_handler', 'bonus_command')
+tag_command, handle_tag_callback = lazy_handlers('handlers.tag_handler', 'tag_command', 'handle_tag_callback')
+search_command, handle_search_callback = lazy_handlers(
+    'handlers.search_handler', 'search_command', 'handle_search_callback'
+)
+catalog_command, handle_catalog_callback = lazy_handlers(
+    'handlers.catalog_handler', 'catalog_command', 'handle_catalog_callback'
+)
+
+# ============= ПРОВЕРКА КОНФИГУРАЦИИ =============
+def check_config() -> bool:
+    """Вывод основных настроек при запуске (не при импорте); False - без BOT_TOKEN запуск невозможен"""
+    print("=" * 70)
+    print("🔍 ПРОВЕРКА КОНФИГУРАЦИИ")
+    print("=" * 70)
+    print(f"✅ BOT_TOKEN: {'✅ есть' if Config.BOT_TOKEN else '❌ НЕТ!'}")
+    print(f"✅ DATABASE_URL: {Config.DATABASE_URL[:60]}...")
+    admin_ids = ', '.join(map(str, Config.ADMIN_IDS))
+    print(f"✅ ADMIN_IDS: {admin_ids[:50] if admin_ids else '❌ НЕТ!'}")
+    
+    config_errors = Config.validate_config()
+    if config_errors:
+        print("🚨 Ошибки конфигурации:")
+        for error in config_errors:
+            print(f"  {error}")
+    
+    print("=" * 70 + "\n")
+    return bool(Config.BOT_TOKEN)
+
 # ============= ИНИЦИАЛИЗАЦИЯ БД =============
 async def init_db_tables():
     """Initialize database tables with detailed logging"""
@@ -101,7 +159,7 @@ async def init_db_tables():
         else:
             logger.info(f"📊 Тип БД: {db_url.split('://')[0]}")
         
-        # Инициализируем БД
+        # Инициализируем БД и создаём недостающие таблицы
         await db.init()
         
         if not db.engine or not db.session_maker:
@@ -110,32 +168,13 @@ async def init_db_tables():
         
         logger.info("✅ Database engine created")
         
-        # Создаем таблицы
-        from models import Base
-        async with db.engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
+        # Таблицы созданы в db.init() - там же получен их список
+        tables = sorted(db.tables)
+        logger.info(f"✅ Tables in database: {tables}")
         
-        logger.info("✅ Tables created")
-        
-        # Проверяем таблицы
-        async with db.get_session() as session:
-            from sqlalchemy import text
-            
-            if 'postgres' in db_url.lower():
-                result = await session.execute(
-                    text("SELECT tablename FROM pg_tables WHERE schemaname='public'")
-                )
-            else:
-                result = await session.execute(
-                    text("SELECT name FROM sqlite_master WHERE type='table'")
-                )
-            
-            tables = [row[0] for row in result]
-            logger.info(f"✅ Tables in database: {tables}")
-            
-            if 'users' not in tables or 'posts' not in tables:
-                logger.error("❌ Required tables not found!")
-                return False
+        if 'users' not in tables or 'posts' not in tables:
+            logger.error("❌ Required tables not found!")
+            return False
         
         logger.info("=" * 70)
         logger.info("✅ ✅ ✅ DATABASE INITIALIZATION SUCCESSFUL")
@@ -148,87 +187,70 @@ async def init_db_tables():
         logger.error("=" * 70)
         return False
 
-# ============= DECORATOR ДЛЯ ИГНОРИРОВАНИЯ КОМАНД В BUDAPEST_CHAT =============
-def ignore_budapest_chat_commands(func):
-    """Decorator to ignore commands from Budapest chat"""
+# ============= ТРАССИРОВКА КОМАНД =============
+def traced(func):
+    """Command handler под трассировкой (маршрут - имя обработчика); команды
+    Будапешт-чата сюда не доходят - их отсекает update_filter"""
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
-        chat_id = update.effective_chat.id
-        user_id = update.effective_user.id
-        
-        if chat_id == Config.BUDAPEST_CHAT_ID:
-            if update.message and update.message.text and update.message.text.startswith('/'):
-                try:
-                    await update.message.delete()
-                    logger.info(f"🚫 Ignored command from Budapest chat: {func.__name__}")
-                except Exception as e:
-                    logger.error(f"Could not delete message: {e}")
-                return
-        
-        return await func(update, context)
+        with tracing.trace(func.__name__):
+            return await func(update, context)
     
     return wrapper
 
-# ============= ПРИМЕНЯЕМ DECORATOR КО ВСЕМ КОМАНДАМ =============
-start_command = ignore_budapest_chat_commands(start_command)
-trix_command = ignore_budapest_chat_commands(trix_command)
-id_command = ignore_budapest_chat_commands(id_command)
-hp_command = ignore_budapest_chat_commands(hp_command)
-participants_command = ignore_budapest_chat_commands(participants_command)
-report_command = ignore_budapest_chat_commands(report_command)
-admin_command = ignore_budapest_chat_commands(admin_command)
-say_command = ignore_budapest_chat_commands(say_command)
-broadcast_command = ignore_budapest_chat_commands(broadcast_command)
-sendstats_command = ignore_budapest_chat_commands(sendstats_command)
-channelstats_command = ignore_budapest_chat_commands(channelstats_command)
-fullstats_command = ignore_budapest_chat_commands(fullstats_command)
-resetmsgcount_command = ignore_budapest_chat_commands(resetmsgcount_command)
-chatinfo_command = ignore_budapest_chat_commands(chatinfo_command)
-trixlinks_command = ignore_budapest_chat_commands(trixlinks_command)
-social_command = ignore_budapest_chat_commands(social_command)
-giveaway_command = ignore_budapest_chat_commands(giveaway_command)
-bonus_command = ignore_budapest_chat_commands(bonus_command)
+# ============= ПРИМЕНЯЕМ ТРАССИРОВКУ КО ВСЕМ КОМАНДАМ =============
+start_command = traced(start_command)
+trix_command = traced(trix_command)
+id_command = traced(id_command)
+hp_command = traced(hp_command)
+participants_command = traced(participants_command)
+report_command = traced(report_command)
+admin_command = traced(admin_command)
+say_command = traced(say_command)
+broadcast_command = traced(broadcast_command)
+sendstats_command = traced(sendstats_command)
+blocklist_command = traced(blocklist_command)
+role_command = traced(role_command)
+channelstats_command = traced(channelstats_command)
+fullstats_command = traced(fullstats_command)
+resetmsgcount_command = traced(resetmsgcount_command)
+chatinfo_command = traced(chatinfo_command)
+slowroutes_command = traced(slowroutes_command)
+topscreens_command = traced(topscreens_command)
+trixlinks_command = traced(trixlinks_command)
+social_command = traced(social_command)
+giveaway_command = traced(giveaway_command)
+bonus_command = traced(bonus_command)
+tag_command = traced(tag_command)
+search_command = traced(search_command)
+catalog_command = traced(catalog_command)
 
 # Moderation commands
-ban_command = ignore_budapest_chat_commands(ban_command)
-unban_command = ignore_budapest_chat_commands(unban_command)
-mute_command = ignore_budapest_chat_commands(mute_command)
-unmute_command = ignore_budapest_chat_commands(unmute_command)
-banlist_command = ignore_budapest_chat_commands(banlist_command)
-stats_command = ignore_budapest_chat_commands(stats_command)
-top_command = ignore_budapest_chat_commands(top_command)
-lastseen_command = ignore_budapest_chat_commands(lastseen_command)
+ban_command = traced(ban_command)
+unban_command = traced(unban_command)
+mute_command = traced(mute_command)
+unmute_command = traced(unmute_command)
+banlist_command = traced(banlist_command)
+stats_command = traced(stats_command)
+top_command = traced(top_command)
+lastseen_command = traced(lastseen_command)
 
 # Advanced moderation
-del_command = ignore_budapest_chat_commands(del_command)
-purge_command = ignore_budapest_chat_commands(purge_command)
-slowmode_command = ignore_budapest_chat_commands(slowmode_command)
-noslowmode_command = ignore_budapest_chat_commands(noslowmode_command)
-lockdown_command = ignore_budapest_chat_commands(lockdown_command)
-antiinvite_command = ignore_budapest_chat_commands(antiinvite_command)
-tagall_command = ignore_budapest_chat_commands(tagall_command)
-admins_command = ignore_budapest_chat_commands(admins_command)
+del_command = traced(del_command)
+purge_command = traced(purge_command)
+slowmode_command = traced(slowmode_command)
+noslowmode_command = traced(noslowmode_command)
+lockdown_command = traced(lockdown_command)
+antiinvite_command = traced(antiinvite_command)
+antiflood_command = traced(antiflood_command)
+tagall_command = traced(tagall_command)
+admins_command = traced(admins_command)
 
 # Autopost
-autopost_command = ignore_budapest_chat_commands(autopost_command)
-autopost_test_command = ignore_budapest_chat_commands(autopost_test_command)
+autopost_command = traced(autopost_command)
+autopost_test_command = traced(autopost_test_command)
 
-# Game commands
-wordadd_command = ignore_budapest_chat_commands(wordadd_command)
-wordedit_command = ignore_budapest_chat_commands(wordedit_command)
-wordclear_command = ignore_budapest_chat_commands(wordclear_command)
-wordon_command = ignore_budapest_chat_commands(wordon_command)
-wordoff_command = ignore_budapest_chat_commands(wordoff_command)
-wordinfo_command = ignore_budapest_chat_commands(wordinfo_command)
-wordinfoedit_command = ignore_budapest_chat_commands(wordinfoedit_command)
-anstimeset_command = ignore_budapest_chat_commands(anstimeset_command)
-gamesinfo_command = ignore_budapest_chat_commands(gamesinfo_command)
-admgamesinfo_command = ignore_budapest_chat_commands(admgamesinfo_command)
-game_say_command = ignore_budapest_chat_commands(game_say_command)
-roll_participant_command = ignore_budapest_chat_commands(roll_participant_command)
-roll_draw_command = ignore_budapest_chat_commands(roll_draw_command)
-rollreset_command = ignore_budapest_chat_commands(rollreset_command)
-rollstatus_command = ignore_budapest_chat_commands(rollstatus_command)
-mynumber_command = ignore_budapest_chat_commands(mynumber_command)
+# Game commands (/needadd, /tryroll, ... - см. GAME_COMMAND_RE)
+game_command = traced(game_command)
 
 # ============= CALLBACK HANDLER ROUTER =============
 async def handle_all_callbacks(update: Update, context):
@@ -238,17 +260,23 @@ async def handle_all_callbacks(update: Update, context):
     if not query or not query.data:
         return
     
-    # 🚫 Ignore callbacks from Budapest chat
-    if query.message and query.message.chat.id == Config.BUDAPEST_CHAT_ID:
-        await query.answer("⚠️ Бот не работает в этом чате", show_alert=True)
-        logger.info(f"Ignored callback from Budapest chat: {query.data}")
-        return
+    # Повторный тап той же кнопки, пока первый ещё обрабатывается или только что обработан
+    tap = None
+    if callback_debouncer.applies(query.data):
+        tap = callback_debouncer.begin(
+            update.effective_user.id, query.data, query.message.message_id if query.message else 0
+        )
+        if tap is None:
+            await query.answer("⏳ Уже обрабатывается")
+            return
     
     data_parts = query.data.split(":")
     handler_type = data_parts[0] if data_parts else None
     
     logger.info(f"Callback: {query.data} from user {update.effective_user.id}")
     
+    trace = tracing.start_trace(f"callback:{handler_type}")
+    
     try:
         if handler_type == "menu":
             await handle_menu_callback(update, context)
@@ -268,7 +296,14 @@ async def handle_all_callbacks(update: Update, context):
             await handle_hp_callback(update, context)
         elif handler_type == "trix":
             await handle_trix_callback(update, context)
+        elif handler_type == "tag":
+            await handle_tag_callback(update, context)
+        elif handler_type == "search":
+            await handle_search_callback(update, context)
+        elif handler_type == "catalog":
+            await handle_catalog_callback(update, context)
         else:
+            trace.route = "callback:unknown"
             await query.answer("⚠️ Неизвестная команда", show_alert=True)
     except Exception as e:
         logger.error(f"Error handling callback: {e}", exc_info=True)
@@ -276,6 +311,10 @@ async def handle_all_callbacks(update: Update, context):
             await query.answer("❌ Ошибка", show_alert=True)
         except:
             pass
+    finally:
+        if tap:
+            callback_debouncer.end(tap)
+        tracing.finish_trace(trace)
 
 # ============= MESSAGE HANDLER =============
 async def handle_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -283,28 +322,28 @@ async def handle_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
     
-    # 🚫 Ignore all from Budapest chat EXCEPT message counting
-    if chat_id == Config.BUDAPEST_CHAT_ID:
-        channel_stats.increment_message_count(chat_id)
-        return
-    
     # Count messages in tracked chats
     if chat_id in Config.STATS_CHANNELS.values():
         channel_stats.increment_message_count(chat_id)
     
     waiting_for = context.user_data.get('waiting_for')
+    trace = tracing.start_trace("message")
     
     try:
-        # Check for game input
-        if await handle_game_text_input(update, context):
+        # Per-chat rules (lockdown, anti-invite) for groups
+        if await enforce_chat_rules(update, context):
             return
         
-        if await handle_game_media_input(update, context):
-            return
+        # Check for game input (модуль игр грузится, только если ввод ожидается)
+        if user_id in game_waiting:
+            if await handle_game_text_input(update, context):
+                return
+            
+            if await handle_game_media_input(update, context):
+                return
         
-        # Moderation text
-        if waiting_for in ['approve_link', 'reject_reason']:
-            await handle_moderation_text(update, context)
+        # Moderation text (ссылка или причина по взятой заявке)
+        if Config.is_moderator(user_id) and await handle_moderation_text(update, context):
             return
         
         # Piar form
@@ -333,6 +372,15 @@ async def handle_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Ошибка обработки")
         except:
             pass
+    finally:
+        tracing.finish_trace(trace)
+
+# ============= CHAT MEMBERSHIP =============
+async def handle_my_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Статус бота в чате изменился - сбрасываем кеш get_chat"""
+    chat_id = update.my_chat_member.chat.id
+    chat_cache.invalidate(chat_id)
+    logger.info(f"Bot membership changed in {chat_id}: {update.my_chat_member.new_chat_member.status}")
 
 # ============= ERROR HANDLER =============
 async def error_handler(update: object, context):
@@ -345,35 +393,176 @@ async def error_handler(update: object, context):
         except:
             pass
 
-# ============= MAIN FUNCTION =============
-def main():
-    """Main function - Initialize and run bot"""
-    if not Config.BOT_TOKEN:
-        logger.error("❌ BOT_TOKEN not found!")
-        sys.exit(1)
-    
-    # Инициализируем БД синхронно
-    logger.info("🔄 Инициализация БД перед запуском приложения...")
-    db_initialized = asyncio.run(init_db_tables())
-    
+# ============= ЗАПУСК И ОСТАНОВКА СЕРВИСОВ =============
+ALLOWED_UPDATES = ["message", "callback_query", "my_chat_member"]
+
+# Фоновое построение индексов (build_indexes), отменяется при остановке
+index_task: Optional[asyncio.Task] = None
+
+async def startup_services(application: Application):
+    """post_init: БД и сервисы на цикле событий приложения, до начала polling"""
+    # Инициализируем БД (один раз, на том же цикле, что и бот)
+    db_initialized = await init_db_tables()
     if not db_initialized:
         logger.warning("⚠️ Бот запускается БЕЗ базы данных (ограниченный режим)")
+    
+    # Роли из БД - до первого апдейта, иначе выданные командой модераторы не пройдут проверки
+    await role_registry.start()
+    
+    # Запускаем статистику
+    await stats_scheduler.start()
+    logger.info("✅ Stats scheduler started")
+    
+    # Запускаем эндпоинт метрик
+    await metrics_server.start()
+    
+    # Загружаем блок-лист доменов и следим за его изменениями
+    await domain_blocklist.start()
+    logger.info("✅ Domain blocklist loaded")
+    
+    # Готовые экраны меню для всех ролей (экраны ленивых модулей строятся при первом показе)
+    render_cache.warm()
+    
+    # Запускаем снятие истекших мутов и банов
+    await moderation_expiry.start()
+    logger.info("✅ Moderation expiry started")
+    
+    # Закрепления заявок за модераторами и их истечение
+    await moderation_queue.start()
+    
+    # Запускаем автопостинг если включен
+    if Config.SCHEDULER_ENABLED:
+        await autopost_service.start()
+        logger.info("✅ Autopost enabled")
+    
+    # Апдейты, накопившиеся за время перезапуска - до начала polling
+    if Config.REPLAY_PENDING_UPDATES:
+        # Переигрываемые заявки проверяются на дубли - этот индекс нужен до них
+        if db_initialized:
+            await build_duplicate_index()
+        await update_replay.replay(application, ALLOWED_UPDATES)
+    await update_replay.start()
+    
+    # Индексы строятся в фоне - бот начинает принимать апдейты, не дожидаясь их
+    global index_task
+    if db_initialized:
+        index_task = asyncio.create_task(
+            build_indexes(duplicates=not Config.REPLAY_PENDING_UPDATES), name="build_indexes"
+        )
+    
+    print("\n" + "=" * 70)
+    print("🤖 TRIXBOT IS READY!")
+    print("=" * 70)
+    print(f"📊 Stats interval: {Config.STATS_INTERVAL_HOURS}h")
+    print(f"📢 Moderation: {Config.MODERATION_GROUP_ID}")
+    print(f"🔧 Admin group: {Config.ADMIN_GROUP_ID}")
+    print(f"🚫 Budapest chat (IGNORE): {Config.BUDAPEST_CHAT_ID}")
+    print(f"⏰ Cooldown: {Config.COOLDOWN_SECONDS // 3600}h")
+    
+    if db_initialized:
+        print(f"💾 Database: ✅ Connected")
     else:
-        logger.info("✅ БД готова")
+        print(f"💾 Database: ⚠️ Limited mode")
+    
+    print("=" * 70 + "\n")
+
+async def build_duplicate_index():
+    """Индекс почти-дубликатов из недавних заявок"""
+    try:
+        await duplicate_detector.rebuild()
+    except Exception as e:
+        logger.error(f"Could not rebuild duplicate index: {e}")
+
+async def build_indexes(duplicates: bool = True):
+    """Индексы по данным БД: пока строятся, поиск и проверка дублей работают по неполным данным"""
+    if duplicates:
+        await build_duplicate_index()
+    
+    # Теги одобренных постов (только при пустой таблице post_tags)
+    try:
+        await post_tags.rebuild()
+    except Exception as e:
+        logger.error(f"Could not build post tag index: {e}")
+    
+    # Полнотекстовый индекс (только если он пуст)
+    try:
+        await search_index.rebuild()
+    except Exception as e:
+        logger.error(f"Could not build search index: {e}")
     
-    # Создаем приложение
-    application = Application.builder().token(Config.BOT_TOKEN).build()
+    # Каталог услуг: район x услуга (строится, если пуст), истечение анкет
+    try:
+        await catalog_index.start()
+    except Exception as e:
+        logger.error(f"Could not start catalog index: {e}")
+
+async def shutdown_services(application: Application):
+    """post_shutdown: остановка сервисов на том же цикле, после сохранения persistence"""
+    # Построение индексов могло не закончиться - иначе оно запустит catalog_index после его остановки
+    global index_task
+    if index_task and not index_task.done():
+        index_task.cancel()
+        try:
+            await index_task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"❌ Error building indexes: {e}")
+    index_task = None
+    
+    for service in (stats_scheduler, autopost_service, moderation_expiry, moderation_queue,
+                    metrics_server, domain_blocklist, catalog_index, role_registry, update_replay):
+        try:
+            await service.stop()
+        except Exception as e:
+            logger.error(f"❌ Error stopping {type(service).__name__}: {e}")
+    await db.close()
+    logger.info("✅ Cleanup complete")
+
+# ============= СБОРКА ПРИЛОЖЕНИЯ =============
+def build_application(bot=None) -> Application:
+    """Application с обработчиками и сервисами; БД и сервисы запускаются в post_init
+
+    bot - готовый экземпляр бота (бенчмарки подставляют бота без сети)
+    """
+    builder = Application.builder()
+    if bot is None:
+        builder = builder.token(Config.BOT_TOKEN).request(MetricsRequest(connection_pool_size=256))
+    else:
+        builder = builder.bot(bot)
+    builder = builder.post_init(startup_services).post_shutdown(shutdown_services)
+    
+    # Черновики, анкеты и ожидания ввода хранятся в БД (без БД persistence ничего не пишет)
+    if Config.PERSISTENCE_ENABLED:
+        persistence.track('waiting_users', waiting_users)
+        persistence.track('game_waiting', game_waiting)
+        builder = builder.persistence(persistence)
+        logger.info(f"✅ User state persistence every {Config.PERSISTENCE_INTERVAL:.0f}s")
+    
+    application = builder.build()
     
     # Setup services
     autopost_service.set_bot(application.bot)
     admin_notifications.set_bot(application.bot)
     channel_stats.set_bot(application.bot)
+    moderation_expiry.set_bot(application.bot)
+    moderation_queue.set_bot(application.bot)
+    post_publisher.set_bot(application.bot)
+    chat_cache.set_bot(application.bot)
+    update_filter.set_bot(application.bot)
     stats_scheduler.set_admin_notifications(admin_notifications)
     
     logger.info("✅ Сервисы инициализированы")
     
     # ============= РЕГИСТРАЦИЯ КОМАНД =============
     
+    # Классы апдейтов и метрики до основных обработчиков: трафик Будапешт-чата
+    # и то, что никто не обрабатывает, дальше группы -1 не идёт
+    application.add_handler(UpdateFilterHandler(update_filter), group=-1)
+    
+    # Бота добавили/удалили/изменили права - кеш get_chat устарел
+    application.add_handler(ChatMemberHandler(handle_my_chat_member, ChatMemberHandler.MY_CHAT_MEMBER))
+    
     # Start & Help
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", start_command))  # help -> main menu
@@ -388,18 +577,25 @@ def main():
     application.add_handler(CommandHandler("social", social_command))
     application.add_handler(CommandHandler("giveaway", giveaway_command))
     application.add_handler(CommandHandler("bonus", bonus_command))
+    application.add_handler(CommandHandler("tag", tag_command))
+    application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("catalog", catalog_command))
     
     # Admin
     application.add_handler(CommandHandler("admin", admin_command))
     application.add_handler(CommandHandler("say", say_command))
     application.add_handler(CommandHandler("broadcast", broadcast_command))
     application.add_handler(CommandHandler("sendstats", sendstats_command))
+    application.add_handler(CommandHandler("blocklist", blocklist_command))
+    application.add_handler(CommandHandler("role", role_command))
     
     # Stats
     application.add_handler(CommandHandler("channelstats", channelstats_command))
     application.add_handler(CommandHandler("fullstats", fullstats_command))
     application.add_handler(CommandHandler("resetmsgcount", resetmsgcount_command))
     application.add_handler(CommandHandler("chatinfo", chatinfo_command))
+    application.add_handler(CommandHandler("slowroutes", slowroutes_command))
+    application.add_handler(CommandHandler("topscreens", topscreens_command))
     
     # Moderation
     application.add_handler(CommandHandler("ban", ban_command))
@@ -418,6 +614,7 @@ def main():
     application.add_handler(CommandHandler("noslowmode", noslowmode_command))
     application.add_handler(CommandHandler("lockdown", lockdown_command))
     application.add_handler(CommandHandler("antiinvite", antiinvite_command))
+    application.add_handler(CommandHandler("antiflood", antiflood_command))
     application.add_handler(CommandHandler("tagall", tagall_command))
     application.add_handler(CommandHandler("admins", admins_command))
     
@@ -425,28 +622,11 @@ def main():
     application.add_handler(CommandHandler("autopost", autopost_command))
     application.add_handler(CommandHandler("autoposttest", autopost_test_command))
     
-    # Game commands
-    for version in ['need', 'try', 'more']:
-        application.add_handler(CommandHandler(f"{version}add", wordadd_command))
-        application.add_handler(CommandHandler(f"{version}edit", wordedit_command))
-        application.add_handler(CommandHandler(f"{version}start", wordon_command))
-        application.add_handler(CommandHandler(f"{version}stop", wordoff_command))
-        application.add_handler(CommandHandler(f"{version}info", wordinfo_command))
-        application.add_handler(CommandHandler(f"{version}infoedit", wordinfoedit_command))
-        application.add_handler(CommandHandler(f"{version}timeset", anstimeset_command))
-        application.add_handler(CommandHandler(f"{version}game", gamesinfo_command))
-        application.add_handler(CommandHandler(f"{version}guide", admgamesinfo_command))
-        application.add_handler(CommandHandler(f"{version}slovo", game_say_command))
-        application.add_handler(CommandHandler(f"{version}roll", roll_participant_command))
-        application.add_handler(CommandHandler(f"{version}rollstart", roll_draw_command))
-        application.add_handler(CommandHandler(f"{version}reroll", rollreset_command))
-        application.add_handler(CommandHandler(f"{version}rollstat", rollstatus_command))
-        application.add_handler(CommandHandler(f"{version}myroll", mynumber_command))
-    
-    # Old commands
-    application.add_handler(CommandHandler("add", wordadd_command))
-    application.add_handler(CommandHandler("edit", wordedit_command))
-    application.add_handler(CommandHandler("wordclear", wordclear_command))
+    # Game commands: один обработчик на все /<need|try|more><действие> и старые /add, /edit, /wordclear
+    application.add_handler(MessageHandler(
+        filters.UpdateType.MESSAGE & filters.Regex(GAME_COMMAND_RE),
+        game_command
+    ))
     
     # Callbacks & Messages
     application.add_handler(CallbackQueryHandler(handle_all_callbacks))
@@ -457,26 +637,23 @@ def main():
     
     application.add_error_handler(error_handler)
     
-    # ============= ЗАПУСК СЕРВИСОВ =============
+    # Какие команды удалять в Будапешт-чате - все зарегистрированные
+    update_filter.set_commands(application.handlers[0], patterns=[GAME_COMMAND_RE])
+    return application
+
+# ============= MAIN FUNCTION =============
+def main():
+    """Main function - Initialize and run bot"""
+    if not check_config():
+        print("\n❌ ОШИБКА: BOT_TOKEN не установлена!")
+        sys.exit(1)
+    
+    application = build_application()
     
     logger.info("=" * 70)
     logger.info("🚀 ЗАПУСК TRIXBOT")
     logger.info("=" * 70)
     
-    async def startup_services():
-        """Startup services after bot is initialized"""
-        # Запускаем статистику
-        await stats_scheduler.start()
-        logger.info("✅ Stats scheduler started")
-        
-        # Запускаем автопостинг если включен
-        if Config.SCHEDULER_ENABLED:
-            await autopost_service.start()
-            logger.info("✅ Autopost enabled")
-    
-    # Register startup callback
-    application.post_init = startup_services
-    
     # Выводим информацию о боте
     logger.info(f"📊 DATABASE: {Config.DATABASE_URL[:50]}...")
     logger.info(f"📢 MODERATION GROUP: {Config.MODERATION_GROUP_ID}")
@@ -484,30 +661,15 @@ def main():
     logger.info(f"🚫 BUDAPEST CHAT (IGNORE): {Config.BUDAPEST_CHAT_ID}")
     logger.info(f"⏰ COOLDOWN: {Config.COOLDOWN_SECONDS // 3600}h")
     logger.info(f"📈 STATS INTERVAL: {Config.STATS_INTERVAL_HOURS}h")
-    logger.info(f"💾 DATABASE: {'✅ Connected' if db_initialized else '⚠️ Limited mode'}")
     logger.info("=" * 70 + "\n")
     
-    print("\n" + "=" * 70)
-    print("🤖 TRIXBOT IS READY!")
-    print("=" * 70)
-    print(f"📊 Stats interval: {Config.STATS_INTERVAL_HOURS}h")
-    print(f"📢 Moderation: {Config.MODERATION_GROUP_ID}")
-    print(f"🔧 Admin group: {Config.ADMIN_GROUP_ID}")
-    print(f"🚫 Budapest chat (IGNORE): {Config.BUDAPEST_CHAT_ID}")
-    print(f"⏰ Cooldown: {Config.COOLDOWN_SECONDS // 3600}h")
-    
-    if db_initialized:
-        print(f"💾 Database: ✅ Connected")
-    else:
-        print(f"💾 Database: ⚠️ Limited mode")
-    
-    print("=" * 70 + "\n")
-    
+    # Один цикл событий: БД, сервисы, polling и остановка - внутри run_polling
     try:
         logger.info("👂 Начинаю слушать обновления...")
         application.run_polling(
-            allowed_updates=["message", "callback_query"],
-            drop_pending_updates=True
+            allowed_updates=ALLOWED_UPDATES,
+            # Накопившиеся апдейты уже переиграны в post_init (update_replay)
+            drop_pending_updates=not Config.REPLAY_PENDING_UPDATES
         )
     except KeyboardInterrupt:
         logger.info("\n⏹️ Получен сигнал остановки")
@@ -516,18 +678,6 @@ def main():
         logger.error(f"❌ Error in main loop: {e}", exc_info=True)
         print(f"\n❌ Error: {e}")
     finally:
-        logger.info("🔄 Cleaning up...")
-        print("🔄 Cleaning up...")
-        
-        try:
-            asyncio.run(stats_scheduler.stop())
-            asyncio.run(autopost_service.stop())
-            asyncio.run(db.close())
-            logger.info("✅ Cleanup complete")
-            print("✅ Cleanup complete")
-        except Exception as cleanup_error:
-            logger.error(f"❌ Error during cleanup: {cleanup_error}")
-        
         print("\n👋 TrixBot stopped")
         logger.info("👋 TrixBot stopped")
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, JSON, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, JSON, Enum, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -52,3 +52,116 @@ class Post(Base):
     piar_telegram = Column(String(255), nullable=True)   
     piar_price = Column(String(255), nullable=True)
     piar_description = Column(Text, nullable=True)  # ДОБАВЛЕНО: отдельное поле для описания
+
+class BlockedDomain(Base):
+    __tablename__ = 'blocked_domains'
+    
+    id = Column(Integer, primary_key=True)
+    domain = Column(String(255), unique=True, nullable=False)  # нормализованный хост, блокирует и поддомены
+    reason = Column(String(255), nullable=True)
+    added_by = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ChatSettings(Base):
+    __tablename__ = 'chat_settings'
+    
+    chat_id = Column(BigInteger, primary_key=True)
+    antiinvite = Column(Boolean, default=False)
+    allowed_links = Column(JSON, default=list)  # username чатов/каналов, ссылки на которые разрешены
+    slowmode = Column(Integer, default=0)  # секунд между сообщениями
+    flood_limit = Column(Integer, default=0)  # сообщений за flood_window, 0 - выключено
+    flood_window = Column(Integer, default=10)
+    lockdown_until = Column(DateTime, nullable=True)
+    updated_by = Column(BigInteger, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PostTag(Base):
+    __tablename__ = 'post_tags'
+    
+    post_id = Column(Integer, primary_key=True)
+    tag = Column(String(100), primary_key=True)  # нормализованный: без #, нижний регистр, ё -> е
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Страницы /tag: WHERE tag = ? AND post_id < ? ORDER BY post_id DESC
+    __table_args__ = (Index('ix_post_tags_tag_post_id', 'tag', 'post_id'),)
+
+class PublishedPost(Base):
+    __tablename__ = 'published_posts'
+    
+    post_id = Column(Integer, primary_key=True)
+    link = Column(String(255), nullable=False)  # ссылка на опубликованное сообщение
+    published_at = Column(DateTime, default=datetime.utcnow)
+
+class UserState(Base):
+    __tablename__ = 'user_states'
+    
+    user_id = Column(BigInteger, primary_key=True)
+    data = Column(LargeBinary, nullable=False)  # pickle: context.user_data и состояния ожидания
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class SubmissionKey(Base):
+    __tablename__ = 'submission_keys'
+    
+    key = Column(String(32), primary_key=True)  # ключ идемпотентности черновика (pub:send / piar:send)
+    user_id = Column(BigInteger, nullable=False)
+    post_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ModerationClaim(Base):
+    __tablename__ = 'moderation_claims'
+    
+    post_id = Column(Integer, primary_key=True)  # одна заявка - не больше одного модератора
+    moderator_id = Column(BigInteger, nullable=False, index=True)
+    moderator_name = Column(String(255), nullable=True)
+    action = Column(String(20), nullable=False)  # approve | approve_chat | reject
+    post_user_id = Column(BigInteger, nullable=False)
+    chat_id = Column(BigInteger, nullable=True)  # сообщение заявки в группе модерации
+    message_id = Column(BigInteger, nullable=True)
+    message_text = Column(Text, nullable=True)  # текст и кнопки до взятия - вернуть при истечении
+    markup = Column(JSON, nullable=True)
+    prompt_message_id = Column(BigInteger, nullable=True)  # инструкция модератору в ЛС
+    claimed_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class CatalogProfession(Base):
+    __tablename__ = 'catalog_professions'
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(100), unique=True, nullable=False)  # нормализованная: нижний регистр, без эмодзи
+    title = Column(String(255), nullable=False)
+
+class CatalogDistrict(Base):
+    __tablename__ = 'catalog_districts'
+    
+    id = Column(Integer, primary_key=True)
+    key = Column(String(100), unique=True, nullable=False)  # 'd8' для VIII района, иначе нормализованное название
+    title = Column(String(255), nullable=False)
+
+class CatalogEntry(Base):
+    __tablename__ = 'catalog_entries'
+    
+    post_id = Column(Integer, primary_key=True)
+    district_id = Column(Integer, primary_key=True)
+    profession_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)  # когда попала в каталог - для истечения
+    
+    # Выдача /catalog: WHERE district_id = ? AND profession_id = ? AND post_id < ? ORDER BY post_id DESC
+    __table_args__ = (
+        Index('ix_catalog_entries_lookup', 'district_id', 'profession_id', 'post_id'),
+        Index('ix_catalog_entries_created_at', 'created_at'),
+    )
+
+class UserRole(Base):
+    __tablename__ = 'user_roles'
+    
+    user_id = Column(BigInteger, primary_key=True)
+    role = Column(String(20), nullable=False)  # admin | moderator (роли из ADMIN_IDS/MODERATOR_IDS здесь не хранятся)
+    added_by = Column(BigInteger, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # сигнатура для перезагрузки на других экземплярах
+
+class BotState(Base):
+    __tablename__ = 'bot_state'
+    
+    key = Column(String(64), primary_key=True)  # last_update_id, replay_done
+    value = Column(Text, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -129,7 +129,7 @@ class AdminNotificationService:
     
     async def send_statistics(self):
         """Отправить расширенную статистику в админскую группу"""
-        from data.user_data import user_data
+        from data.user_data import user_data, banned_ids
         from data.games_data import word_games, roll_games
         from services.channel_stats import channel_stats
         from datetime import timedelta
@@ -141,7 +141,7 @@ class AdminNotificationService:
         active_7d = sum(1 for data in user_data.values() if 
                        datetime.now() - data['last_activity'] <= timedelta(days=7))
         total_messages = sum(data['message_count'] for data in user_data.values())
-        banned_count = sum(1 for data in user_data.values() if data.get('banned'))
+        banned_count = len(banned_ids)
         
         # Собираем статистику игр
         games_stats = ""
@@ -3,6 +3,7 @@ import asyncio
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import logging
+from services.metrics import scheduler_lag
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +67,10 @@ class AutopostService:
                     else:
                         logger.error("Failed to send autopost")
                 
+                loop = asyncio.get_running_loop()
+                planned = loop.time() + 60
                 await asyncio.sleep(60)
+                scheduler_lag.observe(max(0.0, loop.time() - planned), scheduler='autopost')
             except asyncio.CancelledError:
                 logger.info("Autopost loop cancelled")
                 break
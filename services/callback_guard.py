@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import select
+from config import Config
+from models import SubmissionKey
+
+logger = logging.getLogger(__name__)
+
+TapKey = Tuple[int, str, int]
+
+# Кнопки, меняющие состояние: отправка заявки и действия модератора.
+# Навигация (меню, каталог, страницы) не схлопывается
+DEBOUNCED_PREFIXES = ('pub:send', 'piar:send', 'mod:')
+
+class CallbackDebouncer:
+    """Схлопывание повторных нажатий одной кнопки (DEBOUNCED_PREFIXES)
+
+    Нажатие - это (user_id, callback data, message_id). Повтор считается
+    дубликатом, пока первое нажатие обрабатывается и ещё
+    CALLBACK_DEBOUNCE_SECONDS после окончания обработки (апдейты идут по
+    очереди, поэтому второй тап попадает к нам уже после первого).
+    Порядок OrderedDict совпадает с порядком завершения - устаревшие записи
+    в начале и вытесняются за O(1) на нажатие.
+    """
+
+    def __init__(self):
+        self._inflight: Set[TapKey] = set()
+        self._recent: 'OrderedDict[TapKey, float]' = OrderedDict()
+        self.stats = {'taps': 0, 'collapsed': 0}
+
+    def _evict(self, now: float, window: float):
+        recent = self._recent
+        while recent:
+            key, at = next(iter(recent.items()))
+            if now - at < window:
+                break
+            del recent[key]
+
+    @staticmethod
+    def applies(data: str) -> bool:
+        return (data or '').startswith(DEBOUNCED_PREFIXES)
+
+    def begin(self, user_id: int, data: str, message_id: int, now: float = None) -> Optional[TapKey]:
+        """Ключ нажатия, если его нужно обработать; None - дубликат"""
+        now = time.monotonic() if now is None else now
+        self._evict(now, Config.CALLBACK_DEBOUNCE_SECONDS)
+        key = (user_id, data, message_id)
+        self.stats['taps'] += 1
+        if key in self._inflight or key in self._recent:
+            self.stats['collapsed'] += 1
+            return None
+        self._inflight.add(key)
+        return key
+
+    def end(self, key: TapKey, now: float = None):
+        """Обработка закончилась - окно повтора отсчитывается отсюда"""
+        self._inflight.discard(key)
+        self._recent.pop(key, None)
+        self._recent[key] = time.monotonic() if now is None else now
+
+    def get_status(self) -> Dict:
+        return {'inflight': len(self._inflight), 'recent': len(self._recent), **self.stats}
+
+class SubmitKeys:
+    """Ключи идемпотентности для отправки заявок (pub:send / piar:send)
+
+    Ключ выдаётся черновику при предпросмотре и передаётся в callback data
+    кнопки отправки. Запись ключ -> пост добавляется в той же транзакции,
+    что и сам пост, поэтому повторная отправка (в том числе после перезапуска)
+    находит уже созданный пост вместо создания нового.
+    """
+
+    def __init__(self, cache_size: int = 1000):
+        self.cache_size = cache_size
+        self._posts: 'OrderedDict[str, Tuple[int, int]]' = OrderedDict()
+        self.stats = {'issued': 0, 'replayed': 0}
+
+    def new_key(self) -> str:
+        self.stats['issued'] += 1
+        return secrets.token_hex(6)
+
+    async def find(self, session, user_id: int, key: Optional[str]) -> Optional[int]:
+        """ID поста, уже созданного по этому ключу"""
+        if not key:
+            return None
+        cached = self._posts.get(key)
+        if cached is None:
+            result = await session.execute(select(SubmissionKey).where(SubmissionKey.key == key))
+            row = result.scalar_one_or_none()
+            if row is None:
+                return None
+            cached = (row.user_id, row.post_id)
+            self._remember(key, cached)
+        if cached[0] != user_id:
+            return None
+        self.stats['replayed'] += 1
+        logger.info(f"Submit key {key} from {user_id} already used for post #{cached[1]}")
+        return cached[1]
+
+    def record(self, session, user_id: int, key: Optional[str], post_id: int):
+        """Привязать ключ к посту (коммит - вместе с постом; после коммита - remember)"""
+        if not key:
+            return
+        session.add(SubmissionKey(key=key, user_id=user_id, post_id=post_id))
+
+    def remember(self, user_id: int, key: Optional[str], post_id: int):
+        """Запомнить ключ после успешного коммита: откаченный пост не должен
+        считаться отправленным"""
+        if key:
+            self._remember(key, (user_id, post_id))
+
+    def _remember(self, key: str, value: Tuple[int, int]):
+        self._posts[key] = value
+        self._posts.move_to_end(key)
+        while len(self._posts) > self.cache_size:
+            self._posts.popitem(last=False)
+
+    def get_status(self) -> Dict:
+        return {'cached': len(self._posts), **self.stats}
+
+# Глобальные экземпляры
+callback_debouncer = CallbackDebouncer()
+submit_keys = SubmitKeys()
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, func
+from sqlalchemy.exc import IntegrityError
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config import Config
+from services.db import db
+from models import Post, PostStatus, PublishedPost, CatalogProfession, CatalogDistrict, CatalogEntry
+
+logger = logging.getLogger(__name__)
+
+ROMAN = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X', 'XI', 'XII',
+         'XIII', 'XIV', 'XV', 'XVI', 'XVII', 'XVIII', 'XIX', 'XX', 'XXI', 'XXII', 'XXIII']
+
+# Районы Будапешта: номер -> название для кнопки
+DISTRICT_NAMES = {
+    1: 'Budavár', 2: 'II. kerület', 3: 'Óbuda', 4: 'Újpest', 5: 'Belváros',
+    6: 'Terézváros', 7: 'Erzsébetváros', 8: 'Józsefváros', 9: 'Ferencváros',
+    10: 'Kőbánya', 11: 'Újbuda', 12: 'Hegyvidék', 13: 'Angyalföld', 14: 'Zugló',
+    15: 'Rákospalota', 16: 'XVI. kerület', 17: 'Rákosmente', 18: 'Pestszentlőrinc',
+    19: 'Kispest', 20: 'Pesterzsébet', 21: 'Csepel', 22: 'Budafok-Tétény', 23: 'Soroksár'
+}
+
+# Другие написания (без диакритики, нижний регистр)
+DISTRICT_ALIASES = {
+    'budavar': 1, 'varnegyed': 1, 'var': 1, 'obuda': 3, 'obuda-bekasmegyer': 3, 'bekasmegyer': 3,
+    'ujpest': 4, 'belvaros': 5, 'lipotvaros': 5, 'belvaros-lipotvaros': 5, 'terezvaros': 6,
+    'erzsebetvaros': 7, 'jozsefvaros': 8, 'ferencvaros': 9, 'kobanya': 10, 'ujbuda': 11,
+    'hegyvidek': 12, 'angyalfold': 13, 'ujlipotvaros': 13, 'zuglo': 14, 'rakospalota': 15,
+    'rakosmente': 17, 'pestszentlorinc': 18, 'pestszentimre': 18,
+    'pestszentlorinc-pestszentimre': 18, 'kispest': 19, 'pesterzsebet': 20, 'csepel': 21,
+    'budafok': 22, 'budafok-teteny': 22, 'soroksar': 23
+}
+
+# "район", "kerület", "8-й", точки - не часть названия
+DISTRICT_NOISE_RE = re.compile(r'\b(район|р-н|округ|kerulet|ker|district)\b|[.,]')
+DISTRICT_NUMBER_RE = re.compile(r'^(\d{1,2})(?:-?[а-я]{1,2})?$')
+DISTRICT_KEY_RE = re.compile(r'^d\d+$')
+SPACES_RE = re.compile(r'\s+')
+PROFESSION_NOISE_RE = re.compile(r'[^\w\s-]+')
+
+# Венгерские буквы пишут и с диакритикой, и без
+HUNGARIAN_FOLD = str.maketrans('áéíóöőúüű', 'aeiooouuu')
+
+def _fold(text: str) -> str:
+    """Нижний регистр, ё -> е, без венгерской диакритики"""
+    return (text or '').lower().replace('ё', 'е').translate(HUNGARIAN_FOLD)
+
+def normalize_district(raw: str) -> Optional[Tuple[str, str]]:
+    """(ключ, название): '8', 'VIII. ker', 'Józsefváros' -> ('d8', 'VIII · Józsefváros')"""
+    folded = SPACES_RE.sub(' ', DISTRICT_NOISE_RE.sub(' ', _fold(raw))).strip()
+    if not folded:
+        return None
+
+    number = None
+    match = DISTRICT_NUMBER_RE.match(folded)
+    if match:
+        number = int(match.group(1))
+    elif folded.upper() in ROMAN:
+        number = ROMAN.index(folded.upper()) + 1
+    else:
+        number = DISTRICT_ALIASES.get(folded.replace(' ', '-'))
+
+    if number and 1 <= number <= len(ROMAN):
+        return f"d{number}", f"{ROMAN[number - 1]} · {DISTRICT_NAMES[number]}"
+    return folded[:100], raw.strip()[:255]
+
+def normalize_profession(raw: str) -> Optional[Tuple[str, str]]:
+    """(ключ, название): '💅 Маникюр!' -> ('маникюр', 'Маникюр')"""
+    title = SPACES_RE.sub(' ', PROFESSION_NOISE_RE.sub(' ', raw or '')).strip(' -')
+    if not title:
+        return None
+    return _fold(title)[:100], (title[:1].upper() + title[1:])[:255]
+
+class CatalogIndex:
+    """Каталог услуг: район x услуга -> анкеты
+
+    Названия районов и услуг нормализуются в справочники catalog_districts и
+    catalog_professions, анкета одобренного пиара даёт по строке
+    catalog_entries на каждый район. Выдача - один запрос по индексу
+    (district_id, profession_id, post_id). Счётчики пар и клавиатуры /catalog
+    держатся в памяти и сбрасываются при одобрении и истечении анкет.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self._districts: Dict[int, str] = {}
+        self._professions: Dict[int, str] = {}
+        self._district_ids: Dict[str, int] = {}
+        self._profession_ids: Dict[str, int] = {}
+        self._counts: Counter = Counter()  # (district_id, profession_id) -> анкет
+        self._keyboards: Dict[Optional[int], InlineKeyboardMarkup] = {}
+        self.stats = {'indexed': 0, 'expired': 0, 'queries': 0, 'keyboard_hits': 0, 'keyboard_builds': 0}
+
+    # ============= СПРАВОЧНИКИ =============
+
+    async def _lookup_id(self, session, model, ids: Dict[str, int], titles: Dict[int, str],
+                         key: str, title: str, pending: List[Tuple]) -> int:
+        """id записи справочника (создаётся при первом упоминании). В память
+        попадает через pending - только после commit, иначе id несохранённой
+        строки остался бы в справочнике"""
+        item_id = ids.get(key)
+        if item_id is not None:
+            return item_id
+        item = (await session.execute(select(model).where(model.key == key))).scalar_one_or_none()
+        if item is None:
+            item = model(key=key, title=title)
+            session.add(item)
+            await session.flush()
+        pending.append((ids, titles, key, item.id, item.title))
+        return item.id
+
+    # ============= ИНДЕКСАЦИЯ =============
+
+    async def index_post(self, post: Post, indexed_at: datetime = None) -> int:
+        """Добавить одобренную анкету в каталог; сколько районов проиндексировано"""
+        if not post.is_piar or not db.session_maker:
+            return 0
+        profession = normalize_profession(post.piar_profession)
+        districts = list({d[0]: d for d in map(normalize_district, post.piar_districts or []) if d}.values())
+        if not profession or not districts:
+            return 0
+
+        # Параллельное одобрение может вставить ту же запись справочника:
+        # IntegrityError - повторить, запись найдётся select'ом
+        for attempt in range(2):
+            added, pending = [], []
+            try:
+                async with db.get_session() as session:
+                    profession_id = await self._lookup_id(
+                        session, CatalogProfession, self._profession_ids, self._professions,
+                        *profession, pending
+                    )
+                    for district in districts:
+                        district_id = await self._lookup_id(
+                            session, CatalogDistrict, self._district_ids, self._districts,
+                            *district, pending
+                        )
+                        if await session.get(CatalogEntry, (post.id, district_id)):
+                            continue
+                        session.add(CatalogEntry(
+                            post_id=post.id, district_id=district_id, profession_id=profession_id,
+                            created_at=indexed_at or datetime.utcnow()
+                        ))
+                        added.append((district_id, profession_id))
+                    await session.commit()
+                break
+            except IntegrityError as e:
+                if attempt:
+                    raise
+                logger.info(f"Catalog: concurrent insert for post {post.id}, retrying: {e}")
+
+        for ids, titles, key, item_id, title in pending:
+            ids[key] = item_id
+            titles[item_id] = title
+
+        self._counts.update(added)
+        self.stats['indexed'] += len(added)
+        if added or pending:
+            self._keyboards.clear()
+        return len(added)
+
+    async def rebuild(self) -> int:
+        """Заполнить каталог по одобренным анкетам, если он пуст"""
+        if not db.session_maker:
+            return 0
+
+        async with db.get_session() as session:
+            if (await session.execute(select(func.count()).select_from(CatalogEntry))).scalar():
+                return 0
+            since = datetime.utcnow() - timedelta(days=Config.CATALOG_TTL_DAYS)
+            result = await session.execute(
+                select(Post)
+                .where(Post.is_piar == True, Post.status == PostStatus.APPROVED, Post.created_at >= since)
+                .order_by(Post.id)
+            )
+            posts = list(result.scalars())
+
+        indexed = 0
+        for post in posts:
+            indexed += await self.index_post(post, post.created_at)
+        logger.info(f"Catalog index built: {len(posts)} piar posts, {indexed} entries")
+        return indexed
+
+    async def load(self):
+        """Справочники и счётчики пар район x услуга в память"""
+        async with db.get_session() as session:
+            districts = (await session.execute(select(CatalogDistrict))).scalars().all()
+            professions = (await session.execute(select(CatalogProfession))).scalars().all()
+            counts = await session.execute(
+                select(CatalogEntry.district_id, CatalogEntry.profession_id, func.count())
+                .group_by(CatalogEntry.district_id, CatalogEntry.profession_id)
+            )
+            self._counts = Counter({(d, p): n for d, p, n in counts.all()})
+
+        self._districts = {item.id: item.title for item in districts}
+        self._district_ids = {item.key: item.id for item in districts}
+        self._professions = {item.id: item.title for item in professions}
+        self._profession_ids = {item.key: item.id for item in professions}
+        self._keyboards.clear()
+
+    async def expire(self, now: datetime = None) -> int:
+        """Убрать из каталога анкеты старше CATALOG_TTL_DAYS"""
+        cutoff = (now or datetime.utcnow()) - timedelta(days=Config.CATALOG_TTL_DAYS)
+        async with db.get_session() as session:
+            result = await session.execute(delete(CatalogEntry).where(CatalogEntry.created_at < cutoff))
+            await session.commit()
+
+        if result.rowcount:
+            self.stats['expired'] += result.rowcount
+            logger.info(f"Catalog: {result.rowcount} expired entries removed")
+            await self.load()
+        return result.rowcount
+
+    # ============= ЦИКЛ =============
+
+    async def start(self):
+        """Построить (если пуст), загрузить и раз в час убирать истёкшие анкеты"""
+        if not db.session_maker:
+            return
+        if self.task and not self.task.done():
+            logger.warning("Catalog index already running")
+            return
+
+        await self.rebuild()
+        await self.load()
+        self.running = True
+        self.task = asyncio.create_task(self._expiry_loop())
+        logger.info(f"Catalog index started: {len(self._districts)} districts, {len(self._professions)} professions")
+
+    async def stop(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self.task = None
+
+    async def _expiry_loop(self):
+        while self.running:
+            try:
+                await self.expire()
+            except Exception as e:
+                logger.error(f"Error expiring catalog entries: {e}")
+            await asyncio.sleep(3600)
+
+    # ============= ВЫДАЧА =============
+
+    async def get_page(self, district_id: int, profession_id: int, before_id: int = None,
+                       limit: int = 5) -> Tuple[List[Dict], Optional[int]]:
+        """Анкеты пары (новые первыми) со ссылками и курсор следующей страницы -
+        один запрос по индексу (district_id, profession_id, post_id)"""
+        query = (
+            select(CatalogEntry.post_id, Post, PublishedPost.link)
+            .join(Post, Post.id == CatalogEntry.post_id)
+            .outerjoin(PublishedPost, PublishedPost.post_id == CatalogEntry.post_id)
+            .where(CatalogEntry.district_id == district_id, CatalogEntry.profession_id == profession_id)
+        )
+        if before_id is not None:
+            query = query.where(CatalogEntry.post_id < before_id)
+
+        self.stats['queries'] += 1
+        async with db.get_session() as session:
+            result = await session.execute(query.order_by(CatalogEntry.post_id.desc()).limit(limit + 1))
+            rows = result.all()
+
+        posts = [
+            {
+                'id': post.id,
+                'title': post.piar_name or None,
+                'text': post.piar_description,
+                'created_at': post.created_at,
+                'link': link
+            }
+            for _, post, link in rows[:limit]
+        ]
+        return posts, (posts[-1]['id'] if len(rows) > limit else None)
+
+    def district_title(self, district_id: int) -> str:
+        return self._districts.get(district_id, '?')
+
+    def profession_title(self, profession_id: int) -> str:
+        return self._professions.get(profession_id, '?')
+
+    def _cached_keyboard(self, key: Optional[int], build) -> InlineKeyboardMarkup:
+        keyboard = self._keyboards.get(key)
+        if keyboard is None:
+            keyboard = self._keyboards[key] = build()
+            self.stats['keyboard_builds'] += 1
+        else:
+            self.stats['keyboard_hits'] += 1
+        return keyboard
+
+    def districts_keyboard(self) -> InlineKeyboardMarkup:
+        """Районы, в которых есть анкеты (с числом анкет)"""
+        def build():
+            totals = Counter()
+            for (district_id, _), count in self._counts.items():
+                totals[district_id] += count
+            # Пронумерованные районы по порядку, остальные - по алфавиту
+            numbers = {
+                district_id: int(key[1:]) for key, district_id in self._district_ids.items()
+                if DISTRICT_KEY_RE.match(key)
+            }
+            district_ids = sorted(
+                (d for d, count in totals.items() if count > 0),
+                key=lambda d: (0, numbers[d], '') if d in numbers else (1, 0, self.district_title(d))
+            )
+            buttons = [
+                InlineKeyboardButton(f"{self.district_title(d)} ({totals[d]})", callback_data=f"catalog:d:{d}")
+                for d in district_ids
+            ]
+            return InlineKeyboardMarkup([buttons[i:i + 2] for i in range(0, len(buttons), 2)])
+        return self._cached_keyboard(None, build)
+
+    def professions_keyboard(self, district_id: int) -> InlineKeyboardMarkup:
+        """Услуги, которые есть в районе"""
+        def build():
+            professions = sorted(
+                ((p, count) for (d, p), count in self._counts.items() if d == district_id and count > 0),
+                key=lambda item: self.profession_title(item[0])
+            )
+            rows = [
+                [InlineKeyboardButton(f"{self.profession_title(p)} ({count})", callback_data=f"catalog:p:{district_id}:{p}")]
+                for p, count in professions
+            ]
+            rows.append([InlineKeyboardButton("🔙 Районы", callback_data="catalog:home")])
+            return InlineKeyboardMarkup(rows)
+        return self._cached_keyboard(district_id, build)
+
+    def get_status(self) -> Dict:
+        return {
+            'districts': len(self._districts),
+            'professions': len(self._professions),
+            'pairs': sum(1 for count in self._counts.values() if count > 0),
+            'cached_keyboards': len(self._keyboards),
+            **self.stats
+        }
+
+# Глобальный экземпляр
+catalog_index = CatalogIndex()
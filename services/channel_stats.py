@@ -3,6 +3,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from config import Config
+from services.chat_cache import chat_cache
 
 logger = logging.getLogger(__name__)
 
@@ -26,8 +27,8 @@ class ChannelStatsService:
                 logger.warning("Bot instance not set")
                 return None
             
-            # Получаем информацию о чате
-            chat = await self.bot.get_chat(channel_id)
+            # Получаем информацию о чате (название и тип меняются редко - из кеша)
+            chat = await chat_cache.get(channel_id)
             
             # Получаем количество участников
             try:
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from telegram.error import BadRequest, Forbidden
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+class _Entry:
+    __slots__ = ('chat', 'error', 'expires')
+
+    def __init__(self, chat, error: Optional[Exception], expires: float):
+        self.chat = chat
+        self.error = error
+        self.expires = expires
+
+class ChatInfoCache:
+    """Кеш bot.get_chat()
+
+    - успешный ответ живёт CHAT_CACHE_TTL секунд, окончательная ошибка
+      (Forbidden, BadRequest "chat not found") - CHAT_CACHE_ERROR_TTL: повторные
+      проверки недоступной группы не ходят в API. Сетевые сбои, таймауты и
+      RetryAfter не кешируются - они касаются только своего запроса;
+    - одновременные запросы одного чата ждут один общий вызов API;
+    - запись сбрасывается апдейтом my_chat_member (бота добавили, удалили,
+      изменили права).
+    """
+
+    def __init__(self):
+        self.bot = None
+        self._entries: Dict[int, _Entry] = {}
+        self._inflight: Dict[int, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+
+    def set_bot(self, bot):
+        """Устанавливает экземпляр бота"""
+        self.bot = bot
+
+    async def get(self, chat_id: int):
+        """Chat из кеша или API; кешированная ошибка пробрасывается"""
+        entry = self._entries.get(chat_id)
+        if entry and entry.expires > time.monotonic():
+            self.stats['hits'] += 1
+            if entry.error:
+                raise entry.error.with_traceback(None)
+            return entry.chat
+
+        task = self._inflight.get(chat_id)
+        if task is None:
+            self.stats['misses'] += 1
+            task = asyncio.ensure_future(self._fetch(chat_id))
+            self._inflight[chat_id] = task
+            task.add_done_callback(lambda done: self._done(chat_id, done))
+        else:
+            self.stats['coalesced'] += 1
+
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(task)
+
+    def _done(self, chat_id: int, task: asyncio.Task):
+        self._inflight.pop(chat_id, None)
+        if not task.cancelled():
+            task.exception()  # ошибку получили ожидающие - не логировать "never retrieved"
+
+    async def _fetch(self, chat_id: int):
+        try:
+            chat = await self.bot.get_chat(chat_id)
+        except Exception as e:
+            self.stats['errors'] += 1
+            # BadRequest наследует NetworkError - проверяем явно
+            if isinstance(e, (Forbidden, BadRequest)):
+                self._entries[chat_id] = _Entry(None, e, time.monotonic() + Config.CHAT_CACHE_ERROR_TTL)
+            raise
+        self._entries[chat_id] = _Entry(chat, None, time.monotonic() + Config.CHAT_CACHE_TTL)
+        return chat
+
+    async def is_reachable(self, chat_id: int) -> bool:
+        """Доступен ли чат боту (для проверки группы модерации перед отправкой)"""
+        try:
+            await self.get(chat_id)
+            return True
+        except Exception as e:
+            logger.error(f"Cannot access chat {chat_id}: {e}")
+            return False
+
+    def invalidate(self, chat_id: int):
+        self._entries.pop(chat_id, None)
+
+    def get_status(self) -> Dict:
+        return {'cached': len(self._entries), 'inflight': len(self._inflight), **self.stats}
+
+# Глобальный экземпляр
+chat_cache = ChatInfoCache()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+from services.db import db
+from models import ChatSettings
+
+logger = logging.getLogger(__name__)
+
+# Ссылки-приглашения: t.me/+hash, t.me/joinchat/hash, t.me/username, telegram.me/..., tg://join
+INVITE_PATTERN = (
+    r'(?:(?:https?://)?(?:t|telegram)\.(?:me|dog)/(?:joinchat/|\+)?{allow}[\w\-]{{3,}}'
+    r'|tg://(?:join|resolve)\?\S+)'
+)
+
+# Поля таблицы, которые можно менять через update()
+SETTINGS_FIELDS = ('antiinvite', 'allowed_links', 'slowmode', 'flood_limit', 'flood_window', 'lockdown_until')
+
+class ChatRules:
+    """Скомпилированные правила одного чата (неизменяемый снимок)"""
+
+    __slots__ = ('chat_id', 'antiinvite', 'allowed_links', 'slowmode', 'flood_limit',
+                 'flood_window', 'lockdown_until', 'invite_re', 'active')
+
+    def __init__(self, chat_id: int, antiinvite: bool = False, allowed_links: Iterable[str] = (),
+                 slowmode: int = 0, flood_limit: int = 0, flood_window: int = 10,
+                 lockdown_until: Optional[datetime] = None):
+        self.chat_id = chat_id
+        self.antiinvite = bool(antiinvite)
+        self.allowed_links: Tuple[str, ...] = tuple(sorted({l.lower().lstrip('@') for l in allowed_links or () if l}))
+        self.slowmode = int(slowmode or 0)
+        self.flood_limit = int(flood_limit or 0)
+        self.flood_window = int(flood_window or 10)
+        self.lockdown_until = lockdown_until
+        self.invite_re = self._compile_invite_re() if self.antiinvite else None
+        # Быстрая проверка: есть ли вообще что применять
+        self.active = bool(self.antiinvite or self.slowmode or self.flood_limit or self.lockdown_until)
+
+    def _compile_invite_re(self) -> re.Pattern:
+        allow = ''
+        if self.allowed_links:
+            names = '|'.join(re.escape(name) for name in self.allowed_links)
+            allow = f'(?!(?:{names})(?![\\w\\-]))'
+        return re.compile(INVITE_PATTERN.format(allow=allow), re.IGNORECASE)
+
+    def has_invite(self, text: str) -> bool:
+        """Есть ли в тексте запрещённая ссылка-приглашение"""
+        return bool(self.invite_re and text and self.invite_re.search(text))
+
+    def is_locked(self) -> bool:
+        """Действует ли блокировка чата"""
+        return self.lockdown_until is not None and self.lockdown_until > datetime.utcnow()
+
+    @classmethod
+    def from_row(cls, row: ChatSettings) -> "ChatRules":
+        return cls(row.chat_id, row.antiinvite, row.allowed_links or (), row.slowmode,
+                   row.flood_limit, row.flood_window, row.lockdown_until)
+
+    def as_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in SETTINGS_FIELDS}
+
+class ChatSettingsStore:
+    """Настройки модерации по чатам: таблица chat_settings + кеш в памяти
+
+    Чтение идёт через кеш (чат без записи кешируется с правилами по
+    умолчанию). При изменении правила компилируются заново, и снимок
+    подменяется одним присваиванием.
+    """
+
+    def __init__(self):
+        self._cache: Dict[int, ChatRules] = {}
+        self._lock = asyncio.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    async def get(self, chat_id: int) -> ChatRules:
+        """Правила чата (из кеша или из БД)"""
+        rules = self._cache.get(chat_id)
+        if rules is not None:
+            self.stats['hits'] += 1
+            return rules
+
+        self.stats['misses'] += 1
+        rules = ChatRules(chat_id)
+        if db.session_maker:
+            try:
+                async with db.get_session() as session:
+                    row = await session.get(ChatSettings, chat_id)
+                    if row:
+                        rules = ChatRules.from_row(row)
+            except Exception as e:
+                # Не кешируем - попробуем снова на следующем сообщении
+                logger.error(f"Could not load settings for chat {chat_id}: {e}")
+                return rules
+
+        self._cache[chat_id] = rules
+        return rules
+
+    async def update(self, chat_id: int, updated_by: int = None, **changes) -> ChatRules:
+        """Изменить настройки чата, сохранить и перекомпилировать правила"""
+        unknown = set(changes) - set(SETTINGS_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown chat settings: {', '.join(sorted(unknown))}")
+
+        async with self._lock:
+            current = (await self.get(chat_id)).as_dict()
+            current.update(changes)
+            rules = ChatRules(chat_id, **current)
+
+            if db.session_maker:
+                try:
+                    async with db.get_session() as session:
+                        row = await session.get(ChatSettings, chat_id)
+                        if row is None:
+                            row = ChatSettings(chat_id=chat_id)
+                            session.add(row)
+                        for field in SETTINGS_FIELDS:
+                            value = getattr(rules, field)
+                            setattr(row, field, list(value) if field == 'allowed_links' else value)
+                        row.updated_by = updated_by
+                        await session.commit()
+                except Exception as e:
+                    logger.error(f"Could not save settings for chat {chat_id}: {e}")
+
+            self._cache[chat_id] = rules
+
+        logger.info(f"Chat {chat_id} settings updated by {updated_by}: {changes}")
+        return rules
+
+    def invalidate(self, chat_id: int = None):
+        """Сбросить кеш (одного чата или весь)"""
+        if chat_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(chat_id, None)
+
+    def get_status(self) -> Dict:
+        """Состояние кеша (для админов)"""
+        return {
+            'cached': len(self._cache),
+            'active': sum(1 for rules in self._cache.values() if rules.active),
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses']
+        }
+
+# Глобальный экземпляр
+chat_settings = ChatSettingsStore()
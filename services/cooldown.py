@@ -3,6 +3,7 @@ from services.db import db
 from models import User
 from sqlalchemy import select
 from config import Config
+from services.metrics import cooldown_cache_total
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,8 +31,11 @@ class CooldownService:
                 if elapsed < timedelta(seconds=Config.COOLDOWN_SECONDS):
                     remaining = Config.COOLDOWN_SECONDS - int(elapsed.total_seconds())
                     logger.info(f"User {user_id} cooldown from cache: {remaining}s remaining")
+                    cooldown_cache_total.inc(result='hit')
                     return False, remaining
             
+            cooldown_cache_total.inc(result='miss')
+            
             # Проверяем БД если есть
             if db.session_maker:
                 try:
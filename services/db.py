@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, inspect
 from datetime import datetime
 from config import Config
+from models import Base as ModelsBase
+from services.metrics import instrument_engine
 from contextlib import asynccontextmanager
 import logging
 
@@ -46,12 +48,25 @@ class PiarRequest(Base):
     moderated_at = Column(DateTime)
     moderator_id = Column(Integer)
 
+def _create_missing_tables(conn) -> set:
+    """Один запрос списка таблиц вместо проверки каждой (create_all с checkfirst
+    на PostgreSQL - по запросу на таблицу); возвращает имена всех таблиц"""
+    existing = set(inspect(conn).get_table_names())
+    for metadata in (Base.metadata, ModelsBase.metadata):
+        missing = [table for table in metadata.sorted_tables if table.name not in existing]
+        if missing:
+            metadata.create_all(conn, tables=missing)
+            existing.update(table.name for table in missing)
+            logger.info(f"Created tables: {[table.name for table in missing]}")
+    return existing
+
 class Database:
     """Класс для работы с базой данных"""
     
     def __init__(self):
         self.engine = None
         self.session_maker = None
+        self.tables = set()
     
     async def init(self):
         """Инициализация базы данных"""
@@ -68,6 +83,7 @@ class Database:
                 echo=False,
                 pool_pre_ping=True
             )
+            instrument_engine(self.engine)
             
             self.session_maker = async_sessionmaker(
                 self.engine,
@@ -75,9 +91,9 @@ class Database:
                 expire_on_commit=False
             )
             
-            # Создаем таблицы
+            # Создаем недостающие таблицы (свои и models) за одну транзакцию
             async with self.engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
+                self.tables = await conn.run_sync(_create_missing_tables)
             
             logger.info("Database initialized successfully")
         except Exception as e:
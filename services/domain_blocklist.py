@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, func
+from config import Config
+from services.db import db
+from models import BlockedDomain
+
+logger = logging.getLogger(__name__)
+
+# Кандидаты в хосты внутри текста (схему, userinfo и путь отсекает
+# граница слова). Поиск начинается только с начала слова.
+HOST_RE = re.compile(
+    r'(?<![\w\-])((?:[\w\-]+[.。．｡])+(?:[^\W\d_]{2,}|xn--[a-z0-9\-]+))',
+    re.IGNORECASE
+)
+PATH_SPLIT_RE = re.compile(r'[/?#\\]')
+IDN_DOTS = str.maketrans({'。': '.', '．': '.', '｡': '.'})
+
+def normalize_host(value: str) -> Optional[str]:
+    """URL или хост -> нормализованный хост (нижний регистр, punycode, без www и точки в конце)"""
+    if not value:
+        return None
+
+    host = value.strip().lower().translate(IDN_DOTS)
+
+    # Схема и путь
+    if '://' in host:
+        host = host.split('://', 1)[1]
+    elif host.startswith('//'):
+        host = host[2:]
+    host = PATH_SPLIT_RE.split(host, 1)[0]
+
+    # userinfo и порт
+    host = host.rsplit('@', 1)[-1]
+    if host.startswith('['):
+        return None  # IPv6
+    host = host.split(':', 1)[0].strip('.')
+
+    if not host:
+        return None
+
+    if not host.isascii():
+        try:
+            host = host.encode('idna').decode('ascii')
+        except UnicodeError:
+            # Слишком длинная или некорректная метка - оставляем как есть
+            pass
+
+    if host.startswith('www.'):
+        host = host[4:]
+
+    return host or None
+
+class DomainSuffixTrie:
+    """Бор по меткам домена в обратном порядке (ly -> bit)
+
+    Узел - словарь метка -> дочерний узел; True означает заблокированный
+    домен. Блокировка распространяется на все поддомены, поэтому под
+    заблокированным узлом дети не хранятся.
+    """
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self._root: Dict = {}
+        self._count = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str) -> bool:
+        """Добавляет нормализованный домен, False если он уже покрыт"""
+        labels = domain.split('.')[::-1]
+        node = self._root
+        for label in labels[:-1]:
+            child = node.get(label)
+            if child is True:
+                return False
+            if child is None:
+                child = node[label] = {}
+            node = child
+        existing = node.get(labels[-1])
+        if existing is True:
+            return False
+        if existing:
+            # Более общий домен поглощает ранее добавленные поддомены
+            self._count -= self._count_terminals(existing)
+        node[labels[-1]] = True
+        self._count += 1
+        return True
+
+    @classmethod
+    def _count_terminals(cls, node: Dict) -> int:
+        return sum(1 if child is True else cls._count_terminals(child) for child in node.values())
+
+    def match(self, host: str) -> Optional[str]:
+        """Возвращает заблокированный суффикс хоста или None"""
+        labels = host.split('.')
+        node = self._root
+        for depth in range(len(labels) - 1, -1, -1):
+            child = node.get(labels[depth])
+            if child is None:
+                return None
+            if child is True:
+                return '.'.join(labels[depth:])
+            node = child
+        return None
+
+    def __len__(self) -> int:
+        return self._count
+
+class DomainBlocklist:
+    """Блок-лист доменов: Config + файл + таблица blocked_domains
+
+    Поиск идёт по снимку бора; перезагрузка строит новый бор в потоке и
+    подменяет ссылку одним присваиванием, поэтому проверки не ждут.
+    """
+
+    def __init__(self):
+        self._trie = DomainSuffixTrie(self._normalize_all(Config.BANNED_DOMAINS))
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self._stop_event = asyncio.Event()
+        self._file_mtime: Optional[float] = None
+        self._db_signature: Optional[Tuple] = None
+        self._sources: Dict[str, int] = {'config': len(self._trie), 'file': 0, 'db': 0}
+        self.last_reload: Optional[datetime] = None
+
+    @staticmethod
+    def _normalize_all(domains: Iterable[str]) -> List[str]:
+        result = []
+        for domain in domains:
+            host = normalize_host(domain)
+            if host:
+                result.append(host)
+        return result
+
+    # ============= ПРОВЕРКИ =============
+
+    def is_blocked(self, url_or_host: str) -> Optional[str]:
+        """Заблокированный домен, под который попадает URL/хост"""
+        host = normalize_host(url_or_host)
+        return self._trie.match(host) if host else None
+
+    def find_blocked(self, text: str, urls: Iterable[str] = ()) -> Optional[str]:
+        """Ищет заблокированный домен среди ссылок текста и URL из entities"""
+        trie = self._trie
+        for url in urls:
+            host = normalize_host(url)
+            if host:
+                matched = trie.match(host)
+                if matched:
+                    return matched
+
+        if text:
+            for match in HOST_RE.finditer(text):
+                host = normalize_host(match.group(1))
+                if host:
+                    matched = trie.match(host)
+                    if matched:
+                        return matched
+
+        return None
+
+    # ============= ЗАГРУЗКА =============
+
+    def _read_file(self) -> List[str]:
+        path = Config.BLOCKLIST_FILE
+        domains = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    domains.append(line)
+        return domains
+
+    async def _read_db(self) -> List[str]:
+        if not db.session_maker:
+            return []
+        async with db.get_session() as session:
+            result = await session.execute(select(BlockedDomain.domain))
+            return [row[0] for row in result.all()]
+
+    async def _db_state(self) -> Optional[Tuple]:
+        if not db.session_maker:
+            return None
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(func.count(BlockedDomain.id), func.max(BlockedDomain.id))
+            )
+            return tuple(result.one())
+
+    def _file_state(self) -> Optional[float]:
+        path = Config.BLOCKLIST_FILE
+        if not path or not os.path.exists(path):
+            return None
+        return os.path.getmtime(path)
+
+    async def reload(self) -> int:
+        """Полностью перестроить бор из всех источников"""
+        file_mtime = self._file_state()
+        file_domains = []
+        if file_mtime is not None:
+            try:
+                file_domains = await asyncio.to_thread(self._read_file)
+            except Exception as e:
+                logger.error(f"Could not read blocklist file {Config.BLOCKLIST_FILE}: {e}")
+
+        db_domains = []
+        db_signature = None
+        try:
+            db_domains = await self._read_db()
+            db_signature = await self._db_state()
+        except Exception as e:
+            logger.error(f"Could not load blocked domains from DB: {e}")
+
+        def build():
+            return DomainSuffixTrie(self._normalize_all(
+                list(Config.BANNED_DOMAINS) + file_domains + db_domains
+            ))
+
+        trie = await asyncio.to_thread(build)
+        self._trie = trie
+
+        self._file_mtime = file_mtime
+        self._db_signature = db_signature
+        self._sources = {
+            'config': len(Config.BANNED_DOMAINS),
+            'file': len(file_domains),
+            'db': len(db_domains)
+        }
+        self.last_reload = datetime.now()
+        logger.info(f"Domain blocklist reloaded: {len(trie)} domains {self._sources}")
+        return len(trie)
+
+    async def reload_if_changed(self) -> bool:
+        """Перезагрузить, если изменился файл или таблица"""
+        try:
+            db_signature = await self._db_state()
+        except Exception as e:
+            logger.warning(f"Could not check blocked domains table: {e}")
+            db_signature = self._db_signature
+
+        if self._file_state() != self._file_mtime or db_signature != self._db_signature:
+            await self.reload()
+            return True
+        return False
+
+    # ============= УПРАВЛЕНИЕ =============
+
+    async def add_domain(self, domain: str, reason: str = None, added_by: int = None) -> Optional[str]:
+        """Добавить домен в таблицу и сразу в действующий бор"""
+        host = normalize_host(domain)
+        if not host or '.' not in host:
+            return None
+
+        if db.session_maker:
+            async with db.get_session() as session:
+                existing = await session.execute(
+                    select(BlockedDomain).where(BlockedDomain.domain == host)
+                )
+                if not existing.scalar_one_or_none():
+                    session.add(BlockedDomain(domain=host, reason=reason, added_by=added_by))
+                    await session.commit()
+            self._db_signature = await self._db_state()
+
+        self._trie.add(host)
+        return host
+
+    async def remove_domain(self, domain: str) -> bool:
+        """Удалить домен из таблицы и перестроить бор"""
+        host = normalize_host(domain)
+        if not host or not db.session_maker:
+            return False
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                delete(BlockedDomain).where(BlockedDomain.domain == host)
+            )
+            await session.commit()
+            removed = result.rowcount > 0
+
+        if removed:
+            await self.reload()
+        return removed
+
+    # ============= ФОНОВАЯ ПЕРЕЗАГРУЗКА =============
+
+    async def start(self):
+        """Загрузить список и следить за изменениями"""
+        if self.task and not self.task.done():
+            logger.warning("Domain blocklist watcher already running")
+            return
+
+        await self.reload()
+
+        self.running = True
+        self._stop_event = asyncio.Event()
+        self.task = asyncio.create_task(self._watch_loop())
+        logger.info("Domain blocklist watcher started")
+
+    async def stop(self):
+        """Остановить слежение"""
+        self.running = False
+        self._stop_event.set()
+
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except asyncio.TimeoutError:
+                self.task.cancel()
+            except Exception as e:
+                logger.error(f"Error stopping domain blocklist watcher: {e}")
+            finally:
+                self.task = None
+
+        logger.info("Domain blocklist watcher stopped")
+
+    async def _watch_loop(self):
+        while self.running:
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=Config.BLOCKLIST_RELOAD_SECONDS)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                logger.error(f"Error reloading domain blocklist: {e}")
+
+    def get_status(self) -> Dict:
+        """Состояние блок-листа (для админов)"""
+        return {
+            'domains': len(self._trie),
+            'sources': dict(self._sources),
+            'file': Config.BLOCKLIST_FILE or None,
+            'last_reload': self.last_reload
+        }
+
+# Глобальный экземпляр
+domain_blocklist = DomainBlocklist()
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import select
+from config import Config
+from services.db import db
+from models import Post, PostStatus
+
+logger = logging.getLogger(__name__)
+
+# Всё, что не буква и не цифра, считаем разделителем
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+SHINGLE_SIZE = 5        # длина символьного шингла
+MIN_TEXT_LENGTH = 20    # короче - не сравниваем, слишком много ложных совпадений
+BANDS = 8               # LSH: полос
+ROWS = 4                # LSH: хешей в полосе
+NUM_HASHES = BANDS * ROWS
+
+_HASH_MASK = (1 << 64) - 1
+_EMPTY = 1 << 64
+
+def normalize_text(text: str) -> str:
+    """Нижний регистр, ё -> е, только буквы и цифры через один пробел"""
+    if not text:
+        return ""
+    return NON_WORD_RE.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+def document_text(*parts) -> str:
+    """Склеивает поля заявки (текст, имя, профессия, телефон...) в один документ"""
+    return ' '.join(str(part) for part in parts if part)
+
+def post_document(post: Post) -> str:
+    """Документ для сравнения по строке из таблицы posts"""
+    if post.is_piar:
+        return document_text(post.piar_name, post.piar_profession, post.piar_phone,
+                             post.piar_description or post.text)
+    return document_text(post.text)
+
+def minhash(text: str) -> Optional[Tuple[int, ...]]:
+    """MinHash-сигнатура по символьным шинглам нормализованного текста
+
+    Одна хеш-функция с разбиением на NUM_HASHES корзин (one permutation
+    hashing): минимум в каждой корзине, пустые корзины берут значение
+    следующей непустой.
+    """
+    normalized = normalize_text(text)
+    if len(normalized) < MIN_TEXT_LENGTH:
+        return None
+
+    # hash() строк зависит от PYTHONHASHSEED - индекс живёт в памяти
+    # и пересобирается при старте, так что это не мешает
+    bins = [_EMPTY] * NUM_HASHES
+    for i in range(len(normalized) - SHINGLE_SIZE + 1):
+        value = hash(normalized[i:i + SHINGLE_SIZE]) & _HASH_MASK
+        index = value % NUM_HASHES
+        value //= NUM_HASHES
+        if value < bins[index]:
+            bins[index] = value
+
+    # Пустая корзина берёт значение ближайшей непустой справа,
+    # смещённое на расстояние до неё (densification)
+    filled = list(bins)
+    for index, value in enumerate(bins):
+        if value == _EMPTY:
+            for step in range(1, NUM_HASHES):
+                source = bins[(index + step) % NUM_HASHES]
+                if source != _EMPTY:
+                    filled[index] = source + step * _EMPTY
+                    break
+    return tuple(filled)
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Оценка коэффициента Жаккара по двум сигнатурам"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+class DuplicateMatch(NamedTuple):
+    """Найденный почти-дубликат"""
+    post_id: int
+    similarity: float
+    status: PostStatus
+    user_id: int
+
+class _Entry(NamedTuple):
+    created: float
+    user_id: int
+    status: PostStatus
+    signature: Tuple[int, ...]
+
+class DuplicateDetector:
+    """Индекс недавних заявок для поиска почти-дубликатов (MinHash + LSH)
+
+    Хранит заявки на модерации и недавно отклонённые за окно
+    Config.DUPLICATE_WINDOW_HOURS, не больше Config.DUPLICATE_MAX_ENTRIES.
+    Кандидаты берутся из корзин LSH, поэтому проверка не перебирает весь индекс.
+    """
+
+    def __init__(self):
+        # post_id -> запись, в порядке добавления (старые первыми)
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        # (полоса, хеш полосы) -> post_id
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self.last_rebuild: Optional[datetime] = None
+        self.stats = {'checks': 0, 'duplicates': 0}
+
+    @staticmethod
+    def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+        return [(band, hash(signature[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+    # ============= ИНДЕКС =============
+
+    def add(self, post_id: int, user_id: int, text: str,
+            status: PostStatus = PostStatus.PENDING, created: float = None) -> bool:
+        """Добавить заявку в индекс, False если текст слишком короткий"""
+        signature = minhash(text)
+        if signature is None:
+            return False
+
+        self.remove(post_id)
+        self._entries[post_id] = _Entry(created or time.time(), user_id, status, signature)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(post_id)
+
+        self._evict()
+        return True
+
+    def remove(self, post_id: int):
+        """Убрать заявку из индекса"""
+        entry = self._entries.pop(post_id, None)
+        if entry is None:
+            return
+        for key in self._band_keys(entry.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(post_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def update_status(self, post_id: int, status: PostStatus):
+        """Статус после модерации: одобренные больше не считаются дубликатами"""
+        entry = self._entries.get(post_id)
+        if entry is None:
+            return
+        if status == PostStatus.APPROVED:
+            self.remove(post_id)
+        else:
+            self._entries[post_id] = entry._replace(status=status)
+
+    def _evict(self):
+        """Удаляет записи старше окна и сверх лимита"""
+        cutoff = time.time() - Config.DUPLICATE_WINDOW_HOURS * 3600
+        while self._entries:
+            post_id, entry = next(iter(self._entries.items()))
+            if entry.created >= cutoff and len(self._entries) <= Config.DUPLICATE_MAX_ENTRIES:
+                break
+            self.remove(post_id)
+
+    # ============= ПОИСК =============
+
+    def find_duplicate(self, text: str, exclude_post_id: int = None) -> Optional[DuplicateMatch]:
+        """Самая похожая заявка на модерации или недавно отклонённая"""
+        self.stats['checks'] += 1
+        signature = minhash(text)
+        if signature is None or not self._entries:
+            return None
+
+        self._evict()
+
+        candidates: Set[int] = set()
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                candidates.update(bucket)
+        candidates.discard(exclude_post_id)
+
+        best = None
+        for post_id in candidates:
+            entry = self._entries[post_id]
+            score = similarity(signature, entry.signature)
+            if score >= Config.DUPLICATE_SIMILARITY and (best is None or score > best.similarity):
+                best = DuplicateMatch(post_id, score, entry.status, entry.user_id)
+
+        if best:
+            self.stats['duplicates'] += 1
+        return best
+
+    # ============= ЗАГРУЗКА =============
+
+    async def rebuild(self) -> int:
+        """Пересобрать индекс из таблицы posts"""
+        if not db.session_maker:
+            return 0
+
+        # created_at хранится в UTC без таймзоны
+        since = datetime.utcnow() - timedelta(hours=Config.DUPLICATE_WINDOW_HOURS)
+        offset = time.time() - datetime.utcnow().timestamp()
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(Post)
+                .where(
+                    Post.created_at >= since,
+                    Post.status.in_([PostStatus.PENDING, PostStatus.REJECTED])
+                )
+                .order_by(Post.created_at.desc())
+                .limit(Config.DUPLICATE_MAX_ENTRIES)
+            )
+            posts = result.scalars().all()
+
+        self._entries.clear()
+        self._buckets.clear()
+        for post in reversed(posts):
+            created = post.created_at.timestamp() + offset if post.created_at else None
+            self.add(post.id, post.user_id, post_document(post), post.status, created)
+
+        self.last_rebuild = datetime.now()
+        logger.info(f"Duplicate index rebuilt: {len(self._entries)} posts")
+        return len(self._entries)
+
+    def get_status(self) -> Dict:
+        """Состояние индекса (для админов)"""
+        return {
+            'entries': len(self._entries),
+            'buckets': len(self._buckets),
+            'checks': self.stats['checks'],
+            'duplicates': self.stats['duplicates'],
+            'last_rebuild': self.last_rebuild
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Глобальный экземпляр
+duplicate_detector = DuplicateDetector()
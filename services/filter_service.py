@@ -1,66 +1,226 @@
 from config import Config
+from services.domain_blocklist import domain_blocklist
 import re
-from typing import List, Tuple
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Шаблоны спама: (имя, слова-триггеры, регулярка, причина).
+# Триггеры ищутся автоматом вместе с доменами, регулярка проверяется
+# только в позиции найденного триггера.
+SPAM_PATTERNS = [
+    ('financial', ('earn', 'make'), r'(?:earn|make)\s+\$?\d+\s*(?:daily|weekly|monthly)', "Financial spam"),
+    ('clickbait', ('click', 'visit'), r'(?:click|visit)\s+(?:here|this|link)', "Clickbait spam"),
+    ('guarantee', ('100%', 'guaranteed'), r'(?:100%|guaranteed)\s+(?:free|profit|income)', "Guarantee spam"),
+    ('contact', ('whatsapp', 'telegram', 'viber'), r'(?:whatsapp|telegram|viber)\s*:\s*\+?\d{10,}', "Contact spam"),
+    ('crypto', ('crypto', 'bitcoin', 'forex'), r'(?:crypto|bitcoin|forex)\s+(?:signals|trading|investment)', "Crypto spam"),
+]
+
+REPEATED_RE = re.compile(r'(.)\1{5,}')
+URL_RE = re.compile(r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}(?:\/[^\s]*)?', re.IGNORECASE)
+TG_USERNAME_RE = re.compile(r'@[a-zA-Z][a-zA-Z0-9_]{4,}')
+WHITESPACE_RE = re.compile(r'\s+')
+PHONE_STRIP_RE = re.compile(r'[\s\-\(\)]')
+PHONE_RE = re.compile(r'^\+?\d{10,15}$')
+USERNAME_RE = re.compile(r'^@?[a-zA-Z][a-zA-Z0-9_]{4,31}$')
+
+class AhoCorasick:
+    """Автомат Ахо-Корасик: поиск всех строк словаря за один проход по тексту"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        # Переходы: для каждого состояния словарь символ -> состояние
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for pattern in patterns:
+            if pattern and pattern not in self.patterns:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        index = len(self.patterns)
+        self.patterns.append(pattern)
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = next_state
+        self._output[state] = self._output[state] + (index,)
+
+    def _build(self):
+        """Строит ссылки неудач обходом бора в ширину"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+        # Символы, с которых может начаться совпадение: из корня прыгаем
+        # к следующему такому символу регуляркой, не обходя текст в Python
+        first_chars = ''.join(sorted(self._goto[0]))
+        self._start_re = re.compile(f'[{re.escape(first_chars)}]') if first_chars else None
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Возвращает (позиция конца, строка) для всех вхождений"""
+        if not self._start_re:
+            return
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        patterns = self.patterns
+        find_start = self._start_re.search
+        state = 0
+        position = 0
+        length = len(text)
+        while position < length:
+            if not state:
+                match = find_start(text, position)
+                if not match:
+                    return
+                position = match.start()
+            char = text[position]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for index in output[state]:
+                    yield position, patterns[index]
+            position += 1
+
+    def search(self, text: str) -> Optional[str]:
+        """Первое найденное вхождение или None"""
+        for _, pattern in self.iter_matches(text):
+            return pattern
+        return None
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+class FilterResult(NamedTuple):
+    """Результат проверки текста"""
+    banned_link: Optional[str]
+    banned_keyword: Optional[str]
+    spam_reason: str
+
+    @property
+    def is_clean(self) -> bool:
+        return not (self.banned_link or self.banned_keyword or self.spam_reason)
 
 class FilterService:
-    """Service for filtering content"""
-    
-    def __init__(self):
-        self.banned_domains = Config.BANNED_DOMAINS
-        
-    def contains_banned_link(self, text: str) -> bool:
-        """Check if text contains banned links"""
+    """Service for filtering content
+
+    Все шаблоны компилируются один раз: стоп-слова и слова-триггеры спама -
+    в один автомат Ахо-Корасик, регулярки спама - заранее. Ссылки
+    проверяются по блок-листу доменов (services.domain_blocklist).
+    """
+
+    def __init__(self, banned_keywords: Optional[Iterable[str]] = None):
+        self.compile(banned_keywords)
+
+    def compile(self, banned_keywords: Optional[Iterable[str]] = None):
+        """(Пере)компилировать словари и шаблоны"""
+        self.banned_keywords = [k.lower() for k in (banned_keywords if banned_keywords is not None else Config.BANNED_KEYWORDS)]
+
+        self._keywords = set(self.banned_keywords)
+
+        # Триггер -> [(скомпилированная регулярка, причина)]
+        self._spam_triggers: Dict[str, List[Tuple[re.Pattern, str]]] = {}
+        for _, triggers, pattern, reason in SPAM_PATTERNS:
+            compiled = re.compile(pattern)
+            for trigger in triggers:
+                self._spam_triggers.setdefault(trigger, []).append((compiled, reason))
+
+        self._automaton = AhoCorasick(
+            self.banned_keywords + list(self._spam_triggers)
+        )
+
+    def scan(self, text: str, urls: Iterable[str] = ()) -> FilterResult:
+        """Все проверки: ссылки по блок-листу, слова за один проход автомата
+
+        urls - ссылки из entities сообщения (url/text_link)
+        """
+        if not text and not urls:
+            return FilterResult(None, None, "")
+
+        banned_link = domain_blocklist.find_blocked(text, urls)
         if not text:
-            return False
-        
+            return FilterResult(banned_link, None, "")
+
         text_lower = text.lower()
-        
-        # Check for banned domains
-        for domain in self.banned_domains:
-            if domain in text_lower:
-                return True
-        
-        # Check for URL patterns
-        url_pattern = r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}'
-        urls = re.findall(url_pattern, text_lower)
-        
-        if urls:
-            # Check if any found URL is in banned list
-            for url in urls:
-                for domain in self.banned_domains:
-                    if domain in url:
-                        return True
-        
-        return False
-    
+
+        banned_keyword = None
+        spam_reason = ""
+        for end, found in self._automaton.iter_matches(text_lower):
+            if found in self._keywords:
+                banned_keyword = banned_keyword or found
+            if not spam_reason and found in self._spam_triggers:
+                spam_reason = self._match_trigger(text_lower, end, found)
+
+        return FilterResult(banned_link, banned_keyword, spam_reason or self._shape_spam_reason(text))
+
+    def _match_trigger(self, text_lower: str, end: int, trigger: str) -> str:
+        """Проверяет шаблоны спама, начинающиеся с найденного триггера"""
+        start = end - len(trigger) + 1
+        for compiled, reason in self._spam_triggers[trigger]:
+            if compiled.match(text_lower, start):
+                return reason
+        return ""
+
+    def _shape_spam_reason(self, text: str) -> str:
+        """Спам по форме текста: капс и повторы символов"""
+        # Check for excessive caps
+        if len(text) > 20:
+            caps_ratio = sum(map(str.isupper, text)) / len(text)
+            if caps_ratio > 0.7:
+                return "Excessive capital letters"
+
+        # Check for repeated characters
+        if REPEATED_RE.search(text):
+            return "Repeated characters spam"
+
+        return ""
+
+    def contains_banned_link(self, text: str, urls: Iterable[str] = ()) -> bool:
+        """Check if text contains banned links"""
+        if not text and not urls:
+            return False
+
+        return domain_blocklist.find_blocked(text, urls) is not None
+
     def extract_links(self, text: str) -> List[str]:
         """Extract all links from text"""
         if not text:
             return []
-        
-        # Pattern for URLs
-        url_pattern = r'(?:(?:https?|ftp):\/\/)?(?:[\w-]+\.)+[a-z]{2,}(?:\/[^\s]*)?'
-        urls = re.findall(url_pattern, text, re.IGNORECASE)
-        
-        # Pattern for Telegram usernames
-        tg_pattern = r'@[a-zA-Z][a-zA-Z0-9_]{4,}'
-        tg_usernames = re.findall(tg_pattern, text)
-        
-        return urls + tg_usernames
-    
+
+        return URL_RE.findall(text) + TG_USERNAME_RE.findall(text)
+
+    def extract_entity_urls(self, message) -> List[str]:
+        """URL из entities сообщения Telegram (url и text_link)"""
+        if message.text:
+            entities = message.parse_entities(["url", "text_link"])
+        else:
+            entities = message.parse_caption_entities(["url", "text_link"])
+        return [entity.url if entity.type == "text_link" else value for entity, value in entities.items()]
+
     def clean_text(self, text: str) -> str:
         """Clean text from unwanted content"""
         if not text:
             return ""
-        
-        # Remove multiple spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove leading/trailing whitespace
-        text = text.strip()
-        
-        return text
-    
+
+        # Remove multiple spaces and leading/trailing whitespace
+        return WHITESPACE_RE.sub(' ', text).strip()
+
     def check_spam_patterns(self, text: str) -> Tuple[bool, str]:
         """
         Check for spam patterns
@@ -68,58 +228,40 @@ class FilterService:
         """
         if not text:
             return False, ""
-        
+
         text_lower = text.lower()
-        
-        # Common spam patterns
-        spam_patterns = [
-            (r'(?:earn|make)\s+\$?\d+\s*(?:daily|weekly|monthly)', "Financial spam"),
-            (r'(?:click|visit)\s+(?:here|this|link)', "Clickbait spam"),
-            (r'(?:100%|guaranteed)\s+(?:free|profit|income)', "Guarantee spam"),
-            (r'(?:whatsapp|telegram|viber)\s*:\s*\+?\d{10,}', "Contact spam"),
-            (r'(?:crypto|bitcoin|forex)\s+(?:signals|trading|investment)', "Crypto spam")
-        ]
-        
-        for pattern, reason in spam_patterns:
-            if re.search(pattern, text_lower):
-                return True, reason
-        
-        # Check for excessive caps
-        if len(text) > 20:
-            caps_ratio = sum(1 for c in text if c.isupper()) / len(text)
-            if caps_ratio > 0.7:
-                return True, "Excessive capital letters"
-        
-        # Check for repeated characters
-        if re.search(r'(.)\1{5,}', text):
-            return True, "Repeated characters spam"
-        
-        return False, ""
-    
+        for end, found in self._automaton.iter_matches(text_lower):
+            if found in self._spam_triggers:
+                reason = self._match_trigger(text_lower, end, found)
+                if reason:
+                    return True, reason
+
+        reason = self._shape_spam_reason(text)
+        return bool(reason), reason
+
     def is_valid_phone(self, phone: str) -> bool:
         """Validate phone number format"""
         # Remove spaces and dashes
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
-        
-        # Check if it matches phone pattern
-        pattern = r'^\+?\d{10,15}$'
-        return bool(re.match(pattern, phone))
-    
+        phone = PHONE_STRIP_RE.sub('', phone)
+        return bool(PHONE_RE.match(phone))
+
     def is_valid_username(self, username: str) -> bool:
         """Validate Telegram username"""
-        pattern = r'^@?[a-zA-Z][a-zA-Z0-9_]{4,31}$'
-        return bool(re.match(pattern, username))
-    
+        return bool(USERNAME_RE.match(username))
+
     def sanitize_html(self, text: str) -> str:
         """Sanitize text for HTML display"""
         if not text:
             return ""
-        
+
         # Escape HTML special characters
         text = text.replace('&', '&amp;')
         text = text.replace('<', '&lt;')
         text = text.replace('>', '&gt;')
         text = text.replace('"', '&quot;')
         text = text.replace("'", '&#39;')
-        
+
         return text
+
+# Общий экземпляр, компилируется один раз при импорте
+filter_service = FilterService()
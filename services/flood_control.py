@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+from config import Config
+from services.chat_settings import ChatRules
+from services.moderation_expiry import MUTED_PERMISSIONS
+
+logger = logging.getLogger(__name__)
+
+class FloodVerdict(NamedTuple):
+    """Что сделать с сообщением: reason = slowmode | flood | restricted"""
+    reason: str
+    message_ids: Tuple[int, ...]
+
+class _Window:
+    """Скользящее окно одного пользователя в одном чате"""
+
+    __slots__ = ('events', 'last', 'restricted_until')
+
+    def __init__(self, size: int):
+        # (время, message_id) последних сообщений, не больше flood_limit
+        self.events: Deque[Tuple[float, int]] = deque(maxlen=size)
+        self.last = 0.0
+        self.restricted_until = 0.0
+
+class FloodControl:
+    """Антифлуд и медленный режим по (чат, пользователь)
+
+    Окна хранятся в OrderedDict в порядке последней активности: при каждой
+    проверке окно переносится в конец, а с начала вытесняются простаивающие
+    дольше Config.FLOOD_IDLE_SECONDS, поэтому отдельная чистка не нужна.
+    """
+
+    def __init__(self):
+        self._windows: "OrderedDict[Tuple[int, int], _Window]" = OrderedDict()
+        self.stats = {'checked': 0, 'slowmode': 0, 'flood': 0, 'evicted': 0}
+
+    # ============= ПРОВЕРКА =============
+
+    def check(self, chat_id: int, user_id: int, message_id: int,
+              rules: ChatRules, now: float = None) -> Optional[FloodVerdict]:
+        """Учитывает сообщение, возвращает вердикт или None если всё в порядке"""
+        if not (rules.flood_limit or rules.slowmode):
+            return None
+
+        now = now or time.monotonic()
+        self.stats['checked'] += 1
+
+        self._evict(now)
+
+        key = (chat_id, user_id)
+        windows = self._windows
+        window = windows.get(key)
+        size = max(rules.flood_limit, 1)
+        if window is None:
+            window = windows[key] = _Window(size)
+        else:
+            windows.move_to_end(key)
+            if window.events.maxlen != size:
+                window.events = deque(window.events, maxlen=size)
+
+        # Ограничение ещё не дошло до Telegram - удаляем всё подряд
+        if window.restricted_until > now:
+            return FloodVerdict('restricted', (message_id,))
+
+        if rules.slowmode and now - window.last < rules.slowmode:
+            self.stats['slowmode'] += 1
+            return FloodVerdict('slowmode', (message_id,))
+
+        window.last = now
+        events = window.events
+
+        if rules.flood_limit and len(events) == rules.flood_limit and now - events[0][0] <= rules.flood_window:
+            message_ids = tuple(message for _, message in events) + (message_id,)
+            events.clear()
+            window.restricted_until = now + Config.FLOOD_MUTE_SECONDS
+            self.stats['flood'] += 1
+            return FloodVerdict('flood', message_ids)
+
+        events.append((now, message_id))
+        return None
+
+    def _evict(self, now: float):
+        """Вытесняет окна без активности и сверх лимита"""
+        windows = self._windows
+        idle_before = now - Config.FLOOD_IDLE_SECONDS
+        while windows:
+            key, window = next(iter(windows.items()))
+            idle = window.last < idle_before and window.restricted_until < now
+            if not idle and len(windows) <= Config.FLOOD_MAX_TRACKED:
+                break
+            del windows[key]
+            self.stats['evicted'] += 1
+
+    # ============= ДЕЙСТВИЯ =============
+
+    async def apply(self, bot, chat_id: int, user_id: int, verdict: FloodVerdict) -> int:
+        """Удаляет сообщения пачками и при флуде ограничивает пользователя"""
+        deleted = await self._delete_batch(bot, chat_id, verdict.message_ids)
+
+        if verdict.reason == 'flood':
+            try:
+                await bot.restrict_chat_member(
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    permissions=MUTED_PERMISSIONS,
+                    until_date=datetime.now(timezone.utc) + timedelta(seconds=Config.FLOOD_MUTE_SECONDS)
+                )
+                logger.info(f"🌊 Flood: user {user_id} restricted in {chat_id}, {deleted} messages deleted")
+            except Exception as e:
+                logger.error(f"Could not restrict flooder {user_id} in {chat_id}: {e}")
+
+        return deleted
+
+    async def _delete_batch(self, bot, chat_id: int, message_ids: Tuple[int, ...]) -> int:
+        batch_size = max(1, Config.EXPIRY_BATCH_SIZE)
+        deleted = 0
+        for start in range(0, len(message_ids), batch_size):
+            batch = message_ids[start:start + batch_size]
+            results = await asyncio.gather(
+                *(bot.delete_message(chat_id=chat_id, message_id=message_id) for message_id in batch),
+                return_exceptions=True
+            )
+            deleted += sum(1 for result in results if result is True)
+        return deleted
+
+    def reset(self, chat_id: int, user_id: int = None):
+        """Сбросить окна пользователя или всего чата"""
+        if user_id is not None:
+            self._windows.pop((chat_id, user_id), None)
+            return
+        for key in [key for key in self._windows if key[0] == chat_id]:
+            del self._windows[key]
+
+    def get_status(self) -> Dict:
+        """Состояние антифлуда (для админов)"""
+        return {'tracked': len(self._windows), **self.stats}
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+# Глобальный экземпляр
+flood_control = FloodControl()
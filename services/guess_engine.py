@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SPACES_RE = re.compile(r'\s+')
+
+def normalize_answer(word: str) -> str:
+    """Ответ для сравнения: нижний регистр, ё -> е, одиночные пробелы"""
+    return SPACES_RE.sub(' ', (word or '').lower().replace('ё', 'е')).strip()
+
+class GuessResult(NamedTuple):
+    """status: inactive | cooldown | wrong | winner | late"""
+    status: str
+    word: Optional[str] = None
+    winner: Optional[str] = None
+    remaining: int = 0
+
+class AttemptLog:
+    """Время последних попыток: user_id -> monotonic
+
+    Порядок OrderedDict совпадает с порядком попыток, поэтому записи старше
+    интервала всегда в начале и вытесняются за O(1) на попытку. В памяти
+    только пользователи, пробовавшие в пределах текущего интервала.
+    """
+
+    __slots__ = ('_last',)
+
+    def __init__(self):
+        self._last: 'OrderedDict[int, float]' = OrderedDict()
+
+    def _evict(self, now: float, interval: float):
+        last = self._last
+        while last:
+            user_id, at = next(iter(last.items()))
+            if now - at < interval:
+                break
+            del last[user_id]
+
+    def try_record(self, user_id: int, interval: float, now: float) -> float:
+        """Записать попытку; если интервал не прошёл - сколько секунд ждать"""
+        self._evict(now, interval)
+        at = self._last.get(user_id)
+        if at is not None:
+            return interval - (now - at)
+        self._last[user_id] = now
+        return 0
+
+    def clear(self):
+        self._last.clear()
+
+    def __len__(self):
+        return len(self._last)
+
+class _Round:
+    __slots__ = ('word', 'answer', 'answer_hash', 'winner', 'started')
+
+    def __init__(self, word: str):
+        self.word = word
+        self.answer = normalize_answer(word)
+        self.answer_hash = hash(self.answer)
+        self.winner: Optional[str] = None
+        self.started = time.monotonic()
+
+class GuessEngine:
+    """Проверка ответов в игре "Угадай слово" (NEED / TRY / MORE)
+
+    guess() не содержит await: проверка интервала, сравнение с ответом и
+    фиксация победителя выполняются целиком до следующего переключения
+    задач, поэтому победитель у раунда ровно один.
+    """
+
+    def __init__(self):
+        self._rounds: Dict[str, _Round] = {}
+        self._attempts: Dict[str, AttemptLog] = {}
+        self.stats = {'guesses': 0, 'cooldown': 0, 'wrong': 0, 'late': 0, 'winners': 0}
+
+    def start(self, game_version: str, word: str):
+        """Новый раунд с загаданным словом"""
+        self._rounds[game_version] = _Round(word)
+        logger.info(f"Guess round started [{game_version}]")
+
+    def stop(self, game_version: str):
+        self._rounds.pop(game_version, None)
+
+    def is_active(self, game_version: str) -> bool:
+        game_round = self._rounds.get(game_version)
+        return game_round is not None and game_round.winner is None
+
+    def guess(self, game_version: str, user_id: int, username: str, text: str,
+              interval_minutes: int, now: float = None) -> GuessResult:
+        """Попытка пользователя (атомарно в пределах event loop)"""
+        game_round = self._rounds.get(game_version)
+        if game_round is None:
+            return GuessResult('inactive')
+        if game_round.winner is not None:
+            self.stats['late'] += 1
+            return GuessResult('late', game_round.word, game_round.winner)
+
+        now = time.monotonic() if now is None else now
+        attempts = self._attempts.get(game_version)
+        if attempts is None:
+            attempts = self._attempts[game_version] = AttemptLog()
+        remaining = attempts.try_record(user_id, interval_minutes * 60, now)
+        if remaining > 0:
+            self.stats['cooldown'] += 1
+            return GuessResult('cooldown', remaining=int(remaining) + 1)
+
+        self.stats['guesses'] += 1
+        answer = normalize_answer(text)
+        if hash(answer) != game_round.answer_hash or answer != game_round.answer:
+            self.stats['wrong'] += 1
+            return GuessResult('wrong', game_round.word)
+
+        game_round.winner = username
+        self.stats['winners'] += 1
+        return GuessResult('winner', game_round.word, username)
+
+    def reset_attempts(self, game_version: str = None):
+        """Сбросить интервалы попыток (версии или всех)"""
+        if game_version is None:
+            self._attempts.clear()
+        else:
+            self._attempts.pop(game_version, None)
+
+    def get_status(self) -> Dict:
+        return {
+            'active': [version for version in self._rounds if self.is_active(version)],
+            'tracked_attempts': sum(len(log) for log in self._attempts.values()),
+            **self.stats
+        }
+
+# Глобальный экземпляр
+guess_engine = GuessEngine()
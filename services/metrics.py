@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import bisect
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from telegram.request import HTTPXRequest
+from config import Config
+from services.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+# Границы по умолчанию для гистограмм задержек (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """Формирует строку меток {a="1",b="2"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """Базовый класс метрики с метками"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Монотонно растущий счётчик"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Gauge(_Metric):
+    """Текущее значение; может вычисляться функцией в момент сбора"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """Значение без меток берётся из функции при каждом сборе"""
+        self._function = function
+
+    def get(self, **labels) -> float:
+        if self._function and not labels:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        if self._function:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.error(f"Error collecting gauge {self.name}: {e}")
+                return []
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Histogram(_Metric):
+    """Гистограмма с накопительными бакетами"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [счётчики по бакетам (+Inf последний), сумма]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Замеряет время выполнения блока"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def total_count(self) -> int:
+        return sum(sum(counts) for counts, _ in self._values.values())
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Глобальный реестр
+metrics = MetricsRegistry()
+
+# ============= МЕТРИКИ БОТА =============
+
+updates_total = metrics.counter(
+    "trix_updates_total", "Updates received by type", ["type"])
+update_classes_total = metrics.counter(
+    "trix_update_classes_total", "Updates by pre-dispatch class (drop, count, moderator, normal)", ["class"])
+replayed_updates_total = metrics.counter(
+    "trix_replayed_updates_total", "Pending updates found at startup (replayed, stale, duplicate, error)", ["result"])
+handler_latency = metrics.histogram(
+    "trix_handler_latency_seconds", "Handler latency by route", ["route"])
+telegram_api_latency = metrics.histogram(
+    "trix_telegram_api_latency_seconds", "Telegram Bot API call latency", ["method"])
+telegram_api_429_total = metrics.counter(
+    "trix_telegram_api_429_total", "Telegram Bot API calls answered with 429 Too Many Requests", ["method"])
+db_query_latency = metrics.histogram(
+    "trix_db_query_latency_seconds", "Database query latency by statement type", ["operation"])
+cooldown_cache_total = metrics.counter(
+    "trix_cooldown_cache_total", "Cooldown checks answered from cache (hit) or database (miss)", ["result"])
+user_data_size = metrics.gauge(
+    "trix_user_data_size", "Users tracked in the in-memory user_data store")
+scheduler_lag = metrics.histogram(
+    "trix_scheduler_lag_seconds", "Delay between planned and actual scheduler wakeup", ["scheduler"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 60.0))
+
+def _user_data_size() -> int:
+    from data.user_data import user_data
+    return len(user_data)
+
+user_data_size.set_function(_user_data_size)
+
+def get_update_type(update) -> str:
+    """Тип апдейта: message, callback_query, ... (команды отдельно)"""
+    message = getattr(update, 'message', None)
+    if message and message.text and message.text.startswith('/'):
+        return 'command'
+    for update_type in ('message', 'edited_message', 'callback_query', 'channel_post',
+                        'edited_channel_post', 'my_chat_member', 'chat_member',
+                        'chat_join_request', 'inline_query'):
+        if getattr(update, update_type, None):
+            return update_type
+    return 'other'
+
+# ============= ИНСТРУМЕНТАЦИЯ =============
+
+class MetricsRequest(HTTPXRequest):
+    """HTTPXRequest, замеряющий задержку и 429 ответы Bot API"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            telegram_api_latency.observe(elapsed, method=api_method)
+            record_span('api', elapsed)
+        if code == 429:
+            telegram_api_429_total.inc(method=api_method)
+        return code, payload
+
+def instrument_engine(engine):
+    """Подключает замер задержки запросов к SQLAlchemy engine"""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        elapsed = time.perf_counter() - starts.pop()
+        db_query_latency.observe(elapsed, operation=operation)
+        record_span('db', elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        # after_cursor_execute при ошибке запроса не вызывается - иначе
+        # отметки времени копились бы в conn.info
+        conn = exception_context.connection
+        if conn is None or exception_context.statement is None:
+            return
+        starts = conn.info.get('metrics_query_start')
+        if starts:
+            starts.pop()
+
+# ============= HTTP ЭНДПОИНТ =============
+
+class MetricsServer:
+    """Минимальный HTTP сервер, отдающий /metrics"""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Запустить сервер метрик"""
+        if not Config.METRICS_ENABLED:
+            logger.info("Metrics endpoint disabled")
+            return
+        if self.server:
+            logger.warning("Metrics server already running")
+            return
+
+        try:
+            self.server = await asyncio.start_server(
+                self._handle, Config.METRICS_HOST, Config.METRICS_PORT
+            )
+            logger.info(f"Metrics endpoint on http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+        except Exception as e:
+            logger.error(f"Could not start metrics server: {e}")
+
+    async def stop(self):
+        """Остановить сервер метрик"""
+        if self.server:
+            self.server.close()
+            try:
+                await self.server.wait_closed()
+            except Exception as e:
+                logger.error(f"Error stopping metrics server: {e}")
+            self.server = None
+            logger.info("Metrics server stopped")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Заголовки не нужны, но их надо вычитать
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if not line or line in (b'\r\n', b'\n'):
+                    break
+
+            parts = request_line.decode('latin-1').split()
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else ''
+
+            if len(parts) > 1 and parts[0] == 'GET' and path in ('/metrics', '/'):
+                status, body = "200 OK", self.registry.render().encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status, body = "404 Not Found", b"not found\n"
+                content_type = "text/plain; charset=utf-8"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.warning(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+# Глобальный экземпляр сервера
+metrics_server = MetricsServer(metrics)
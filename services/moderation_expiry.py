@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from telegram import ChatPermissions
+from config import Config
+from services.metrics import scheduler_lag
+from data.user_data import ban_user, unban_user, mute_user, unmute_user
+
+logger = logging.getLogger(__name__)
+
+# Права в чате для замученного и для обычного участника
+MUTED_PERMISSIONS = ChatPermissions(
+    can_send_messages=False,
+    can_send_polls=False,
+    can_send_other_messages=False,
+    can_add_web_page_previews=False
+)
+DEFAULT_PERMISSIONS = ChatPermissions(
+    can_send_messages=True,
+    can_send_polls=True,
+    can_send_other_messages=True,
+    can_add_web_page_previews=True
+)
+
+class ModerationExpiryService:
+    """Движок истечения мутов и временных банов
+
+    Держит упорядоченный индекс (heap) сроков истечения и спит ровно до
+    ближайшего из них. Изменения прав в Telegram копятся в очереди и
+    отправляются пачками по Config.EXPIRY_BATCH_SIZE.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self._heap: List[Tuple[datetime, str, int]] = []
+        self._expiry: Dict[Tuple[str, int], datetime] = {}
+        self._pending: List[Tuple[str, int, Optional[datetime]]] = []
+        self._wakeup = asyncio.Event()
+
+    def set_bot(self, bot):
+        """Устанавливает экземпляр бота"""
+        self.bot = bot
+        logger.info("Bot instance set for moderation expiry service")
+
+    # ============= ПРИМЕНЕНИЕ И СНЯТИЕ =============
+
+    def apply_mute(self, user_id: int, until: datetime):
+        """Замутить пользователя и поставить мут в индекс"""
+        mute_user(user_id, until)
+        self._schedule('mute', user_id, until)
+        self._enqueue('restrict', user_id, until)
+
+    def lift_mute(self, user_id: int):
+        """Снять мут досрочно"""
+        unmute_user(user_id)
+        self._expiry.pop(('mute', user_id), None)
+        self._enqueue('unrestrict', user_id)
+
+    def apply_ban(self, user_id: int, reason: str, until: Optional[datetime] = None):
+        """Забанить пользователя (until=None - навсегда)"""
+        ban_user(user_id, reason, until)
+        if until:
+            self._schedule('ban', user_id, until)
+        else:
+            self._expiry.pop(('ban', user_id), None)
+        self._enqueue('ban', user_id, until)
+
+    def lift_ban(self, user_id: int):
+        """Снять бан досрочно"""
+        unban_user(user_id)
+        self._expiry.pop(('ban', user_id), None)
+        self._enqueue('unban', user_id)
+
+    def _schedule(self, kind: str, user_id: int, until: datetime):
+        """Добавляет срок в индекс (until - aware UTC, как until_date Telegram);
+        старые записи становятся устаревшими"""
+        self._expiry[(kind, user_id)] = until
+        heapq.heappush(self._heap, (until, kind, user_id))
+        self._wakeup.set()
+
+    def _enqueue(self, action: str, user_id: int, until: Optional[datetime] = None):
+        """Ставит вызов Telegram API в очередь на пакетную отправку"""
+        if not Config.ENFORCEMENT_CHAT_IDS:
+            return
+        self._pending.append((action, user_id, until))
+        self._wakeup.set()
+
+    def next_expiry(self) -> Optional[datetime]:
+        """Ближайший актуальный срок истечения"""
+        while self._heap:
+            until, kind, user_id = self._heap[0]
+            if self._expiry.get((kind, user_id)) == until:
+                return until
+            heapq.heappop(self._heap)
+        return None
+
+    def _pop_expired(self, now: datetime) -> List[Tuple[str, int]]:
+        """Снимает из индекса все истёкшие записи"""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            until, kind, user_id = heapq.heappop(self._heap)
+            if self._expiry.get((kind, user_id)) != until:
+                continue
+            del self._expiry[(kind, user_id)]
+            expired.append((kind, user_id))
+        return expired
+
+    # ============= ЦИКЛ =============
+
+    async def start(self):
+        """Запустить движок истечения"""
+        if self.task and not self.task.done():
+            logger.warning("Moderation expiry service already running")
+            return
+
+        self.running = True
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self.task = asyncio.create_task(self._expiry_loop())
+        logger.info("Moderation expiry service started")
+
+    async def stop(self):
+        """Остановить движок, отправив накопленные изменения"""
+        self.running = False
+        self._wakeup.set()
+
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except asyncio.TimeoutError:
+                self.task.cancel()
+                try:
+                    await self.task
+                except asyncio.CancelledError:
+                    pass
+            except Exception as e:
+                logger.error(f"Error stopping moderation expiry service: {e}")
+            finally:
+                self.task = None
+
+        logger.info("Moderation expiry service stopped")
+
+    async def _expiry_loop(self):
+        """Спит до ближайшего истечения или до нового события"""
+        logger.info("Moderation expiry loop started")
+
+        try:
+            while self.running:
+                self._wakeup.clear()
+
+                now = datetime.now(timezone.utc)
+                next_expiry = self.next_expiry()
+                if next_expiry and next_expiry <= now:
+                    scheduler_lag.observe((now - next_expiry).total_seconds(), scheduler='moderation_expiry')
+
+                for kind, user_id in self._pop_expired(now):
+                    if kind == 'mute':
+                        unmute_user(user_id)
+                        self._enqueue('unrestrict', user_id)
+                    else:
+                        unban_user(user_id)
+                        self._enqueue('unban', user_id)
+                    logger.info(f"{kind} expired for user {user_id}")
+
+                await self._flush()
+
+                next_expiry = self.next_expiry()
+                timeout = None
+                if next_expiry:
+                    timeout = max(0.0, (next_expiry - datetime.now(timezone.utc)).total_seconds())
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            await self._flush()
+
+        except asyncio.CancelledError:
+            logger.info("Moderation expiry loop cancelled")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in moderation expiry loop: {e}", exc_info=True)
+        finally:
+            logger.info("Moderation expiry loop finished")
+
+    async def _flush(self):
+        """Отправляет накопленные изменения прав пачками"""
+        if not self._pending:
+            return
+
+        if not self.bot:
+            logger.warning("Bot instance not set, chat permissions are not synced")
+            self._pending.clear()
+            return
+
+        pending, self._pending = self._pending, []
+        calls = [
+            (action, chat_id, user_id, until)
+            for action, user_id, until in pending
+            for chat_id in Config.ENFORCEMENT_CHAT_IDS
+        ]
+
+        batch_size = max(1, Config.EXPIRY_BATCH_SIZE)
+        for i in range(0, len(calls), batch_size):
+            batch = calls[i:i + batch_size]
+            results = await asyncio.gather(
+                *(self._call(*call) for call in batch),
+                return_exceptions=True
+            )
+            for call, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Could not {call[0]} user {call[2]} in chat {call[1]}: {result}")
+
+            if i + batch_size < len(calls):
+                await asyncio.sleep(1)
+
+        logger.info(f"Synced {len(calls)} chat permission changes")
+
+    async def _call(self, action: str, chat_id: int, user_id: int, until: Optional[datetime]):
+        """Один вызов Telegram API"""
+        if action == 'restrict':
+            return await self.bot.restrict_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                permissions=MUTED_PERMISSIONS,
+                until_date=until
+            )
+        if action == 'unrestrict':
+            return await self.bot.restrict_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                permissions=DEFAULT_PERMISSIONS
+            )
+        if action == 'ban':
+            return await self.bot.ban_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                until_date=until
+            )
+        if action == 'unban':
+            return await self.bot.unban_chat_member(
+                chat_id=chat_id,
+                user_id=user_id,
+                only_if_banned=True
+            )
+
+    def get_status(self) -> Dict:
+        """Состояние индекса (для админов)"""
+        next_expiry = self.next_expiry()
+        return {
+            'running': self.running,
+            'scheduled': len(self._expiry),
+            'pending_calls': len(self._pending),
+            'next_expiry': next_expiry
+        }
+
+# Глобальный экземпляр сервиса
+moderation_expiry = ModerationExpiryService()
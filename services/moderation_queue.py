@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from telegram import InlineKeyboardMarkup
+from config import Config
+from services.db import db
+from models import ModerationClaim
+
+logger = logging.getLogger(__name__)
+
+# Отметка на сообщении заявки, вернувшейся в очередь
+RETURNED_NOTE = "\n\n🔁 Время на обработку истекло - заявка снова в очереди"
+
+# "#123 текст" - ответ модератора для конкретной заявки
+POST_REF_RE = re.compile(r'^#(\d+)\s+')
+
+class Claim:
+    """Заявка, взятая модератором (копия строки moderation_claims)"""
+
+    __slots__ = ('post_id', 'moderator_id', 'moderator_name', 'action', 'post_user_id',
+                 'chat_id', 'message_id', 'message_text', 'markup', 'prompt_message_id',
+                 'claimed_at', 'expires_at')
+
+    def __init__(self, row: ModerationClaim):
+        for name in self.__slots__:
+            setattr(self, name, getattr(row, name))
+
+class ModerationQueue:
+    """Закрепление заявок за модераторами (claim с арендой)
+
+    - нажатие "Опубликовать"/"Отклонить" берёт заявку: строка в
+      moderation_claims ставится условным UPDATE или INSERT по первичному
+      ключу, поэтому из двух одновременных нажатий выигрывает одно;
+    - у модератора может быть несколько заявок в работе: ответ относится к
+      заявке, на инструкцию которой он ответил, к "#ID ..." или к последней
+      взятой;
+    - каждое действие модератора продлевает аренду на MODERATION_CLAIM_MINUTES;
+      просроченная заявка возвращается в очередь - в группе модерации
+      восстанавливаются текст и кнопки.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self._claims: Dict[int, Claim] = {}
+        self._wakeup = asyncio.Event()
+        self.stats = {'claimed': 0, 'conflicts': 0, 'renewed': 0, 'lost': 0, 'completed': 0, 'expired': 0}
+
+    def set_bot(self, bot):
+        """Устанавливает экземпляр бота"""
+        self.bot = bot
+
+    @staticmethod
+    def _lease_until(now: datetime) -> datetime:
+        return now + timedelta(minutes=Config.MODERATION_CLAIM_MINUTES)
+
+    # ============= ВЗЯТИЕ И ЗАВЕРШЕНИЕ =============
+
+    async def claim(self, post_id: int, moderator_id: int, moderator_name: str, action: str,
+                    post_user_id: int, message=None) -> Tuple[Optional[Claim], Optional[Claim]]:
+        """Взять заявку: (claim, None) или (None, активная заявка другого модератора)"""
+        now = datetime.utcnow()
+        values = {
+            'moderator_id': moderator_id,
+            'moderator_name': moderator_name,
+            'action': action,
+            'post_user_id': post_user_id,
+            'claimed_at': now,
+            'expires_at': self._lease_until(now)
+        }
+
+        async with db.get_session() as session:
+            # Своя заявка (смена действия) или просроченная чужая - перехватываем.
+            # Сообщение в группе не перезаписываем: в строке остаётся вид до взятия
+            result = await session.execute(
+                update(ModerationClaim)
+                .where(ModerationClaim.post_id == post_id)
+                .where(or_(ModerationClaim.expires_at <= now, ModerationClaim.moderator_id == moderator_id))
+                .values(**values)
+            )
+            if result.rowcount == 0:
+                if message is not None:
+                    values.update(
+                        chat_id=message.chat_id,
+                        message_id=message.message_id,
+                        message_text=(message.text or '').replace(RETURNED_NOTE, '') or None,
+                        markup=message.reply_markup.to_dict() if message.reply_markup else None
+                    )
+                session.add(ModerationClaim(post_id=post_id, **values))
+            try:
+                await session.commit()
+            except IntegrityError:
+                await session.rollback()
+                holder = await session.get(ModerationClaim, post_id)
+                self.stats['conflicts'] += 1
+                logger.info(f"Post {post_id}: claim by {moderator_id} lost to {holder.moderator_id if holder else '?'}")
+                return None, Claim(holder) if holder else None
+
+            row = await session.get(ModerationClaim, post_id)
+            claim = self._claims[post_id] = Claim(row)
+
+        self.stats['claimed'] += 1
+        self._wakeup.set()
+        logger.info(f"Post {post_id} claimed by {moderator_id} ({action}) until {claim.expires_at}")
+        return claim, None
+
+    async def renew(self, claim: Claim) -> bool:
+        """Продлить аренду; False - заявка уже не закреплена за модератором"""
+        expires_at = self._lease_until(datetime.utcnow())
+        async with db.get_session() as session:
+            result = await session.execute(
+                update(ModerationClaim)
+                .where(ModerationClaim.post_id == claim.post_id)
+                .where(ModerationClaim.moderator_id == claim.moderator_id)
+                .values(expires_at=expires_at)
+            )
+            await session.commit()
+
+        if result.rowcount == 0:
+            self.stats['lost'] += 1
+            if self._claims.get(claim.post_id) is claim:
+                del self._claims[claim.post_id]
+            return False
+
+        claim.expires_at = expires_at
+        self.stats['renewed'] += 1
+        return True
+
+    async def complete(self, claim: Claim):
+        """Заявка обработана - снять закрепление"""
+        async with db.get_session() as session:
+            await session.execute(
+                delete(ModerationClaim)
+                .where(ModerationClaim.post_id == claim.post_id)
+                .where(ModerationClaim.moderator_id == claim.moderator_id)
+            )
+            await session.commit()
+        if self._claims.get(claim.post_id) is claim:
+            del self._claims[claim.post_id]
+        self.stats['completed'] += 1
+
+    async def set_prompt(self, claim: Claim, message_id: int):
+        """Запомнить инструкцию модератору - ответы на неё относятся к этой заявке"""
+        claim.prompt_message_id = message_id
+        async with db.get_session() as session:
+            await session.execute(
+                update(ModerationClaim)
+                .where(ModerationClaim.post_id == claim.post_id)
+                .values(prompt_message_id=message_id)
+            )
+            await session.commit()
+
+    # ============= ЗАЯВКИ МОДЕРАТОРА =============
+
+    def claims_of(self, moderator_id: int) -> List[Claim]:
+        """Заявки модератора, от давно взятых к последней"""
+        claims = [claim for claim in self._claims.values() if claim.moderator_id == moderator_id]
+        return sorted(claims, key=lambda claim: claim.claimed_at)
+
+    def has_claims(self, moderator_id: int) -> bool:
+        return any(claim.moderator_id == moderator_id for claim in self._claims.values())
+
+    def resolve(self, moderator_id: int, text: str,
+                reply_to_message_id: Optional[int] = None) -> Tuple[Optional[Claim], str]:
+        """К какой заявке относится сообщение модератора: (claim, текст без "#ID")
+
+        "#ID" чужой или не взятой заявки - (None, текст): такое сообщение не
+        должно достаться последней заявке модератора."""
+        claims = self.claims_of(moderator_id)
+        if not claims:
+            return None, text
+
+        if reply_to_message_id:
+            for claim in claims:
+                if claim.prompt_message_id == reply_to_message_id:
+                    return claim, text
+
+        match = POST_REF_RE.match(text)
+        if match:
+            claim = self._claims.get(int(match.group(1)))
+            if claim and claim.moderator_id == moderator_id:
+                return claim, text[match.end():]
+            return None, text
+
+        return claims[-1], text
+
+    # ============= ИСТЕЧЕНИЕ =============
+
+    async def load(self):
+        """Загрузить закрепления из БД (после перезапуска)"""
+        if not db.session_maker:
+            return
+        async with db.get_session() as session:
+            result = await session.execute(select(ModerationClaim))
+            self._claims = {row.post_id: Claim(row) for row in result.scalars()}
+        logger.info(f"Loaded {len(self._claims)} moderation claims")
+
+    async def start(self):
+        """Загрузить закрепления и запустить возврат просроченных в очередь"""
+        if self.task and not self.task.done():
+            logger.warning("Moderation queue already running")
+            return
+
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Could not load moderation claims: {e}")
+
+        self.running = True
+        self._wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._expiry_loop())
+        logger.info("Moderation queue started")
+
+    async def stop(self):
+        self.running = False
+        self._wakeup.set()
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except asyncio.TimeoutError:
+                self.task.cancel()
+            except Exception as e:
+                logger.error(f"Error stopping moderation queue: {e}")
+            finally:
+                self.task = None
+        logger.info("Moderation queue stopped")
+
+    async def _expiry_loop(self):
+        """Спит до ближайшего истечения аренды или до нового закрепления"""
+        while self.running:
+            self._wakeup.clear()
+            try:
+                await self._expire(datetime.utcnow())
+            except Exception as e:
+                logger.error(f"Error expiring moderation claims: {e}", exc_info=True)
+
+            timeout = None
+            if self._claims:
+                next_expiry = min(claim.expires_at for claim in self._claims.values())
+                timeout = max(1.0, (next_expiry - datetime.utcnow()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, now: datetime):
+        expired = [claim for claim in self._claims.values() if claim.expires_at <= now]
+        for claim in expired:
+            async with db.get_session() as session:
+                # Условие по сроку: продлённую за это время заявку не трогаем
+                result = await session.execute(
+                    delete(ModerationClaim)
+                    .where(ModerationClaim.post_id == claim.post_id)
+                    .where(ModerationClaim.expires_at <= now)
+                )
+                await session.commit()
+
+            if self._claims.get(claim.post_id) is claim:
+                del self._claims[claim.post_id]
+            if result.rowcount == 0:
+                continue
+
+            self.stats['expired'] += 1
+            logger.info(f"Claim on post {claim.post_id} by {claim.moderator_id} expired, back to queue")
+            await self._return_to_queue(claim)
+
+    async def _return_to_queue(self, claim: Claim):
+        """Вернуть сообщению заявки кнопки и сообщить модератору"""
+        if not self.bot:
+            return
+
+        if claim.chat_id and claim.message_id:
+            markup = InlineKeyboardMarkup.de_json(claim.markup, self.bot) if claim.markup else None
+            try:
+                if claim.message_text:
+                    await self.bot.edit_message_text(
+                        chat_id=claim.chat_id,
+                        message_id=claim.message_id,
+                        text=claim.message_text + RETURNED_NOTE,
+                        reply_markup=markup
+                    )
+                elif markup:
+                    await self.bot.edit_message_reply_markup(
+                        chat_id=claim.chat_id,
+                        message_id=claim.message_id,
+                        reply_markup=markup
+                    )
+            except Exception as e:
+                logger.warning(f"Could not restore moderation message for post {claim.post_id}: {e}")
+
+        try:
+            await self.bot.send_message(
+                chat_id=claim.moderator_id,
+                text=f"⌛ Время на обработку заявки #{claim.post_id} истекло, она вернулась в очередь"
+            )
+        except Exception as e:
+            logger.warning(f"Could not notify moderator {claim.moderator_id}: {e}")
+
+    def get_status(self) -> Dict:
+        return {
+            'running': self.running,
+            'claims': len(self._claims),
+            'moderators': len({claim.moderator_id for claim in self._claims.values()}),
+            **self.stats
+        }
+
+# Глобальный экземпляр
+moderation_queue = ModerationQueue()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import logging
+import pickle
+from datetime import datetime
+from typing import Dict, MutableMapping, Optional, Set
+from sqlalchemy import select, delete
+from telegram.ext import BasePersistence, PersistenceInput
+from config import Config
+from services.db import db
+from models import UserState
+
+logger = logging.getLogger(__name__)
+
+def _digest(blob: bytes) -> bytes:
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+class DatabasePersistence(BasePersistence):
+    """Хранение user_data (черновики постов, анкеты каталога, ожидания
+    модераторов) и состояний ожидания в таблице user_states
+
+    - user_data пользователя загружается при первом его апдейте
+      (refresh_user_data), а не всё целиком при старте;
+    - PTB раз в update_interval передаёт данные всех пользователей с апдейтами -
+      пишутся только те, чей снимок изменился (сравнение дайджестов);
+    - накопленные изменения пишутся одной транзакцией.
+
+    Кроме context.user_data сохраняются словари user_id -> состояние,
+    зарегистрированные через track() (waiting_users, game_waiting).
+    """
+
+    def __init__(self, update_interval: float = None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval or Config.PERSISTENCE_INTERVAL
+        )
+        self._tracked: Dict[str, MutableMapping[int, object]] = {}
+        self._loaded: Set[int] = set()
+        self._digests: Dict[int, bytes] = {}
+        self._pending: Dict[int, Optional[bytes]] = {}  # None - удалить
+        self._write_lock = asyncio.Lock()
+        self.stats = {'loaded': 0, 'written': 0, 'unchanged': 0, 'errors': 0}
+
+    def track(self, name: str, mapping: MutableMapping[int, object]):
+        """Сохранять вместе с user_data состояние из словаря user_id -> значение"""
+        self._tracked[name] = mapping
+
+    # ============= ЗАГРУЗКА =============
+
+    async def get_user_data(self) -> Dict[int, dict]:
+        # Ленивая загрузка - см. refresh_user_data
+        return {}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        """Вызывается PTB перед каждым обработчиком: подгружаем сохранённое один раз"""
+        if user_id in self._loaded or not db.session_maker:
+            return
+        self._loaded.add(user_id)
+
+        try:
+            async with db.get_session() as session:
+                row = await session.get(UserState, user_id)
+                blob = row.data if row else None
+        except Exception as e:
+            self._loaded.discard(user_id)
+            self.stats['errors'] += 1
+            logger.error(f"Error loading state for user {user_id}: {e}")
+            return
+
+        if blob is None:
+            return
+
+        try:
+            state = pickle.loads(blob)
+        except Exception as e:
+            logger.error(f"Corrupted state for user {user_id}, ignoring: {e}")
+            return
+
+        # Не перетираем то, что уже успели записать в этом процессе
+        for key, value in state.get('user_data', {}).items():
+            user_data.setdefault(key, value)
+        for name, mapping in self._tracked.items():
+            if name in state and user_id not in mapping:
+                mapping[user_id] = state[name]
+
+        self._digests[user_id] = _digest(blob)
+        self.stats['loaded'] += 1
+
+    # ============= ЗАПИСЬ =============
+
+    def _snapshot(self, user_id: int, user_data: dict) -> Optional[bytes]:
+        state = {'user_data': user_data}
+        for name, mapping in self._tracked.items():
+            if user_id in mapping:
+                state[name] = mapping[user_id]
+        if not user_data and len(state) == 1:
+            return None
+        return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    async def update_user_data(self, user_id: int, data: dict):
+        """PTB передаёт копию user_data; пишем, только если снимок изменился"""
+        try:
+            blob = self._snapshot(user_id, data)
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Could not serialize state for user {user_id}: {e}")
+            return
+
+        digest = _digest(blob) if blob is not None else None
+        if digest == self._digests.get(user_id):
+            self.stats['unchanged'] += 1
+            return
+
+        if digest is None:
+            self._digests.pop(user_id, None)
+        else:
+            self._digests[user_id] = digest
+        self._pending[user_id] = blob
+        await self._write_pending()
+
+    async def drop_user_data(self, user_id: int):
+        self._digests.pop(user_id, None)
+        self._pending[user_id] = None
+        await self._write_pending()
+
+    async def _write_pending(self):
+        """Записать накопленное одной транзакцией (параллельные вызовы PTB
+        за один прогон объединяются - кто пришёл позже, пишет остаток)"""
+        async with self._write_lock:
+            if not self._pending or not db.session_maker:
+                return
+            pending, self._pending = self._pending, {}
+
+            try:
+                async with db.get_session() as session:
+                    dropped = [user_id for user_id, blob in pending.items() if blob is None]
+                    if dropped:
+                        await session.execute(delete(UserState).where(UserState.user_id.in_(dropped)))
+
+                    stored = [user_id for user_id, blob in pending.items() if blob is not None]
+                    existing = {}
+                    if stored:
+                        result = await session.execute(select(UserState).where(UserState.user_id.in_(stored)))
+                        existing = {row.user_id: row for row in result.scalars()}
+
+                    now = datetime.utcnow()
+                    for user_id in stored:
+                        row = existing.get(user_id)
+                        if row:
+                            row.data = pending[user_id]
+                            row.updated_at = now
+                        else:
+                            session.add(UserState(user_id=user_id, data=pending[user_id], updated_at=now))
+
+                    await session.commit()
+                self.stats['written'] += len(pending)
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error writing user states ({len(pending)} users): {e}")
+                # Вернём в очередь - запишем в следующий прогон, если не появилось новее
+                for user_id, blob in pending.items():
+                    self._pending.setdefault(user_id, blob)
+                    self._digests.pop(user_id, None)
+
+    async def flush(self):
+        await self._write_pending()
+
+    def get_status(self) -> Dict:
+        return {'cached': len(self._loaded), 'pending': len(self._pending), **self.stats}
+
+    # ============= НЕ ИСПОЛЬЗУЕТСЯ =============
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        return {}
+
+    async def update_chat_data(self, chat_id: int, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name: str, key, new_state):
+        pass
+
+    async def drop_chat_data(self, chat_id: int):
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+# Глобальный экземпляр
+persistence = DatabasePersistence()
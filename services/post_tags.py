@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, func
+from config import Config
+from services.db import db
+from models import Post, PostStatus, PostTag, PublishedPost
+
+logger = logging.getLogger(__name__)
+
+HASHTAG_RE = re.compile(r'#(\w+)')
+NON_WORD_RE = re.compile(r'[\W_]+')
+
+def normalize_tag(tag: str) -> Optional[str]:
+    """'#Работа' / '#Актуальное⚡️' -> 'работа' / 'актуальное'"""
+    if not tag:
+        return None
+    tag = NON_WORD_RE.sub('', tag.lower().replace('ё', 'е'))
+    return tag[:100] or None
+
+def extract_tags(post: Post) -> Set[str]:
+    """Теги поста: из Post.hashtags и из хештегов в тексте"""
+    raw = [tag for tag in (post.hashtags or []) if str(tag).startswith('#')]
+    if post.text:
+        raw.extend(HASHTAG_RE.findall(post.text))
+    return {tag for tag in map(normalize_tag, raw) if tag}
+
+class PostTagIndex:
+    """Индекс тег -> опубликованные посты (таблица post_tags)
+
+    Для каждого тега в памяти держатся id последних постов (по возрастанию,
+    не больше Config.TAG_CACHE_SIZE). Первые страницы отдаются из кеша,
+    дальше - keyset-запросом по индексу (tag, post_id).
+    """
+
+    def __init__(self):
+        # тег -> (id последних постов по возрастанию, в кеше все посты тега)
+        self._recent: Dict[str, Tuple[List[int], bool]] = {}
+        self.stats = {'cache_pages': 0, 'db_pages': 0}
+
+    # ============= ИНДЕКСАЦИЯ =============
+
+    async def index_post(self, post: Post, link: str = None) -> Set[str]:
+        """Добавить одобренный пост в индекс (и запомнить ссылку на публикацию)"""
+        tags = extract_tags(post)
+        if not db.session_maker:
+            return tags
+
+        async with db.get_session() as session:
+            existing = await session.execute(
+                select(PostTag.tag).where(PostTag.post_id == post.id)
+            )
+            known = {row[0] for row in existing.all()}
+            for tag in tags - known:
+                session.add(PostTag(post_id=post.id, tag=tag, created_at=post.created_at))
+
+            if link:
+                published = await session.get(PublishedPost, post.id)
+                if published:
+                    published.link = link
+                else:
+                    session.add(PublishedPost(post_id=post.id, link=link))
+
+            await session.commit()
+
+        for tag in tags:
+            self._remember(tag, post.id)
+
+        return tags
+
+    def _remember(self, tag: str, post_id: int):
+        cached = self._recent.get(tag)
+        if cached is None:
+            return  # тег ещё не запрашивали - загрузится из БД при первом /tag
+        ids, complete = cached
+        position = bisect_left(ids, post_id)
+        if position < len(ids) and ids[position] == post_id:
+            return
+        ids.insert(position, post_id)
+        if len(ids) > Config.TAG_CACHE_SIZE:
+            del ids[0]
+            self._recent[tag] = (ids, False)
+
+    async def rebuild(self) -> int:
+        """Заполнить post_tags по одобренным постам, если таблица пуста"""
+        if not db.session_maker:
+            return 0
+
+        async with db.get_session() as session:
+            count = (await session.execute(select(func.count()).select_from(PostTag))).scalar()
+            if count:
+                return 0
+
+            result = await session.execute(
+                select(Post).where(Post.status == PostStatus.APPROVED).order_by(Post.id)
+            )
+            indexed = 0
+            for post in result.scalars():
+                for tag in extract_tags(post):
+                    session.add(PostTag(post_id=post.id, tag=tag, created_at=post.created_at))
+                    indexed += 1
+            await session.commit()
+
+        self._recent.clear()
+        logger.info(f"Post tag index built: {indexed} tags")
+        return indexed
+
+    # ============= ЧТЕНИЕ =============
+
+    async def _load_recent(self, tag: str) -> Tuple[List[int], bool]:
+        cached = self._recent.get(tag)
+        if cached is not None:
+            return cached
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(PostTag.post_id)
+                .where(PostTag.tag == tag)
+                .order_by(PostTag.post_id.desc())
+                .limit(Config.TAG_CACHE_SIZE)
+            )
+            ids = [row[0] for row in result.all()][::-1]
+
+        cached = self._recent[tag] = (ids, len(ids) < Config.TAG_CACHE_SIZE)
+        return cached
+
+    async def get_page_ids(self, tag: str, before_id: int = None,
+                           limit: int = 5) -> Tuple[List[int], Optional[int]]:
+        """id постов страницы (новые первыми) и курсор следующей страницы"""
+        tag = normalize_tag(tag)
+        if not tag or not db.session_maker:
+            return [], None
+
+        ids, complete = await self._load_recent(tag)
+        end = len(ids) if before_id is None else bisect_left(ids, before_id)
+        page = ids[max(0, end - limit):end][::-1]
+
+        if len(page) == limit or complete:
+            self.stats['cache_pages'] += 1
+            has_more = end - limit > 0 or (not complete and bool(page))
+            return page, (page[-1] if has_more and page else None)
+
+        # Старше кеша - keyset-запрос по индексу
+        self.stats['db_pages'] += 1
+        cursor = page[-1] if page else before_id
+        query = select(PostTag.post_id).where(PostTag.tag == tag)
+        if cursor is not None:
+            query = query.where(PostTag.post_id < cursor)
+        async with db.get_session() as session:
+            result = await session.execute(
+                query.order_by(PostTag.post_id.desc()).limit(limit - len(page) + 1)
+            )
+            older = [row[0] for row in result.all()]
+
+        has_more = len(older) > limit - len(page)
+        page = page + older[:limit - len(page)]
+        return page, (page[-1] if has_more and page else None)
+
+    async def get_posts(self, post_ids: Iterable[int]) -> List[Dict]:
+        """Посты со ссылками на публикацию в порядке post_ids"""
+        post_ids = list(post_ids)
+        if not post_ids:
+            return []
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(Post, PublishedPost.link)
+                .outerjoin(PublishedPost, PublishedPost.post_id == Post.id)
+                .where(Post.id.in_(post_ids))
+            )
+            rows = {post.id: (post, link) for post, link in result.all()}
+
+        posts = []
+        for post_id in post_ids:
+            if post_id not in rows:
+                continue
+            post, link = rows[post_id]
+            posts.append({
+                'id': post.id,
+                'title': post.piar_name if post.is_piar and post.piar_name else None,
+                'text': post.piar_description if post.is_piar else post.text,
+                'created_at': post.created_at,
+                'link': link
+            })
+        return posts
+
+    def get_status(self) -> Dict:
+        """Состояние кеша (для админов)"""
+        return {'cached_tags': len(self._recent), **self.stats}
+
+# Глобальный экземпляр
+post_tags = PostTagIndex()
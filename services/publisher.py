@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from telegram import InputMediaPhoto, InputMediaVideo, InputMediaDocument
+from config import Config
+from services.chat_cache import chat_cache
+from models import Post
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram: подпись к медиа (в UTF-16 единицах) и число элементов в альбоме
+CAPTION_LIMIT = 1024
+ALBUM_LIMIT = 10
+
+def telegram_length(text: str) -> int:
+    """Длина так, как её считает Telegram: эмодзи вне BMP - две единицы"""
+    return len(text.encode('utf-16-le')) // 2
+
+class Published(NamedTuple):
+    chat_id: int
+    message_id: int
+    link: str
+
+class PartialPublishError(Exception):
+    """Часть поста уже отправлена (например, альбом), остальное - нет:
+    повторная публикация продублирует отправленное"""
+
+    def __init__(self, published: Published, error: Exception):
+        super().__init__(str(error))
+        self.published = published
+        self.error = error
+
+def render_post(post: Post, author_username: Optional[str] = None) -> str:
+    """Текст публикации из строки Post: текст/анкета, хештеги, автор, подпись"""
+    if post.is_piar:
+        lines = [f"🙋🏼‍♂️ {post.piar_name}", f"👷🏽‍♂️ Услуга: {post.piar_profession}"]
+        if post.piar_districts:
+            lines.append(f"🏘️ Районы: {', '.join(post.piar_districts)}")
+        if post.piar_phone:
+            lines.append(f"🤳 Телефон: {post.piar_phone}")
+        if post.piar_instagram:
+            lines.append(f"🟧 Instagram: @{post.piar_instagram}")
+        if post.piar_telegram:
+            lines.append(f"🔷 Telegram: {post.piar_telegram}")
+        if post.piar_price:
+            lines.append(f"💳 Прайс: {post.piar_price}")
+        body = "\n".join(lines) + f"\n\n{post.piar_description or post.text or ''}"
+    else:
+        body = post.text or ''
+
+    parts = [body.strip()]
+    if post.hashtags:
+        parts.append(" ".join(str(tag) for tag in post.hashtags))
+    if not post.anonymous and author_username:
+        parts.append(f"💬 @{author_username}")
+    parts.append(Config.DEFAULT_SIGNATURE)
+    return "\n\n".join(part for part in parts if part)
+
+def split_media(media: List[Dict], caption: Optional[str] = None) -> Tuple[List, List]:
+    """Фото/видео (caption - у первого) и отдельно документы: Telegram не
+    смешивает их в одной группе. Списки не обрезаются - отправляются альбомами
+    по ALBUM_LIMIT"""
+    visual, documents = [], []
+    for item in media or []:
+        if not isinstance(item, dict) or not item.get('file_id'):
+            continue
+        if item.get('type') == 'photo':
+            visual.append(InputMediaPhoto(item['file_id'], caption=None if visual else caption))
+        elif item.get('type') == 'video':
+            visual.append(InputMediaVideo(item['file_id'], caption=None if visual else caption))
+        elif item.get('type') == 'document':
+            documents.append(InputMediaDocument(item['file_id']))
+    return visual, documents
+
+class PostPublisher:
+    """Публикация одобренных заявок без ручного копирования
+
+    Пост собирается из строки Post и уходит в канал (TARGET_CHANNEL_ID) или,
+    для "Актуального", в чат (CHAT_FOR_ACTUAL) с закреплением. Медиа - альбомами
+    по 10 с текстом в подписи первого; если текст длиннее подписи - отдельным
+    сообщением после альбома. Возвращается ссылка на первое сообщение.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self.stats = {'published': 0, 'pinned': 0, 'errors': 0}
+
+    def set_bot(self, bot):
+        """Устанавливает экземпляр бота"""
+        self.bot = bot
+
+    async def publish(self, post: Post, author_username: Optional[str] = None, to_chat: bool = False) -> Published:
+        """Опубликовать пост; ошибки Telegram пробрасываются модератору
+        (PartialPublishError - если что-то уже отправлено)"""
+        chat_id = Config.CHAT_FOR_ACTUAL if to_chat else Config.TARGET_CHANNEL_ID
+        text = render_post(post, author_username)
+        caption = text if telegram_length(text) <= CAPTION_LIMIT else None
+        visual, documents = split_media(post.media, caption)
+        if visual and caption:
+            text = None
+
+        try:
+            first = None
+            if visual:
+                first = await self._send_albums(chat_id, visual)
+            if text:
+                message = await self.bot.send_message(chat_id=chat_id, text=text)
+                first = first or message
+            if documents:
+                await self._send_albums(chat_id, documents)
+
+            if to_chat:
+                try:
+                    await self.bot.pin_chat_message(chat_id=chat_id, message_id=first.message_id,
+                                                    disable_notification=True)
+                    self.stats['pinned'] += 1
+                except Exception as e:
+                    logger.warning(f"Could not pin post {post.id} in {chat_id}: {e}")
+        except Exception as e:
+            self.stats['errors'] += 1
+            if first is None:
+                raise
+            link = await self.message_link(chat_id, first.message_id)
+            logger.error(f"Post {post.id} published partially to {chat_id}: {e}")
+            raise PartialPublishError(Published(chat_id, first.message_id, link), e) from e
+
+        link = await self.message_link(chat_id, first.message_id)
+        self.stats['published'] += 1
+        logger.info(f"Post {post.id} published to {chat_id}: {link}")
+        return Published(chat_id, first.message_id, link)
+
+    async def _send_albums(self, chat_id: int, items: List):
+        """Медиа альбомами по ALBUM_LIMIT; возвращает первое сообщение"""
+        first = None
+        for start in range(0, len(items), ALBUM_LIMIT):
+            message = await self._send_album(chat_id, items[start:start + ALBUM_LIMIT])
+            first = first or message
+        return first
+
+    async def _send_album(self, chat_id: int, items: List):
+        """Альбом из 2-10 элементов или одиночное медиа (альбом из одного Telegram не принимает)"""
+        if len(items) > 1:
+            messages = await self.bot.send_media_group(chat_id=chat_id, media=items)
+            return messages[0]
+        item = items[0]
+        if isinstance(item, InputMediaPhoto):
+            return await self.bot.send_photo(chat_id=chat_id, photo=item.media, caption=item.caption)
+        if isinstance(item, InputMediaVideo):
+            return await self.bot.send_video(chat_id=chat_id, video=item.media, caption=item.caption)
+        return await self.bot.send_document(chat_id=chat_id, document=item.media, caption=item.caption)
+
+    async def message_link(self, chat_id: int, message_id: int) -> str:
+        """https://t.me/<username>/<id> для публичных чатов, t.me/c/... для закрытых"""
+        try:
+            chat = await chat_cache.get(chat_id)
+            if chat.username:
+                return f"https://t.me/{chat.username}/{message_id}"
+        except Exception as e:
+            logger.warning(f"Could not resolve username of {chat_id}: {e}")
+        internal_id = str(chat_id).removeprefix('-100')
+        return f"https://t.me/c/{internal_id}/{message_id}"
+
+    def get_status(self) -> Dict:
+        return dict(self.stats)
+
+# Глобальный экземпляр
+post_publisher = PostPublisher()
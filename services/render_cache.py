@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from telegram import InlineKeyboardMarkup
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('user', 'moderator', 'admin')
+
+def role_of(user_id: int) -> str:
+    """Роль пользователя для выбора варианта экрана"""
+    if Config.is_admin(user_id):
+        return 'admin'
+    if Config.is_moderator(user_id):
+        return 'moderator'
+    return 'user'
+
+class Screen(NamedTuple):
+    """Готовый экран: текст и клавиатура (InlineKeyboardMarkup неизменяем)"""
+    text: str
+    markup: Optional[InlineKeyboardMarkup]
+
+class _Builder(NamedTuple):
+    build: Callable
+    per_role: bool
+
+class RenderCache:
+    """Кеш статических экранов (меню, справка, ссылки)
+
+    Экран строится один раз (для per_role - на каждую роль) при старте или
+    после invalidate() и дальше отдаётся готовым. Сборщик возвращает
+    (text, keyboard) - список рядов кнопок или None.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, _Builder] = {}
+        self._screens: Dict[Tuple[str, str], Screen] = {}
+        self._hits: Dict[str, int] = {}
+        self.builds = 0
+
+    def screen(self, name: str, per_role: bool = False):
+        """Декоратор регистрации сборщика экрана"""
+        def decorator(build: Callable):
+            self.register(name, build, per_role)
+            return build
+        return decorator
+
+    def register(self, name: str, build: Callable, per_role: bool = False):
+        self._builders[name] = _Builder(build, per_role)
+        self.invalidate(name)
+
+    def _build(self, name: str, role: str) -> Screen:
+        builder = self._builders[name]
+        text, keyboard = builder.build(role) if builder.per_role else builder.build()
+        screen = Screen(text, InlineKeyboardMarkup(keyboard) if keyboard else None)
+        self._screens[(name, role)] = screen
+        self.builds += 1
+        return screen
+
+    def get(self, name: str, role: str = 'user') -> Screen:
+        """Готовый экран (строится при первом обращении, если не прогрет)"""
+        if not self._builders[name].per_role:
+            role = 'user'
+        self._hits[name] = self._hits.get(name, 0) + 1
+        screen = self._screens.get((name, role))
+        if screen is None:
+            screen = self._build(name, role)
+        return screen
+
+    def warm(self) -> int:
+        """Построить все зарегистрированные экраны"""
+        built = 0
+        for name, builder in self._builders.items():
+            for role in (ROLES if builder.per_role else ('user',)):
+                if (name, role) not in self._screens:
+                    try:
+                        self._build(name, role)
+                        built += 1
+                    except Exception as e:
+                        logger.error(f"Error building screen {name}/{role}: {e}")
+        logger.info(f"Render cache warmed: {built} screens")
+        return built
+
+    def invalidate(self, name: str = None):
+        """Сбросить экран (или все) после изменения содержимого"""
+        if name is None:
+            self._screens.clear()
+            return
+        for role in ROLES:
+            self._screens.pop((name, role), None)
+
+    def top_screens(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Самые популярные экраны: [(name, hits)]"""
+        return sorted(self._hits.items(), key=lambda item: -item[1])[:limit]
+
+    def get_status(self) -> Dict:
+        return {
+            'registered': len(self._builders),
+            'cached': len(self._screens),
+            'builds': self.builds,
+            'hits': sum(self._hits.values())
+        }
+
+# Глобальный экземпляр
+render_cache = RenderCache()
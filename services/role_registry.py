@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, delete, func
+from config import Config
+from services.db import db
+from models import UserRole
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('admin', 'moderator')
+
+class RoleRegistry:
+    """Роли пользователей: ADMIN_IDS/MODERATOR_IDS из окружения + таблица user_roles
+
+    Config.is_admin/is_moderator проверяют неизменяемый снимок Config.ROLES
+    (frozenset'ы), который подменяется одним присваиванием. Команда /role
+    пишет в таблицу и сразу подменяет снимок; другие экземпляры бота
+    замечают изменение по сигнатуре таблицы (число строк и время последнего
+    изменения) не позже чем через ROLES_RELOAD_SECONDS.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self._stop_event = asyncio.Event()
+        self._signature: Optional[Tuple] = None
+        self._db_roles: Dict[int, str] = {}
+        self.last_reload: Optional[datetime] = None
+        self.stats = {'reloads': 0, 'changes': 0, 'errors': 0}
+
+    # ============= ЗАГРУЗКА =============
+
+    async def _db_state(self) -> Optional[Tuple]:
+        if not db.session_maker:
+            return None
+        async with db.get_session() as session:
+            result = await session.execute(select(func.count(UserRole.user_id), func.max(UserRole.updated_at)))
+            return tuple(result.one())
+
+    async def reload(self) -> int:
+        """Перечитать таблицу и подменить снимок ролей"""
+        if not db.session_maker:
+            return 0
+
+        async with db.get_session() as session:
+            result = await session.execute(select(UserRole.user_id, UserRole.role))
+            roles = {user_id: role for user_id, role in result.all()}
+        signature = await self._db_state()
+
+        self._apply(roles)
+        self._signature = signature
+        self.last_reload = datetime.now()
+        self.stats['reloads'] += 1
+        logger.info(f"Roles reloaded: {len(Config.ROLES.admins)} admins, "
+                    f"{len(Config.ROLES.moderators - Config.ROLES.admins)} moderators")
+        return len(roles)
+
+    async def reload_if_changed(self) -> bool:
+        """Перезагрузить, если таблицу изменил другой экземпляр"""
+        if await self._db_state() != self._signature:
+            await self.reload()
+            return True
+        return False
+
+    def _apply(self, roles: Dict[int, str]):
+        self._db_roles = roles
+        Config.set_roles(
+            admins=[user_id for user_id, role in roles.items() if role == 'admin'],
+            moderators=[user_id for user_id, role in roles.items() if role == 'moderator']
+        )
+
+    # ============= УПРАВЛЕНИЕ =============
+
+    @staticmethod
+    def env_role(user_id: int) -> Optional[str]:
+        """Роль из окружения (её командой не изменить)"""
+        if user_id in Config.ADMIN_IDS:
+            return 'admin'
+        if user_id in Config.MODERATOR_IDS:
+            return 'moderator'
+        return None
+
+    async def set_role(self, user_id: int, role: str, added_by: int = None):
+        """Выдать или сменить роль"""
+        if role not in ROLES:
+            raise ValueError(f"Unknown role: {role}")
+
+        async with db.get_session() as session:
+            row = await session.get(UserRole, user_id)
+            if row:
+                row.role = role
+                row.added_by = added_by
+                row.updated_at = datetime.utcnow()
+            else:
+                session.add(UserRole(user_id=user_id, role=role, added_by=added_by))
+            await session.commit()
+
+        self._apply({**self._db_roles, user_id: role})
+        self._signature = await self._db_state()
+        self.stats['changes'] += 1
+        logger.info(f"Role of {user_id} set to {role} by {added_by}")
+
+    async def remove_role(self, user_id: int) -> Optional[str]:
+        """Снять роль из таблицы; возвращает снятую роль"""
+        async with db.get_session() as session:
+            result = await session.execute(delete(UserRole).where(UserRole.user_id == user_id))
+            await session.commit()
+
+        if result.rowcount == 0:
+            return None
+
+        roles = dict(self._db_roles)
+        removed = roles.pop(user_id, None)
+        self._apply(roles)
+        self._signature = await self._db_state()
+        self.stats['changes'] += 1
+        logger.info(f"Role {removed} of {user_id} removed")
+        return removed
+
+    def list_roles(self) -> List[Tuple[int, str, str]]:
+        """[(user_id, role, источник: env|db)] - админы, затем модераторы"""
+        snapshot = Config.ROLES
+        rows = []
+        for user_id in snapshot.moderators:
+            role = 'admin' if user_id in snapshot.admins else 'moderator'
+            rows.append((user_id, role, 'env' if self.env_role(user_id) == role else 'db'))
+        return sorted(rows, key=lambda row: (row[1] != 'admin', row[0]))
+
+    # ============= ФОНОВАЯ СВЕРКА =============
+
+    async def start(self):
+        """Загрузить роли и сверяться с таблицей"""
+        if self.task and not self.task.done():
+            logger.warning("Role registry already running")
+            return
+
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.error(f"Could not load roles: {e}")
+
+        self.running = True
+        self._stop_event = asyncio.Event()
+        self.task = asyncio.create_task(self._watch_loop())
+        logger.info("Role registry started")
+
+    async def stop(self):
+        self.running = False
+        self._stop_event.set()
+
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except asyncio.TimeoutError:
+                self.task.cancel()
+            except Exception as e:
+                logger.error(f"Error stopping role registry: {e}")
+            finally:
+                self.task = None
+
+        logger.info("Role registry stopped")
+
+    async def _watch_loop(self):
+        while self.running:
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=Config.ROLES_RELOAD_SECONDS)
+                break
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await self.reload_if_changed()
+            except Exception as e:
+                self.stats['errors'] += 1
+                logger.error(f"Error reloading roles: {e}")
+
+    def get_status(self) -> Dict:
+        return {
+            'admins': len(Config.ROLES.admins),
+            'moderators': len(Config.ROLES.moderators - Config.ROLES.admins),
+            'from_db': len(self._db_roles),
+            'last_reload': self.last_reload,
+            **self.stats
+        }
+
+# Глобальный экземпляр
+role_registry = RoleRegistry()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROLL_MIN = 1
+ROLL_MAX = 9999
+
+class RollPoolExhausted(Exception):
+    """Все номера розыгрыша уже выданы"""
+
+class RollPool:
+    """Номера одного розыгрыша
+
+    Свободные номера перемешаны заранее - выдача это pop() с конца списка.
+    Выданные номера хранятся отсортированными, поэтому ближайшие к
+    выигрышному числу находятся бинарным поиском, без сортировки всех
+    участников.
+    """
+
+    __slots__ = ('low', 'high', '_free', '_numbers', '_owners')
+
+    def __init__(self, low: int = ROLL_MIN, high: int = ROLL_MAX, rng: random.Random = None):
+        self.low = low
+        self.high = high
+        self._free = list(range(low, high + 1))
+        (rng or random).shuffle(self._free)
+        self._numbers: List[int] = []
+        self._owners: Dict[int, int] = {}
+
+    def allocate(self, user_id: int) -> int:
+        """Случайный свободный номер: pop() за O(1), вставка в отсортированный
+        список - поиск O(log n) и сдвиг O(n) (memmove, не больше ROLL_MAX чисел)"""
+        if not self._free:
+            raise RollPoolExhausted(f"all numbers {self.low}-{self.high} are taken")
+        number = self._free.pop()
+        insort(self._numbers, number)
+        self._owners[number] = user_id
+        return number
+
+    def nearest(self, target: int, k: int) -> List[Tuple[int, int]]:
+        """k номеров, ближайших к target: [(number, user_id)], при равенстве - меньший"""
+        numbers = self._numbers
+        right = bisect_left(numbers, target)
+        left = right - 1
+        result = []
+        while len(result) < k and (left >= 0 or right < len(numbers)):
+            if right >= len(numbers) or (left >= 0 and target - numbers[left] <= numbers[right] - target):
+                number = numbers[left]
+                left -= 1
+            else:
+                number = numbers[right]
+                right += 1
+            result.append((number, self._owners[number]))
+        return result
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
+
+    def __len__(self):
+        return len(self._numbers)
+
+class RollEngine:
+    """Пулы номеров для версий розыгрыша (NEED / TRY / MORE)"""
+
+    def __init__(self):
+        self._pools: Dict[str, RollPool] = {}
+
+    def _pool(self, game_version: str) -> RollPool:
+        pool = self._pools.get(game_version)
+        if pool is None:
+            pool = self._pools[game_version] = RollPool()
+        return pool
+
+    def allocate(self, game_version: str, user_id: int) -> int:
+        return self._pool(game_version).allocate(user_id)
+
+    def nearest(self, game_version: str, target: int, k: int) -> List[Tuple[int, int]]:
+        return self._pool(game_version).nearest(target, k)
+
+    def reset(self, game_version: Optional[str] = None):
+        """Новый розыгрыш: все номера снова свободны"""
+        if game_version is None:
+            self._pools.clear()
+        else:
+            self._pools.pop(game_version, None)
+
+    def get_status(self) -> Dict:
+        return {version: {'taken': len(pool), 'free': pool.free} for version, pool in self._pools.items()}
+
+# Глобальный экземпляр
+roll_engine = RollEngine()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import select, text
+from services.db import db
+from models import Post, PostStatus
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+# Венгерские (и прочие латинские) диакритики: Újpest -> ujpest, fodrász -> fodrasz.
+# Кириллицу не трогаем (й, ё обрабатываются отдельно)
+LATIN_FOLD = str.maketrans('áàâäãéèêëíìîïóòôöõőúùûüűýÿç', 'aaaaaeeeeiiiioooooouuuuuyyc')
+
+# Районы Будапешта римскими цифрами: XIII -> 13
+ROMAN_DISTRICTS = {
+    'i': '1', 'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7', 'viii': '8',
+    'ix': '9', 'x': '10', 'xi': '11', 'xii': '12', 'xiii': '13', 'xiv': '14', 'xv': '15',
+    'xvi': '16', 'xvii': '17', 'xviii': '18', 'xix': '19', 'xx': '20', 'xxi': '21',
+    'xxii': '22', 'xxiii': '23'
+}
+
+# Окончания русских существительных и прилагательных (длинные первыми)
+RU_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'иях', 'ях', 'ах',
+    'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ов', 'ев',
+    'ия', 'ие', 'ии', 'ию', 'ья', 'ье', 'ьи', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь', 'й'
+), key=len, reverse=True))
+RU_MIN_STEM = 3
+
+# Сколько постов индексировать за один запрос при перестроении
+REBUILD_BATCH_SIZE = 1000
+
+STOP_WORDS = {
+    'и', 'в', 'во', 'на', 'по', 'для', 'из', 'от', 'до', 'за', 'с', 'со', 'к', 'ко', 'у', 'о', 'об',
+    'не', 'но', 'а', 'или', 'что', 'кто', 'где', 'как', 'это', 'то', 'же', 'ли', 'бы',
+    'есть', 'ищу', 'нужен', 'нужна', 'нужно', 'подскажите', 'посоветуйте',
+    'a', 'az', 'es', 'egy', 'the', 'and', 'in', 'of'
+}
+
+def stem(token: str) -> str:
+    """Лёгкий стеммер: отрезает русское окончание, если остаётся основа"""
+    if token.isdigit() or not ('а' <= token[0] <= 'я'):
+        return token
+    for ending in RU_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= RU_MIN_STEM:
+            return token[:-len(ending)]
+    return token
+
+def normalize_terms(value: str) -> List[str]:
+    """Текст -> нормализованные термы (нижний регистр, ё -> е, диакритики, основы)"""
+    if not value:
+        return []
+    value = value.lower().replace('ё', 'е').translate(LATIN_FOLD)
+    terms = []
+    for token in TOKEN_RE.findall(value):
+        if token in STOP_WORDS:
+            continue
+        token = ROMAN_DISTRICTS.get(token, token)
+        if len(token) < 2 and not token.isdigit():
+            continue
+        terms.append(stem(token))
+    return terms
+
+def post_search_document(post: Post) -> str:
+    """Нормализованный документ поста для индекса"""
+    parts = [post.text, post.piar_name, post.piar_profession, post.piar_description]
+    if post.piar_districts:
+        parts.append(' '.join(map(str, post.piar_districts)))
+    # piar_description обычно совпадает с text - не дублируем
+    if post.piar_description and post.piar_description == post.text:
+        parts.remove(post.piar_description)
+    return ' '.join(normalize_terms(' '.join(p for p in parts if p)))
+
+class SearchIndex:
+    """Полнотекстовый поиск по опубликованным постам и каталогу услуг
+
+    SQLite - виртуальная таблица FTS5 (ранжирование bm25), PostgreSQL -
+    tsvector с GIN-индексом (ts_rank). Нормализация (основы слов, районы,
+    венгерские диакритики) делается в Python одинаково для документов и
+    запросов, поэтому в БД используется простой токенайзер.
+    """
+
+    def __init__(self):
+        self._ready = False
+        self._dialect: Optional[str] = None
+
+    @property
+    def is_postgres(self) -> bool:
+        return self._dialect == 'postgresql'
+
+    async def ensure_schema(self):
+        """Создать таблицу индекса, если её нет"""
+        if self._ready or not db.engine:
+            return
+
+        self._dialect = db.engine.dialect.name
+        async with db.engine.begin() as conn:
+            if self.is_postgres:
+                await conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS post_search ("
+                    "post_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)"
+                ))
+                await conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)"
+                ))
+            else:
+                await conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5(document, tokenize='unicode61')"
+                ))
+        self._ready = True
+
+    # ============= ИНДЕКСАЦИЯ =============
+
+    async def index_post(self, post: Post):
+        """Добавить или обновить пост в индексе"""
+        await self.ensure_schema()
+        document = post_search_document(post)
+        if not document:
+            return
+
+        async with db.engine.begin() as conn:
+            await self._upsert(conn, post.id, document)
+
+    async def _upsert(self, conn, post_id: int, document: str):
+        if not self.is_postgres:
+            await conn.execute(text("DELETE FROM post_search WHERE rowid = :id"), {'id': post_id})
+        await self._insert(conn, [{'id': post_id, 'doc': document}])
+
+    async def _insert(self, conn, rows: List[dict]):
+        """Вставка пачкой (executemany)"""
+        if self.is_postgres:
+            await conn.execute(text(
+                "INSERT INTO post_search (post_id, document) VALUES (:id, to_tsvector('simple', :doc)) "
+                "ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document"
+            ), rows)
+        else:
+            await conn.execute(text(
+                "INSERT INTO post_search (rowid, document) VALUES (:id, :doc)"
+            ), rows)
+
+    async def remove_post(self, post_id: int):
+        """Убрать пост из индекса"""
+        await self.ensure_schema()
+        column = 'post_id' if self.is_postgres else 'rowid'
+        async with db.engine.begin() as conn:
+            await conn.execute(text(f"DELETE FROM post_search WHERE {column} = :id"), {'id': post_id})
+
+    async def rebuild(self, force: bool = False) -> int:
+        """Проиндексировать все одобренные посты (по умолчанию - только если индекс пуст)"""
+        if not db.engine:
+            return 0
+        await self.ensure_schema()
+
+        async with db.engine.begin() as conn:
+            if not force:
+                count = (await conn.execute(text("SELECT count(*) FROM post_search"))).scalar()
+                if count:
+                    return 0
+            await conn.execute(text("DELETE FROM post_search"))
+
+        indexed = 0
+        last_id = 0
+        while True:
+            async with db.get_session() as session:
+                result = await session.execute(
+                    select(Post)
+                    .where(Post.status == PostStatus.APPROVED, Post.id > last_id)
+                    .order_by(Post.id)
+                    .limit(REBUILD_BATCH_SIZE)
+                )
+                posts = result.scalars().all()
+            if not posts:
+                break
+
+            last_id = posts[-1].id
+            rows = [{'id': post.id, 'doc': document} for post in posts
+                    if (document := post_search_document(post))]
+            if rows:
+                async with db.engine.begin() as conn:
+                    await self._insert(conn, rows)
+                indexed += len(rows)
+
+        logger.info(f"Search index built: {indexed} posts")
+        return indexed
+
+    # ============= ПОИСК =============
+
+    async def search(self, query: str, offset: int = 0, limit: int = 5) -> Tuple[List[int], bool]:
+        """id постов по релевантности и признак следующей страницы"""
+        terms = list(dict.fromkeys(normalize_terms(query)))[:10]
+        if not terms or not db.engine:
+            return [], False
+        await self.ensure_schema()
+
+        # Если есть посты со всеми термами - ищем только их (И), иначе любой
+        # из термов (ИЛИ), ранжирование поднимает посты с большим числом совпадений
+        async with db.engine.connect() as conn:
+            match_all = len(terms) == 1 or bool(await self._query(conn, terms, True, 0, 1, ranked=False))
+            ids = await self._query(conn, terms, match_all, offset, limit + 1)
+
+        return ids[:limit], len(ids) > limit
+
+    async def _query(self, conn, terms: List[str], match_all: bool, offset: int,
+                     limit: int, ranked: bool = True) -> List[int]:
+        params = {'limit': limit, 'offset': offset}
+        if self.is_postgres:
+            params['query'] = (' & ' if match_all else ' | ').join(f"{term}:*" for term in terms)
+            order = "ORDER BY ts_rank(document, q) DESC " if ranked else ""
+            sql = (
+                "SELECT post_id FROM post_search, to_tsquery('simple', :query) q "
+                f"WHERE document @@ q {order}LIMIT :limit OFFSET :offset"
+            )
+        else:
+            # Префиксный поиск по каждому терму
+            params['query'] = (' AND ' if match_all else ' OR ').join(f'"{term}"*' for term in terms)
+            order = "ORDER BY rank " if ranked else ""
+            sql = (
+                "SELECT rowid FROM post_search WHERE post_search MATCH :query "
+                f"{order}LIMIT :limit OFFSET :offset"
+            )
+
+        result = await conn.execute(text(sql), params)
+        return [row[0] for row in result.all()]
+
+# Глобальный экземпляр
+search_index = SearchIndex()
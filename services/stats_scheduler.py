@@ -4,6 +4,7 @@ import logging
 from datetime import datetime
 from typing import Optional
 from config import Config
+from services.metrics import scheduler_lag
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +94,10 @@ class StatsScheduler:
             # Основной цикл
             interval_seconds = Config.STATS_INTERVAL_HOURS * 3600
             
+            loop = asyncio.get_running_loop()
+            
             while self.running:
+                planned = loop.time() + interval_seconds
                 try:
                     # Ждём интервал или stop event
                     await asyncio.wait_for(
@@ -108,6 +112,7 @@ class StatsScheduler:
                         
                 except asyncio.TimeoutError:
                     # Timeout - пора отправлять статистику
+                    scheduler_lag.observe(max(0.0, loop.time() - planned), scheduler='stats')
                     if not self.running:
                         break
                     
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Окно для отчёта о медленных маршрутах (секунды)
+SLOW_ROUTES_WINDOW = 3600
+
+class Trace:
+    """Замер одного апдейта: общее время и время во вложенных спанах"""
+
+    __slots__ = ('route', 'start', 'spans', 'calls', '_token')
+
+    def __init__(self, route: str):
+        self.route = route
+        self.start = time.perf_counter()
+        self.spans: Dict[str, float] = {'db': 0.0, 'api': 0.0}
+        self.calls: Dict[str, int] = {'db': 0, 'api': 0}
+        self._token = None
+
+    def add(self, kind: str, seconds: float):
+        self.spans[kind] = self.spans.get(kind, 0.0) + seconds
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+
+    def breakdown(self, wall: float) -> Dict[str, float]:
+        """Разбивка времени: db / api / own (собственный CPU и прочее ожидание)"""
+        result = dict(self.spans)
+        result['own'] = max(0.0, wall - sum(self.spans.values()))
+        return result
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+class TracingService:
+    """Трассировка задержек обработчиков и отчёт о медленных маршрутах"""
+
+    def __init__(self, maxlen: int = 20000):
+        # (время завершения, маршрут, wall, db, api)
+        self._recent: Deque[Tuple[float, str, float, float, float]] = deque(maxlen=maxlen)
+
+    def start_trace(self, route: str) -> Trace:
+        """Начинает трассировку апдейта в текущем контексте"""
+        trace = Trace(route)
+        trace._token = _current_trace.set(trace)
+        return trace
+
+    def finish_trace(self, trace: Trace):
+        """Завершает трассировку, пишет метрики и лог медленных апдейтов"""
+        from services.metrics import handler_latency
+        
+        wall = time.perf_counter() - trace.start
+        try:
+            _current_trace.reset(trace._token)
+        except ValueError:
+            # Завершение из другого контекста - просто отвязываем
+            _current_trace.set(None)
+
+        handler_latency.observe(wall, route=trace.route)
+        self._recent.append((time.time(), trace.route, wall, trace.spans['db'], trace.spans['api']))
+
+        if wall * 1000 >= Config.SLOW_HANDLER_MS:
+            parts = trace.breakdown(wall)
+            logger.warning(
+                f"🐢 Slow update: {trace.route} took {wall * 1000:.0f}ms "
+                f"(db {parts['db'] * 1000:.0f}ms/{trace.calls['db']} queries, "
+                f"api {parts['api'] * 1000:.0f}ms/{trace.calls['api']} calls, "
+                f"own {parts['own'] * 1000:.0f}ms)"
+            )
+
+    @contextmanager
+    def trace(self, route: str):
+        """Трассировка блока кода как одного апдейта"""
+        trace = self.start_trace(route)
+        try:
+            yield trace
+        finally:
+            self.finish_trace(trace)
+
+    def get_slowest_routes(self, limit: int = 10, window: int = SLOW_ROUTES_WINDOW) -> List[Dict]:
+        """Топ маршрутов по максимальному времени за последнее окно"""
+        cutoff = time.time() - window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+
+        routes: Dict[str, Dict] = {}
+        for _, route, wall, db_time, api_time in self._recent:
+            stats = routes.get(route)
+            if stats is None:
+                stats = routes[route] = {'route': route, 'count': 0, 'total': 0.0,
+                                         'max': 0.0, 'db': 0.0, 'api': 0.0}
+            stats['count'] += 1
+            stats['total'] += wall
+            stats['max'] = max(stats['max'], wall)
+            stats['db'] += db_time
+            stats['api'] += api_time
+
+        for stats in routes.values():
+            stats['avg'] = stats['total'] / stats['count']
+
+        return sorted(routes.values(), key=lambda s: s['max'], reverse=True)[:limit]
+
+def record_span(kind: str, seconds: float):
+    """Добавляет время к текущей трассировке (если она есть)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(kind, seconds)
+
+@contextmanager
+def span(kind: str):
+    """Замеряет блок кода как спан текущей трассировки"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(kind, time.perf_counter() - start)
+
+# Глобальный экземпляр сервиса
+tracing = TracingService()
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+from typing import Dict, Iterable, Pattern, Set
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, BaseHandler, CommandHandler
+from config import Config
+from services.channel_stats import channel_stats
+from services.metrics import updates_total, update_classes_total, get_update_type
+from services.update_replay import update_replay
+
+logger = logging.getLogger(__name__)
+
+# Классы апдейтов
+DROP = 'drop'
+COUNT = 'count'
+MODERATOR = 'moderator'
+NORMAL = 'normal'
+UPDATE_CLASSES = (DROP, COUNT, MODERATOR, NORMAL)
+
+class UpdateFilter:
+    """Классификация апдейта один раз, до обработчиков
+
+    - drop: команды и кнопки в Будапешт-чате (команда удаляется, на кнопку -
+      ответ "бот не работает") и то, что не принимает ни один обработчик
+      (стикеры, служебные сообщения, правки);
+    - count: остальные сообщения Будапешт-чата - только счётчик channel_stats;
+    - moderator: апдейты модераторов и группы модерации;
+    - normal: всё остальное.
+
+    drop и count дальше не идут: PTB не перебирает для них обработчики и не
+    подгружает user_data.
+    """
+
+    def __init__(self):
+        self.bot = None
+        self._commands: Set[str] = set()
+        self._patterns: list = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {name: 0 for name in UPDATE_CLASSES}
+
+    def set_bot(self, bot):
+        """Устанавливает экземпляр бота"""
+        self.bot = bot
+
+    def set_commands(self, handlers: Iterable, patterns: Iterable[Pattern] = ()):
+        """Команды бота (их удаляем в Будапешт-чате): CommandHandler'ы приложения
+        и выражения команд, разбираемых MessageHandler'ом (игры)"""
+        self._commands = {command for handler in handlers if isinstance(handler, CommandHandler)
+                          for command in handler.commands}
+        self._patterns = list(patterns)
+
+    # ============= КЛАССИФИКАЦИЯ =============
+
+    def is_own_command(self, text: str) -> bool:
+        """Команда, которую обработал бы этот бот (/cmd или /cmd@этот_бот)"""
+        if not text or not text.startswith('/'):
+            return False
+        name, _, target = text.split(maxsplit=1)[0][1:].partition('@')
+        if target and self.bot and target.lower() != (self.bot.username or '').lower():
+            return False
+        return name.lower() in self._commands or any(pattern.match(text) for pattern in self._patterns)
+
+    def classify(self, update: Update) -> str:
+        query = update.callback_query
+        if query:
+            if query.message and query.message.chat.id == Config.BUDAPEST_CHAT_ID:
+                return DROP
+            return MODERATOR if Config.is_moderator(query.from_user.id) else NORMAL
+
+        message = update.message
+        if message is None:
+            # Правки и посты каналов бот не обрабатывает
+            return NORMAL if update.my_chat_member else DROP
+
+        # Обработчики принимают только текст, фото, видео и документы
+        if not (message.text or message.photo or message.video or message.document):
+            return DROP
+
+        if message.chat.id == Config.BUDAPEST_CHAT_ID:
+            return DROP if self.is_own_command(message.text) else COUNT
+
+        if message.chat.id == Config.MODERATION_GROUP_ID or (
+                message.from_user and Config.is_moderator(message.from_user.id)):
+            return MODERATOR
+        return NORMAL
+
+    def process(self, update: Update) -> str:
+        """Классифицировать, посчитать и выполнить действие класса"""
+        updates_total.inc(type=get_update_type(update))
+        update_class = self.classify(update)
+        self.stats[update_class] += 1
+        update_classes_total.inc(**{'class': update_class})
+
+        if update_class == COUNT:
+            channel_stats.increment_message_count(update.message.chat.id)
+        elif update_class == DROP and update.effective_chat and update.effective_chat.id == Config.BUDAPEST_CHAT_ID:
+            task = asyncio.get_running_loop().create_task(self._reject(update))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return update_class
+
+    async def _reject(self, update: Update):
+        """Команда или кнопка в Будапешт-чате"""
+        try:
+            if update.callback_query:
+                await update.callback_query.answer("⚠️ Бот не работает в этом чате", show_alert=True)
+                logger.info(f"Ignored callback from Budapest chat: {update.callback_query.data}")
+            elif update.message:
+                await update.message.delete()
+                logger.info(f"🚫 Ignored command from Budapest chat: {update.message.text.split()[0]}")
+        except Exception as e:
+            logger.error(f"Could not reject update from Budapest chat: {e}")
+
+    def get_status(self) -> Dict:
+        return dict(self.stats)
+
+class UpdateFilterHandler(BaseHandler):
+    """Стадия UpdateFilter в группе -1
+
+    Решение принимается в check_update: drop/count останавливают обработку
+    (ApplicationHandlerStop) до построения контекста, остальные апдейты
+    идут к обработчикам групп 0+ (check_update возвращает False).
+    """
+
+    def __init__(self, update_filter: UpdateFilter):
+        super().__init__(self._not_called)
+        self.update_filter = update_filter
+
+    def check_update(self, update: object) -> bool:
+        if not isinstance(update, Update):
+            return False
+        # Каждый апдейт проходит эту стадию ровно один раз - ориентир для перезапуска;
+        # уже обработанный (повтор страницы после прерванного переигрывания) дальше не идёт
+        if not update_replay.accept(update.update_id):
+            raise ApplicationHandlerStop
+        if self.update_filter.process(update) in (DROP, COUNT):
+            raise ApplicationHandlerStop
+        return False
+
+    @staticmethod
+    async def _not_called(update, context):
+        pass
+
+# Глобальный экземпляр
+update_filter = UpdateFilter()
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Set
+from sqlalchemy import select
+from telegram import Update
+from telegram.error import BadRequest
+from config import Config
+from services.db import db
+from services.metrics import replayed_updates_total
+from models import BotState
+
+logger = logging.getLogger(__name__)
+
+# После недели без апдейтов Telegram выбирает следующий update_id случайно
+WATERMARK_TTL = timedelta(days=7)
+
+class _ReplayBot:
+    """Бот для переигрываемых апдейтов: ответ на просроченный callback
+    (query is too old) не роняет обработчик - действие кнопки выполняется"""
+
+    def __init__(self, bot):
+        self._bot = bot
+
+    def __getattr__(self, name):
+        return getattr(self._bot, name)
+
+    async def answer_callback_query(self, *args, **kwargs):
+        try:
+            return await self._bot.answer_callback_query(*args, **kwargs)
+        except BadRequest as e:
+            if 'query is too old' not in str(e).lower() and 'query id is invalid' not in str(e).lower():
+                raise
+            return False
+
+class UpdateReplay:
+    """Апдейты, накопившиеся в Telegram, пока бот не работал (редеплой)
+
+    Вместо drop_pending_updates в post_init, до начала polling:
+    - backlog забирается getUpdates страницами по 100;
+    - устаревшее отбрасывается: сообщения старше REPLAY_MAX_AGE_MINUTES,
+      кнопки под сообщениями старше REPLAY_CALLBACK_MAX_AGE_HOURS;
+    - апдейты одного пользователя обрабатываются по порядку, разных -
+      параллельно, не больше REPLAY_CONCURRENCY одновременно;
+    - update_id обработанных апдейтов страницы сразу пишутся в bot_state,
+      а Telegram подтверждает страницу (offset) только после неё: если
+      процесс упал посреди страницы, она придёт снова, и уже обработанное
+      пропускается.
+
+    Последний update_id, прошедший группу -1, сохраняется раз в
+    PERSISTENCE_INTERVAL и при остановке: апдейты не новее него считаются
+    обработанными. Группа -1 (accept) пропускает такие апдейты и при
+    polling'е - если переигрывание прервалось, недоподтверждённая страница
+    придёт снова, и обработанное из неё не повторится.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self.replaying = False
+        self._stop_event = asyncio.Event()
+        self._save_lock = asyncio.Lock()
+        self.last_update_id: Optional[int] = None
+        self._saved_update_id: Optional[int] = None
+        self._watermark_at: Optional[datetime] = None  # когда апдейт last_update_id пришёл
+        self._done: Set[int] = set()
+        self.last_replay: Optional[datetime] = None
+        self.stats = {'pages': 0, 'replayed': 0, 'stale': 0, 'duplicate': 0, 'error': 0}
+
+    # ============= СОСТОЯНИЕ =============
+
+    async def _load(self):
+        if not db.session_maker:
+            return
+
+        async with db.get_session() as session:
+            result = await session.execute(
+                select(BotState).where(BotState.key.in_(('last_update_id', 'replay_done')))
+            )
+            rows = {row.key: row for row in result.scalars()}
+
+        watermark = rows.get('last_update_id')
+        if watermark and datetime.utcnow() - watermark.updated_at < WATERMARK_TTL:
+            self.last_update_id = self._saved_update_id = json.loads(watermark.value)
+            self._watermark_at = watermark.updated_at
+        if 'replay_done' in rows:
+            self._done = set(json.loads(rows['replay_done'].value))
+
+    async def _save(self, **values):
+        """Записать ключи bot_state одной транзакцией"""
+        if not db.session_maker:
+            return
+
+        async with self._save_lock:
+            async with db.get_session() as session:
+                for key, value in values.items():
+                    row = await session.get(BotState, key)
+                    if row:
+                        row.value = json.dumps(value)
+                        row.updated_at = datetime.utcnow()
+                    else:
+                        session.add(BotState(key=key, value=json.dumps(value)))
+                await session.commit()
+
+        if 'last_update_id' in values:
+            self._saved_update_id = values['last_update_id']
+
+    def observe(self, update_id: int):
+        """Апдейт polling'а прошёл группу -1 (апдейты обрабатываются по очереди)"""
+        if not self.replaying:
+            self.last_update_id = update_id
+            self._watermark_at = datetime.utcnow()
+
+    def accept(self, update_id: int) -> bool:
+        """Стадия группы -1: False - апдейт уже обработан. Если переигрывание
+        прервалось посреди страницы, polling получит её снова"""
+        if self.is_duplicate(update_id):
+            self._count('duplicate')
+            logger.info(f"Update {update_id} already processed, skipped")
+            return False
+        self.observe(update_id)
+        return True
+
+    # ============= ПЕРЕИГРЫВАНИЕ =============
+
+    def is_duplicate(self, update_id: int) -> bool:
+        if update_id in self._done:
+            return True
+        # После недели без апдейтов ориентир не действует (см. WATERMARK_TTL)
+        return (self.last_update_id is not None and update_id <= self.last_update_id
+                and self._watermark_at is not None and datetime.utcnow() - self._watermark_at < WATERMARK_TTL)
+
+    @staticmethod
+    def is_stale(update: Update, now: datetime) -> bool:
+        if update.callback_query:
+            message = update.callback_query.message
+            limit = timedelta(hours=Config.REPLAY_CALLBACK_MAX_AGE_HOURS)
+        else:
+            message = update.message
+            limit = timedelta(minutes=Config.REPLAY_MAX_AGE_MINUTES)
+        return bool(message and message.date and now - message.date > limit)
+
+    def _count(self, result: str):
+        self.stats[result] += 1
+        replayed_updates_total.inc(result=result)
+
+    async def replay(self, application, allowed_updates: Sequence[str] = None) -> int:
+        """Обработать backlog; возвращает число переигранных апдейтов"""
+        bot = application.bot
+        replay_bot = _ReplayBot(bot)
+        replayed = self.stats['replayed']
+        offset = None
+
+        self.replaying = True
+        try:
+            await self._load()
+            while True:
+                # offset подтверждает предыдущую страницу
+                updates = await bot.get_updates(offset=offset, timeout=0, limit=100, allowed_updates=allowed_updates)
+                if not updates:
+                    break
+
+                now = datetime.now(timezone.utc)
+                fresh = []
+                for update in updates:
+                    if self.is_duplicate(update.update_id):
+                        self._count('duplicate')
+                    elif self.is_stale(update, now):
+                        self._count('stale')
+                    else:
+                        # Вложенные объекты привязываются к _ReplayBot
+                        fresh.append(Update.de_json(update.to_dict(), replay_bot))
+
+                await self._process_page(application, fresh)
+
+                offset = updates[-1].update_id + 1
+                self.last_update_id = updates[-1].update_id
+                self._watermark_at = datetime.utcnow()
+                self._done = set()
+                await self._save(last_update_id=self.last_update_id, replay_done=[])
+                self.stats['pages'] += 1
+        except Exception as e:
+            logger.error(f"Error replaying pending updates: {e}")
+        finally:
+            self.replaying = False
+
+        self.last_replay = datetime.now()
+        replayed = self.stats['replayed'] - replayed
+        logger.info(f"Replayed {replayed} pending updates "
+                    f"(stale {self.stats['stale']}, duplicates {self.stats['duplicate']})")
+        return replayed
+
+    async def _process_page(self, application, updates: List[Update]):
+        queues: Dict[int, List[Update]] = {}
+        for update in updates:
+            if update.effective_user:
+                key = update.effective_user.id
+            elif update.effective_chat:
+                key = update.effective_chat.id
+            else:
+                key = update.update_id
+            queues.setdefault(key, []).append(update)
+
+        semaphore = asyncio.Semaphore(max(1, Config.REPLAY_CONCURRENCY))
+
+        async def run(queue: List[Update]):
+            async with semaphore:
+                for update in queue:
+                    await self._process(application, update)
+
+        await asyncio.gather(*(run(queue) for queue in queues.values()))
+
+    async def _process(self, application, update: Update):
+        try:
+            await application.process_update(update)
+            self._count('replayed')
+        except Exception as e:
+            self._count('error')
+            logger.error(f"Error replaying update {update.update_id}: {e}")
+
+        self._done.add(update.update_id)
+        try:
+            await self._save(replay_done=sorted(self._done))
+        except Exception as e:
+            logger.error(f"Could not save replay progress: {e}")
+
+    # ============= СОХРАНЕНИЕ ПОСЛЕДНЕГО UPDATE_ID =============
+
+    async def start(self):
+        if self.task and not self.task.done():
+            logger.warning("Update replay already running")
+            return
+
+        self.running = True
+        self._stop_event = asyncio.Event()
+        self.task = asyncio.create_task(self._save_loop())
+
+    async def stop(self):
+        self.running = False
+        self._stop_event.set()
+
+        if self.task:
+            try:
+                await asyncio.wait_for(self.task, timeout=5.0)
+            except asyncio.TimeoutError:
+                self.task.cancel()
+            except Exception as e:
+                logger.error(f"Error stopping update replay: {e}")
+            finally:
+                self.task = None
+
+        await self.flush()
+        logger.info("Update replay stopped")
+
+    async def flush(self):
+        """Записать последний update_id, если он изменился"""
+        if self.last_update_id is None or self.last_update_id == self._saved_update_id:
+            return
+        try:
+            await self._save(last_update_id=self.last_update_id)
+        except Exception as e:
+            logger.error(f"Could not save last update id: {e}")
+
+    async def _save_loop(self):
+        while self.running:
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=Config.PERSISTENCE_INTERVAL)
+                break
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def get_status(self) -> Dict:
+        return {
+            'last_update_id': self.last_update_id,
+            'last_replay': self.last_replay,
+            **self.stats
+        }
+
+# Глобальный экземпляр
+update_replay = UpdateReplay()